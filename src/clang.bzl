@@ -18,8 +18,18 @@ Rulesets for running clang-tidy and the clang static analyzer.
 
 load("@bazel_tools//tools/build_defs/cc:action_names.bzl", "ACTION_NAMES")
 load("@bazel_tools//tools/cpp:toolchain_utils.bzl", "find_cpp_toolchain")
-load("common.bzl", "SOURCE_ATTR", "version_specific_attributes")
+load(
+    "common.bzl",
+    "SOURCE_ATTR",
+    "TIME_TRACE_ATTRIBUTES",
+    "clang_analyzer_resources",
+    "clang_tidy_resources",
+    "merge_time_traces",
+    "resource_set_attributes",
+    "version_specific_attributes",
+)
 load("compile_commands.bzl", "platforms_transition")
+load("toolchains.bzl", "clang_toolchain_info", "clang_toolchain_type")
 
 CLANG_TIDY_WRAPPER_SCRIPT = """#!/usr/bin/env bash
 OUTPUT=$1
@@ -33,11 +43,64 @@ touch $OUTPUT
 $@
 """
 
+CLANG_TIDY_BATCH_WRAPPER_SCRIPT = """#!/usr/bin/env bash
+FIXES=$1
+shift
+SPLIT=$1
+shift
+COUNT=$1
+shift
+# Source file and fixes file of each analyzed file
+OUTPUTS=("${@:1:$((COUNT * 2))}")
+shift $((COUNT * 2))
+
+touch $FIXES
+$@
+EXIT_CODE=$?
+$SPLIT split $FIXES "${OUTPUTS[@]}" || exit 1
+exit $EXIT_CODE
+"""
+
 CLANG_ANALYZE_WRAPPER_SCRIPT = """#!/usr/bin/env bash
 # echo "$@"
 $@
 """
 
+def _tidy_tools(ctx, exe, config, label):
+    """
+    Returns (clang-tidy executable, config file, clang toolchain)
+    """
+
+    # Define which clang-tidy to run
+    toolchain = clang_toolchain_info(ctx)
+    if exe and exe.files.to_list():
+        clang_tidy_bin = exe.files_to_run.executable
+    else:
+        clang_tidy_bin = toolchain.clang_tidy_bin
+
+    # If config file is from a filegroup
+    if config and hasattr(config, "files"):
+        config = config.files.to_list()[0]
+
+    # Create clang-tidy config file
+    if not config:
+        config = ctx.actions.declare_file(label + ".clang_tidy_config.yaml")
+        ctx.actions.write(output = config, content = "")
+    return (clang_tidy_bin, config, toolchain)
+
+def _tidy_inputs(infiles, config, exe, headers, toolchain, additional_deps):
+    input_files = list(infiles)
+    if config:
+        input_files.append(config)
+    if exe and exe.files_to_run.executable:
+        input_files.append(exe.files_to_run.executable)
+    if additional_deps:
+        input_files.extend(additional_deps.files.to_list())
+    return depset(
+        direct = input_files,
+        transitive = [headers, toolchain.files],
+    )
+
 def _run_tidy(
         ctx,
         exe,
@@ -53,20 +116,15 @@ def _run_tidy(
         label + "." + infile.path + ".clang-tidy.yaml",
     )
 
-    # Define which clang-tidy to run
-    if exe and exe.files.to_list():
-        clang_tidy_bin = exe.files_to_run.executable
-    else:
-        clang_tidy_bin = "clang-tidy"
+    # clang-tidy names the stored profile after the current time,
+    # so the profile of each translation unit gets its own directory
+    profile = None
+    if getattr(ctx.attr, "profile_checks", False):
+        profile = ctx.actions.declare_directory(
+            label + "." + infile.path + ".clang-tidy-profile",
+        )
 
-    # If config file is from a filegroup
-    if config and hasattr(config, "files"):
-        config = config.files.to_list()[0]
-
-    # Create clang-tidy config file
-    if not config:
-        config = ctx.actions.declare_file(label + ".clang_tidy_config.yaml")
-        ctx.actions.write(output = config, content = "")
+    clang_tidy_bin, config, toolchain = _tidy_tools(ctx, exe, config, label)
 
     # Create clang-tidy wrapper script
     wrapper = ctx.actions.declare_file(label + ".clang_tidy.sh")
@@ -95,6 +153,11 @@ def _run_tidy(
     if options:
         args.add_all(options)
 
+    # Store per check timings
+    if profile:
+        args.add("--enable-check-profile")
+        args.add("--store-check-profile=" + profile.path)
+
     # Add source file to check
     args.add(infile.path)
 
@@ -104,27 +167,107 @@ def _run_tidy(
     # Add compiler flags -I -D etc
     args.add_all(arguments)
 
-    input_files = [infile]
-    if config:
-        input_files.append(config)
-    if exe and exe.files_to_run.executable:
-        input_files.append(exe.files_to_run.executable)
-    if additional_deps:
-        input_files.extend(additional_deps.files.to_list())
-    inputs = depset(
-        direct = input_files,
-        transitive = [headers],
+    inputs = _tidy_inputs(
+        [infile],
+        config,
+        exe,
+        headers,
+        toolchain,
+        additional_deps,
     )
     ctx.actions.run(
         inputs = inputs,
-        outputs = [outfile],
+        outputs = [outfile, profile] if profile else [outfile],
         executable = wrapper,
         arguments = [args],
         mnemonic = "ClangTidy",
         use_default_shell_env = True,
         progress_message = "Run clang-tidy on {}".format(infile.short_path),
+        **resource_set_attributes(clang_tidy_resources)
+    )
+    return struct(report = outfile, profile = profile)
+
+def _run_tidy_batch(
+        ctx,
+        exe,
+        config,
+        options,
+        headers,
+        infiles,
+        arguments,
+        label,
+        batch_name,
+        additional_deps = None):
+    # One clang-tidy run for files with the same compilation arguments,
+    # its fixes are split into the usual per file outputs
+    outfiles = [
+        ctx.actions.declare_file(
+            label + "." + infile.path + ".clang-tidy.yaml",
+        )
+        for infile in infiles
+    ]
+    fixes = ctx.actions.declare_file(batch_name + ".clang-tidy.yaml")
+    profile = None
+    if getattr(ctx.attr, "profile_checks", False):
+        profile = ctx.actions.declare_directory(
+            batch_name + ".clang-tidy-profile",
+        )
+
+    clang_tidy_bin, config, toolchain = _tidy_tools(ctx, exe, config, label)
+
+    # Create clang-tidy wrapper script
+    wrapper = ctx.actions.declare_file(label + ".clang_tidy_batch.sh")
+    ctx.actions.write(
+        output = wrapper,
+        is_executable = True,
+        content = CLANG_TIDY_BATCH_WRAPPER_SCRIPT,
+    )
+
+    # Prepare arguments
+    args = ctx.actions.args()
+    args.add(fixes.path)
+    args.add(ctx.executable._clang_tidy_fixes.path)
+    args.add(str(len(infiles)))
+    for infile, outfile in zip(infiles, outfiles):
+        args.add(infile.path)
+        args.add(outfile.path)
+    args.add(clang_tidy_bin)
+    args.add("--config-file=" + config.path)
+    args.add("--export-fixes=" + fixes.path)
+    if options:
+        args.add_all(options)
+    if profile:
+        args.add("--enable-check-profile")
+        args.add("--store-check-profile=" + profile.path)
+    args.add_all(infiles)
+    args.add("--")
+    args.add_all(arguments)
+
+    outputs = outfiles + [fixes]
+    if profile:
+        outputs.append(profile)
+    ctx.actions.run(
+        inputs = _tidy_inputs(
+            infiles,
+            config,
+            exe,
+            headers,
+            toolchain,
+            additional_deps,
+        ),
+        outputs = outputs,
+        executable = wrapper,
+        tools = [ctx.attr._clang_tidy_fixes[DefaultInfo].files_to_run],
+        arguments = [args],
+        mnemonic = "ClangTidyBatch",
+        use_default_shell_env = True,
+        progress_message = "Run clang-tidy on {} files of {}".format(
+            len(infiles),
+            infiles[0].dirname,
+        ),
+        **resource_set_attributes(clang_tidy_resources)
     )
-    return outfile
+    return struct(reports = outfiles, profile = profile)
 
 def _run_analyzer(
         ctx,
@@ -141,11 +284,19 @@ def _run_analyzer(
         label + "." + infile.path + ".clang-analyze.plist",
     )
 
+    # Chrome trace of the compiler phases
+    time_trace = None
+    if getattr(ctx.attr, "time_trace", False):
+        time_trace = ctx.actions.declare_file(
+            label + "." + infile.path + ".time-trace.json",
+        )
+
     # Define which clang to run
+    toolchain = clang_toolchain_info(ctx)
     if exe and exe.files.to_list():
         clang_bin = exe.files_to_run.executable
     else:
-        clang_bin = "clang"
+        clang_bin = toolchain.clang_bin
 
     # Create config file? FIXME: why do we need this?
     if not config:
@@ -180,6 +331,8 @@ def _run_analyzer(
     # Add clang options
     if options:
         args.add_all(options)
+    if time_trace:
+        args.add("-ftime-trace=" + time_trace.path)
 
     # Add source file to check
     args.add(infile.path)
@@ -200,18 +353,19 @@ def _run_analyzer(
         input_files.extend(additional_deps.files.to_list())
     inputs = depset(
         direct = input_files,
-        transitive = [headers],
+        transitive = [headers, toolchain.files],
     )
     ctx.actions.run(
         inputs = inputs,
-        outputs = [outfile],
+        outputs = [outfile, time_trace] if time_trace else [outfile],
         executable = wrapper,
         arguments = [args],
         mnemonic = "ClangAnalyzer",
         use_default_shell_env = True,
         progress_message = "Run clang --analyze on {}".format(infile.short_path),
+        **resource_set_attributes(clang_analyzer_resources)
     )
-    return outfile
+    return struct(report = outfile, profile = time_trace)
 
 def check_valid_file_type(src):
     """
@@ -321,61 +475,101 @@ def _valid_for_clang_tidy(target, ctx):
 CompileInfo = provider(
     doc = "Source files and corresponding compilation arguments",
     fields = {
-        "arguments": "dict: file -> list of arguments",
-        "headers": "list: header files",
+        "sources": "depset of struct(file, arguments, header_filter, " +
+                   "headers): the source files of the target and its " +
+                   "dependencies with the tuple of their compilation " +
+                   "arguments, the clang-tidy --header-filter of the " +
+                   "headers owned by their target and the depset of " +
+                   "headers visible to their target",
+        "headers": "depset: header files",
+        "unclaimed_headers": "depset: command line paths of the headers " +
+                             "of header-only dependencies, not yet checked " +
+                             "with the translation units of a dependent " +
+                             "target",
     },
 )
 
-def _process_all_deps(ctx, arguments, headers):
+def _regex_escape(text):
+    escaped = ""
+    for char in text.elems():
+        if char in "\\.^$|?*+()[]{}":
+            escaped += "\\"
+        escaped += char
+    return escaped
+
+def _owned_headers(compilation_context):
+    """
+    Returns the paths of the headers owned (declared) by the target,
+    as they appear on the command line (e.g. external/repo/..., or
+    bazel-out/<config>/bin/... for generated headers)
+    """
+    headers = (
+        compilation_context.direct_public_headers +
+        compilation_context.direct_private_headers +
+        compilation_context.direct_textual_headers
+    )
+    return [header.path for header in headers]
+
+def _header_filter(paths):
+    """
+    Returns the clang-tidy --header-filter regex matching the given header
+    paths, or one matching nothing if there are no paths
+    """
+    if not paths:
+        return "^$"
+    escaped = sorted({_regex_escape(path): True for path in paths})
+    return "(^|/)({})$".format("|".join(escaped))
+
+def _compile_info_aspect_impl(target, ctx):
+    # Each target adds only its own sources, the rest is shared with the
+    # dependencies through depsets, so the memory stays linear in graph size
+    transitive_sources = []
+    transitive_headers = []
+    unclaimed_headers = []
     for attr in SOURCE_ATTR:
         if hasattr(ctx.rule.attr, attr):
             deps = getattr(ctx.rule.attr, attr)
             for dep in deps:
                 if CompileInfo in dep:
-                    if hasattr(dep[CompileInfo], "arguments"):
-                        arguments.update(dep[CompileInfo].arguments)
-                    if hasattr(dep[CompileInfo], "headers"):
-                        headers += dep[CompileInfo].headers.to_list()
-
-    # # NOTE: Alternative implementation
-    # for attr in dir(ctx.rule.attr):
-    #     deps = getattr(ctx.rule.attr, attr)
-    #     if type(deps) == "list":
-    #         for dep in deps:
-    #             if type(dep) == "Target" and CompileInfo in dep:
-    #                 if hasattr(dep[CompileInfo], "arguments"):
-    #                     arguments.update(dep[CompileInfo].arguments)
-    #                 if hasattr(dep[CompileInfo], "headers"):
-    #                     headers += dep[CompileInfo].headers.to_list()
-
-def _get_sources(ctx):
-    sources = _rule_sources(ctx)
-    arguments = {src: [] for src in sources}
-    headers = []
-    _process_all_deps(ctx, arguments, headers)
-    return arguments.keys()
-
-def _compile_info_aspect_impl(target, ctx):
-    arguments = {}
-    headers = []
-    _process_all_deps(ctx, arguments, headers)
+                    transitive_sources.append(dep[CompileInfo].sources)
+                    transitive_headers.append(dep[CompileInfo].headers)
+                    unclaimed_headers.append(dep[CompileInfo].unclaimed_headers)
+    unclaimed = depset(transitive = unclaimed_headers)
 
+    sources = []
     if _valid_for_clang_tidy(target, ctx):
         compilation_context = target[CcInfo].compilation_context
-        headers += compilation_context.headers.to_list()
+        transitive_headers.append(compilation_context.headers)
+        owned_headers = _owned_headers(compilation_context)
+        rule_sources = _rule_sources(ctx)
+        if not rule_sources:
+            # Header-only library: its headers are checked with the
+            # translation units of the first dependent target with sources
+            unclaimed = depset(owned_headers, transitive = unclaimed_headers)
+    else:
+        rule_sources = []
+    if rule_sources:
         rule_flags = ctx.rule.attr.copts if hasattr(ctx.rule.attr, "copts") else []
         c_flags = _safe_flags(_toolchain_flags(ctx, ACTION_NAMES.c_compile) + rule_flags)  # + ["-xc"]
         cxx_flags = _safe_flags(_toolchain_flags(ctx, ACTION_NAMES.cpp_compile) + rule_flags)  # + ["-xc++"]
-        srcs = _get_sources(ctx)
         compile_args = _compile_args(compilation_context)
-        for src in srcs:
-            flags = c_flags if src.extension in ["c", "C"] else cxx_flags
-            arguments[src] = compile_args + flags
+        c_arguments = tuple(compile_args + c_flags)
+        cxx_arguments = tuple(compile_args + cxx_flags)
+        header_filter = _header_filter(owned_headers + unclaimed.to_list())
+        unclaimed = depset()
+        for src in rule_sources:
+            sources.append(struct(
+                file = src,
+                arguments = c_arguments if src.extension in ["c", "C"] else cxx_arguments,
+                header_filter = header_filter,
+                headers = compilation_context.headers,
+            ))
 
     return [
         CompileInfo(
-            arguments = arguments,
-            headers = depset(headers),
+            sources = depset(sources, transitive = transitive_sources),
+            headers = depset(transitive = transitive_headers),
+            unclaimed_headers = unclaimed,
         ),
     ]
 
@@ -389,38 +583,158 @@ compile_info_aspect = aspect(
     },
 )
 
-def _clang_test(ctx, tool):
+def _merge_tidy_fixes(ctx, reports):
+    merged = ctx.actions.declare_file(ctx.attr.name + ".clang-tidy.yaml")
+    args = ctx.actions.args()
+    args.add("merge")
+    args.add("--output", merged)
+    args.add_all(reports)
+    ctx.actions.run(
+        inputs = reports,
+        outputs = [merged],
+        executable = ctx.executable._clang_tidy_fixes,
+        arguments = [args],
+        mnemonic = "ClangTidyFixes",
+        progress_message = "Merge clang-tidy fixes of {}".format(ctx.label),
+    )
+    return {"clang_tidy_fixes": depset([merged])}
+
+def _tidy_outputs(ctx, reports, profiles):
+    output_groups = {}
+    if ctx.attr.header_ownership:
+        output_groups.update(_merge_tidy_fixes(ctx, reports))
+    if profiles:
+        output_groups.update(_aggregate_tidy_profiles(ctx, profiles))
+    return output_groups
+
+def _analyzer_outputs(ctx, _reports, time_traces):
+    if not time_traces:
+        return {}
+    return merge_time_traces(ctx, time_traces)
+
+def _aggregate_tidy_profiles(ctx, profiles):
+    profiles = [profile for _, profile in profiles]
+    ranking = ctx.actions.declare_file(ctx.attr.name + ".check_profile.json")
+    report = ctx.actions.declare_file(ctx.attr.name + ".check_profile.txt")
+    args = ctx.actions.args()
+    args.add("--output", ranking)
+    args.add("--report", report)
+    args.add_all(profiles, expand_directories = False)
+    ctx.actions.run(
+        inputs = profiles,
+        outputs = [ranking, report],
+        executable = ctx.executable._clang_tidy_profile,
+        arguments = [args],
+        mnemonic = "ClangTidyProfile",
+        progress_message = "Rank clang-tidy checks of {}".format(ctx.label),
+    )
+    return {"clang_tidy_profile": depset([ranking, report] + profiles)}
+
+def _batches(sources, batch_size):
+    """
+    Groups the sources by their compilation arguments into batches
+    of at most batch_size files
+    """
+    groups = {}
+    for source in sources:
+        key = (source.arguments, source.header_filter, source.headers)
+        groups.setdefault(key, []).append(source.file)
+    batches = []
+    for (arguments, header_filter, headers), files in groups.items():
+        for start in range(0, len(files), batch_size):
+            batches.append(struct(
+                files = files[start:start + batch_size],
+                arguments = arguments,
+                header_filter = header_filter,
+                headers = headers,
+            ))
+    return batches
+
+def _tool_options(ctx, header_filter):
+    options = ctx.attr.default_options + ctx.attr.options
+    if getattr(ctx.attr, "header_ownership", False):
+        options = options + ["--header-filter=" + header_filter]
+    return options
+
+def _clang_test(ctx, tool, extra_outputs = None, batch_tool = None):
     all_files = []
-    all_headers = depset()
-    for target in ctx.attr.targets:
-        if CompileInfo in target:
-            if hasattr(target[CompileInfo], "arguments"):
-                srcs = target[CompileInfo].arguments.keys()
-                headers = target[CompileInfo].headers
-                all_files += srcs
-                for src in srcs:
-                    arguments = target[CompileInfo].arguments[src]
-                    report = tool(
-                        ctx,
-                        ctx.attr.executable,
-                        ctx.attr.config_file,
-                        ctx.attr.default_options + ctx.attr.options,
-                        headers,
-                        src,
-                        arguments,
-                        ctx.attr.name,
-                    )
-                    all_files.append(report)
-                    all_headers = depset(transitive = [all_headers, headers])
+    all_reports = []
+    all_profiles = []
+    sources = depset(transitive = [
+        target[CompileInfo].sources
+        for target in ctx.attr.targets
+        if CompileInfo in target
+    ])
+    all_headers = depset(transitive = [
+        target[CompileInfo].headers
+        for target in ctx.attr.targets
+        if CompileInfo in target
+    ])
+
+    # The only flattening: one analysis action for each source file,
+    # with the arguments and headers of the first target compiling it.
+    # The actions get only the headers of that target, all_headers is
+    # used only for the outputs, otherwise the inputs grow quadratically
+    analyzed = {}
+    unique_sources = []
+    for source in sources.to_list():
+        if source.file not in analyzed:
+            analyzed[source.file] = True
+            unique_sources.append(source)
+
+    batch_size = getattr(ctx.attr, "batch_size", 0)
+    if batch_tool and batch_size > 1:
+        for index, batch in enumerate(_batches(unique_sources, batch_size)):
+            report = batch_tool(
+                ctx,
+                ctx.attr.executable,
+                ctx.attr.config_file,
+                _tool_options(ctx, batch.header_filter),
+                batch.headers,
+                batch.files,
+                batch.arguments,
+                ctx.attr.name,
+                "{}.batch_{}".format(ctx.attr.name, index),
+            )
+            all_files.extend(batch.files)
+            all_reports.extend(report.reports)
+            if report.profile:
+                all_profiles.append((batch.files[0], report.profile))
+        unique_sources = []
+
+    for source in unique_sources:
+        src = source.file
+        all_files.append(src)
+        report = tool(
+            ctx,
+            ctx.attr.executable,
+            ctx.attr.config_file,
+            _tool_options(ctx, source.header_filter),
+            source.headers,
+            src,
+            source.arguments,
+            ctx.attr.name,
+        )
+        all_reports.append(report.report)
+        if report.profile:
+            all_profiles.append((src, report.profile))
 
     ctx.actions.write(
         output = ctx.outputs.test_script,
         is_executable = True,
         content = "true",
     )
+    output_groups = {}
+    if extra_outputs:
+        output_groups = extra_outputs(ctx, all_reports, all_profiles)
+    # The check profiles are built only if requested by their output group
     files = depset(
-        direct = all_files,
-        transitive = [all_headers],
+        direct = all_files + all_reports,
+        transitive = [all_headers] + [
+            group
+            for name, group in output_groups.items()
+            if name != "clang_tidy_profile"
+        ],
     )
     run_files = [ctx.outputs.test_script] + files.to_list()
     return [
@@ -429,10 +743,16 @@ def _clang_test(ctx, tool):
             runfiles = ctx.runfiles(files = run_files),
             executable = ctx.outputs.test_script,
         ),
+        OutputGroupInfo(**output_groups),
     ]
 
 def _clang_tidy_test_impl(ctx):
-    return _clang_test(ctx, _run_tidy)
+    return _clang_test(
+        ctx,
+        _run_tidy,
+        _tidy_outputs,
+        _run_tidy_batch,
+    )
 
 clang_tidy_test = rule(
     implementation = _clang_tidy_test_impl,
@@ -475,15 +795,47 @@ clang_tidy_test = rule(
             cfg = "exec",
             doc = "Clang-tidy executable",
         ),
+        "profile_checks": attr.bool(
+            default = False,
+            doc = "Store the time spent in each check for every " +
+                  "translation unit, and rank the checks by their cost " +
+                  "(clang_tidy_profile output group)",
+        ),
+        "_clang_tidy_profile": attr.label(
+            default = ":clang_tidy_profile",
+            executable = True,
+            cfg = "exec",
+        ),
+        "batch_size": attr.int(
+            default = 0,
+            doc = "Run clang-tidy once for up to batch_size source files " +
+                  "with the same compilation arguments. Fewer process " +
+                  "launches, but editing one file reruns its whole batch. " +
+                  "0 or 1 runs clang-tidy on each file separately.",
+        ),
+        "header_ownership": attr.bool(
+            default = False,
+            doc = "Check each header only with the translation units of " +
+                  "the target declaring it (--header-filter), headers " +
+                  "of header-only libraries with their dependents, and merge " +
+                  "the fixes of all files into <name>.clang-tidy.yaml, " +
+                  "deduplicated by (file, offset, check)",
+        ),
+        "_clang_tidy_fixes": attr.label(
+            default = ":clang_tidy_fixes",
+            executable = True,
+            cfg = "exec",
+        ),
     } | version_specific_attributes(),
     outputs = {
         "test_script": "%{name}.test_script.sh",
     },
+    toolchains = [clang_toolchain_type()],
     test = True,
 )
 
 def _clang_analyze_test_impl(ctx):
-    return _clang_test(ctx, _run_analyzer)
+    return _clang_test(ctx, _run_analyzer, _analyzer_outputs)
 
 clang_analyze_test = rule(
     implementation = _clang_analyze_test_impl,
@@ -530,9 +882,10 @@ clang_analyze_test = rule(
             cfg = "exec",
             doc = "Clang executable",
         ),
-    } | version_specific_attributes(),
+    } | TIME_TRACE_ATTRIBUTES | version_specific_attributes(),
     outputs = {
         "test_script": "%{name}.test_script.sh",
     },
+    toolchains = [clang_toolchain_type()],
     test = True,
 )
@@ -18,10 +18,21 @@ Ruleset for running the clang static analyzer with CTU analysis.
 
 load("@bazel_tools//tools/build_defs/cc:action_names.bzl", "ACTION_NAMES")
 load("@bazel_tools//tools/cpp:toolchain_utils.bzl", "find_cpp_toolchain")
-load("common.bzl", "SOURCE_ATTR", "version_specific_attributes")
+load(
+    "common.bzl",
+    "SOURCE_ATTR",
+    "TIME_TRACE_ATTRIBUTES",
+    "clang_ctu_resources",
+    "merge_time_traces",
+    "resource_set_attributes",
+    "version_specific_attributes",
+)
+load("toolchains.bzl", "clang_toolchain_info", "clang_toolchain_type")
 
 CLANG_CTU_WRAPPER_SCRIPT = """#!/usr/bin/env bash
 #set -x
+CLANG=$1
+shift
 REPORT_TYPE=$1
 shift
 REPORT_FILE=$1
@@ -38,7 +49,7 @@ CC_FLAGS=$@
 
 [[ $REPORT_TYPE = "html" ]] && mkdir -p $REPORT_FILE
 [[ $REPORT_TYPE = "text" ]] && REPORT=" 2>&1 | tee $REPORT_FILE"
-COMMAND="clang --analyze $ANALYZE_FLAGS \
+COMMAND="$CLANG --analyze $ANALYZE_FLAGS \
   -Xclang -analyzer-output=$REPORT_TYPE -o $REPORT_FILE \
   -Xclang -analyzer-config -Xclang experimental-enable-naive-ctu-analysis=true \
   -Xclang -analyzer-config -Xclang ctu-dir=$CTU_DIR \
@@ -97,8 +108,22 @@ def _run_clang_ctu(
         report_file = ctx.actions.declare_file(report_file_name)
     log_file = ctx.actions.declare_file(log_file_name)
 
-    inputs = sources_and_headers + ast_files + [def_file]
+    # Chrome trace of the compiler phases, including the CTU imports
+    time_trace = None
+    if ctx.attr.time_trace:
+        time_trace = ctx.actions.declare_file(
+            "{}/{}.time-trace.json".format(label, src.short_path),
+        )
+        options = options + ["-ftime-trace=" + time_trace.path]
+
+    toolchain = clang_toolchain_info(ctx)
+    inputs = depset(
+        sources_and_headers + ast_files + [def_file],
+        transitive = [toolchain.files],
+    )
     outputs = [report_file, log_file]
+    if time_trace:
+        outputs.append(time_trace)
 
     # Create CodeChecker wrapper script
     wrapper = ctx.actions.declare_file(label + "/clang_ctu.sh")
@@ -110,6 +135,7 @@ def _run_clang_ctu(
 
     # Prepare arguments
     args = ctx.actions.args()
+    args.add(toolchain.clang_bin)
     args.add(report_type)
     args.add(report_file.path)
     args.add(log_file.path)
@@ -127,8 +153,9 @@ def _run_clang_ctu(
         mnemonic = "ClangCTU",
         use_default_shell_env = True,
         progress_message = "clang -analyze +CTU {}".format(src.short_path),
+        **resource_set_attributes(clang_ctu_resources)
     )
-    return outputs
+    return (outputs, time_trace)
 
 def check_valid_file_type(src):
     """
@@ -276,6 +303,7 @@ def _generate_ast_and_def_files(ctx, target, all_sources):
         return ([], [])
     if not hasattr(target[CompileInfo], "arguments"):
         return ([], [])
+    toolchain = clang_toolchain_info(ctx)
     ast_files = []
     def_files = []
     srcs = target[CompileInfo].arguments.keys()
@@ -286,10 +314,11 @@ def _generate_ast_and_def_files(ctx, target, all_sources):
         # clang $CCFLAGS $FILEPATH -emit-ast -D__clang_analyzer__ -w -o $AST_FILE
         ast_file = ctx.actions.declare_file(file_path + ".ast")
         ctx.actions.run_shell(
-            inputs = all_sources,
+            inputs = depset(all_sources, transitive = [toolchain.files]),
             outputs = [ast_file],
             # NOTE: realpath!
-            command = "clang {} $(realpath {}) {} -o {}".format(
+            command = "{} {} $(realpath {}) {} -o {}".format(
+                toolchain.clang_bin,
                 " ".join(args),
                 src.path,
                 "-emit-ast -D__clang_analyzer__ -w",
@@ -303,13 +332,17 @@ def _generate_ast_and_def_files(ctx, target, all_sources):
         # sed -i -e "s|$(pwd)/$FILEPATH|$FILENAME.ast|g" $DEF_FILE
         def_file = ctx.actions.declare_file(file_path + ".def")
         command = """
-        clang-extdef-mapping {} -- {} > {}
+        {} {} -- {} > {}
         sed -i -e "s| /\\S*{}| {}|g" {}
         """  # FIXME: how to match absolute path?
         ctx.actions.run_shell(
-            inputs = all_sources + [ast_file],
+            inputs = depset(
+                all_sources + [ast_file],
+                transitive = [toolchain.files],
+            ),
             outputs = [def_file],
             command = command.format(
+                toolchain.clang_extdef_mapping_bin,
                 src.path,
                 " ".join(args),
                 def_file.path,
@@ -343,6 +376,7 @@ def _clang_ctu_impl(ctx):
     sources_and_headers = _collect_all_sources_and_headers(ctx)
     all_files = sources_and_headers
     options = ctx.attr.default_options + ctx.attr.options
+    time_traces = []
     for target in ctx.attr.targets:
         if not CcInfo in target:
             continue
@@ -356,7 +390,7 @@ def _clang_ctu_impl(ctx):
         all_files += srcs
         for src in srcs:
             args = target[CompileInfo].arguments[src]
-            outputs = _run_clang_ctu(
+            outputs, time_trace = _run_clang_ctu(
                 ctx,
                 src,
                 args,
@@ -367,6 +401,8 @@ def _clang_ctu_impl(ctx):
                 sources_and_headers,
             )
             all_files += outputs
+            if time_trace:
+                time_traces.append((src, time_trace))
     reports = " ".join([f.short_path for f in all_files if f.extension == "txt"])
     ctx.actions.write(
         output = ctx.outputs.test_script,
@@ -394,8 +430,12 @@ def _clang_ctu_impl(ctx):
             exit $exit_code
         """.format(reports),
     )
+    output_groups = {}
+    if time_traces:
+        output_groups = merge_time_traces(ctx, time_traces)
     files = depset(
         direct = all_files,
+        transitive = output_groups.values(),
     )
     run_files = [ctx.outputs.test_script] + all_files
     return [
@@ -404,6 +444,7 @@ def _clang_ctu_impl(ctx):
             runfiles = ctx.runfiles(files = run_files),
             executable = ctx.outputs.test_script,
         ),
+        OutputGroupInfo(**output_groups),
     ]
 
 clang_ctu_test = rule(
@@ -427,9 +468,10 @@ clang_ctu_test = rule(
             ],
             doc = "List of compilable targets which should be checked.",
         ),
-    },
+    } | TIME_TRACE_ATTRIBUTES,
     outputs = {
         "test_script": "%{name}/test_script.sh",
     },
+    toolchains = [clang_toolchain_type()],
     test = True,
 )
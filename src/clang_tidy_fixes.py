@@ -0,0 +1,206 @@
+# Copyright 2023 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Split and merge the fixes exported by clang-tidy.
+
+split: clang-tidy --export-fixes writes the diagnostics of all analyzed files
+into one YAML file. The diagnostics are assigned to the source file they are
+reported in; diagnostics of other files (headers) go to the first source
+file. A source file without diagnostics gets an empty fixes file,
+the same as when clang-tidy analyzes it alone.
+
+    clang_tidy_fixes.py split all.yaml a.cc a.yaml b.cc b.yaml
+
+merge: collect the fixes of all translation units into one file.
+A header included by several translation units is reported by each of them,
+these diagnostics are deduplicated by (file, offset, check).
+The sandbox specific file paths are made relative to the execution root.
+
+    clang_tidy_fixes.py merge -o merged.yaml a.yaml b.yaml
+"""
+
+import argparse
+import logging
+import re
+import sys
+
+from codechecker_paths import normalize
+
+# Each diagnostic starts with this line in the exported fixes
+DIAGNOSTIC_START = "  - DiagnosticName:"
+# The location of the diagnostic message (replacements are indented deeper)
+FILE_PATH = re.compile(r"^      FilePath:\s+(.*)$")
+FILE_OFFSET = re.compile(r"^      FileOffset:\s+(\d+)$")
+# Any file path: of the message, the notes and the replacements
+ANY_FILE_PATH = re.compile(r"^(\s+(?:- )?FilePath:\s+)(.*)$")
+
+
+def parse_args():
+    """
+    Parse command line arguments or show help.
+    """
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    split_parser = subparsers.add_parser(
+        "split", help="split fixes by source file"
+    )
+    split_parser.add_argument("fixes", help="fixes exported by clang-tidy")
+    split_parser.add_argument(
+        "outputs",
+        nargs="+",
+        metavar="SOURCE OUTPUT",
+        help="pairs of source file and its fixes file",
+    )
+    merge_parser = subparsers.add_parser(
+        "merge", help="merge and deduplicate fixes files"
+    )
+    merge_parser.add_argument(
+        "-o", "--output", required=True, help="merged fixes file"
+    )
+    merge_parser.add_argument("inputs", nargs="*", help="fixes files")
+    return parser.parse_args()
+
+
+def unquote(value):
+    """
+    Return the value of a YAML scalar
+    """
+    value = value.strip()
+    if len(value) > 1 and value[0] == value[-1] == "'":
+        return value[1:-1].replace("''", "'")
+    if len(value) > 1 and value[0] == value[-1] == '"':
+        return value[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+    return value
+
+
+def read_diagnostics(fixes_file):
+    """
+    Return the diagnostics of a fixes file as dicts of
+    check, file (path), offset and the YAML lines
+    """
+    diagnostics = []
+    with open(fixes_file, encoding="utf-8") as handle:
+        for line in handle:
+            if line.startswith(DIAGNOSTIC_START):
+                diagnostics.append({
+                    "check": unquote(line[len(DIAGNOSTIC_START):]),
+                    "file": None,
+                    "offset": None,
+                    "lines": [],
+                })
+            elif not line.startswith("    ") or not diagnostics:
+                # Document header, "Diagnostics:" or the document end
+                continue
+            diagnostic = diagnostics[-1]
+            match = FILE_PATH.match(line.rstrip("\n"))
+            if match and diagnostic["file"] is None:
+                diagnostic["file"] = unquote(match.group(1))
+            match = FILE_OFFSET.match(line.rstrip("\n"))
+            if match and diagnostic["offset"] is None:
+                diagnostic["offset"] = int(match.group(1))
+            diagnostic["lines"].append(line)
+    return diagnostics
+
+
+def owner(file_path, sources):
+    """
+    Return the source file the diagnostic belongs to
+    """
+    if file_path:
+        for source in sources:
+            if file_path == source or file_path.endswith("/" + source):
+                return source
+    return sources[0]
+
+
+def write_fixes(output, source, lines):
+    """
+    Write the fixes of a source file, or an empty file without diagnostics
+    """
+    with open(output, "w", encoding="utf-8") as handle:
+        if not lines:
+            return
+        handle.write("---\n")
+        handle.write(f"MainSourceFile:  '{source}'\n")
+        handle.write("Diagnostics:\n")
+        handle.writelines(lines)
+        handle.write("...\n")
+
+
+def split(fixes_file, pairs):
+    """
+    Split the fixes file into the fixes files of the source files
+    """
+    sources = pairs[0::2]
+    lines = {source: [] for source in sources}
+    for diagnostic in read_diagnostics(fixes_file):
+        lines[owner(diagnostic["file"], sources)].extend(diagnostic["lines"])
+    for source, output in zip(sources, pairs[1::2]):
+        logging.debug("%s: %d lines", source, len(lines[source]))
+        write_fixes(output, source, lines[source])
+
+
+def normalize_line(line):
+    """
+    Make the file path of a YAML line relative to the execution root
+    """
+    match = ANY_FILE_PATH.match(line.rstrip("\n"))
+    if not match:
+        return line
+    path = normalize(unquote(match.group(2))).replace("'", "''")
+    return f"{match.group(1)}'{path}'\n"
+
+
+def merge(inputs, output):
+    """
+    Merge the fixes files, keep the first of the duplicated diagnostics
+    """
+    seen = set()
+    lines = []
+    duplicates = 0
+    for fixes_file in inputs:
+        for diagnostic in read_diagnostics(fixes_file):
+            key = (
+                normalize(diagnostic["file"]),
+                diagnostic["offset"],
+                diagnostic["check"],
+            )
+            if key in seen:
+                duplicates += 1
+                continue
+            seen.add(key)
+            lines.extend(normalize_line(line) for line in diagnostic["lines"])
+    logging.debug("%d diagnostics, %d duplicates", len(seen), duplicates)
+    write_fixes(output, "", lines)
+
+
+def main():
+    """
+    Main function
+    """
+    options = parse_args()
+    if options.command == "merge":
+        merge(options.inputs, options.output)
+        return
+    if len(options.outputs) % 2:
+        logging.error("Every source file needs an output file")
+        sys.exit(1)
+    split(options.fixes, options.outputs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+# Copyright 2023 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Aggregate clang-tidy check profiles and rank the checks by their cost.
+
+clang-tidy stores one profile per translation unit when it runs with
+--enable-check-profile --store-check-profile=<directory>.
+The checks are ranked by their total wall time over all translation units,
+the average and the maximum time of a single translation unit is listed too.
+
+    bazel build //:clang_tidy_test --output_groups=clang_tidy_profile
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+
+# Profile keys look like: "time.clang-tidy.<check>.wall"
+PROFILE_PREFIX = "time.clang-tidy."
+PROFILE_KINDS = ("wall", "user", "sys")
+
+
+def parse_args():
+    """
+    Parse command line arguments or show help.
+    """
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        "paths",
+        nargs="+",
+        help="clang-tidy profile JSON files or directories containing them",
+    )
+    parser.add_argument(
+        "--debug",
+        action="store_true",
+        help="print debug messages",
+    )
+    parser.add_argument(
+        "-n",
+        "--top",
+        type=int,
+        default=20,
+        help="number of most expensive checks to list",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=None,
+        help="save the check ranking to this JSON file",
+    )
+    parser.add_argument(
+        "-r",
+        "--report",
+        default=None,
+        help="write the text report to this file instead of stdout",
+    )
+    options = parser.parse_args()
+    logging.basicConfig(
+        format="[PROFILE] %(levelname)5s: %(message)s",
+        level=logging.DEBUG if options.debug else logging.WARN,
+    )
+    return options
+
+
+def find_profile_files(paths):
+    """
+    Yield profile JSON files from the given files and directories
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            pattern = os.path.join(path, "**", "*.json")
+            yield from sorted(glob.glob(pattern, recursive=True))
+        else:
+            yield path
+
+
+def parse_profile_key(key):
+    """
+    Return (check, kind) of a profile key, or None for unknown keys
+    """
+    if not key.startswith(PROFILE_PREFIX):
+        return None
+    check, _, kind = key[len(PROFILE_PREFIX):].rpartition(".")
+    if not check or kind not in PROFILE_KINDS:
+        return None
+    return check, kind
+
+
+def aggregate(profile_files):
+    """
+    Sum the check times of all translation units
+    """
+    checks = {}
+    units = 0
+    for profile_file in profile_files:
+        logging.debug("Reading %s", profile_file)
+        with open(profile_file, encoding="utf-8") as handle:
+            try:
+                profile = json.load(handle)
+            except ValueError:
+                logging.warning("Invalid profile file: %s", profile_file)
+                continue
+        if "profile" not in profile:
+            logging.debug("Not a check profile: %s", profile_file)
+            continue
+        units += 1
+        source = profile.get("file", profile_file)
+        for key, seconds in profile["profile"].items():
+            parsed = parse_profile_key(key)
+            if not parsed:
+                continue
+            check, kind = parsed
+            entry = checks.setdefault(check, {
+                "check": check,
+                "wall": 0.0,
+                "user": 0.0,
+                "sys": 0.0,
+                "translation_units": 0,
+                "max_wall": 0.0,
+                "max_file": None,
+            })
+            entry[kind] += seconds
+            if kind != "wall":
+                continue
+            entry["translation_units"] += 1
+            if entry["max_file"] is None or seconds > entry["max_wall"]:
+                entry["max_wall"] = seconds
+                entry["max_file"] = source
+    for entry in checks.values():
+        entry["mean_wall"] = entry["wall"] / max(entry["translation_units"], 1)
+    return {
+        "translation_units": units,
+        "total_wall": sum(entry["wall"] for entry in checks.values()),
+        "checks": sorted(
+            checks.values(),
+            key=lambda entry: (entry["wall"], entry["max_wall"]),
+            reverse=True,
+        ),
+    }
+
+
+def write_report(result, top, output):
+    """
+    Write the most expensive checks
+    """
+    total = result["total_wall"] or 1.0
+    output.write(f"Translation units: {result['translation_units']}\n")
+    output.write(f"Total check time: {result['total_wall']:.3f} s\n\n")
+    output.write(f"Most expensive checks (top {top}):\n")
+    output.write(
+        f"  {'total':>10} {'share':>6} {'mean/TU':>10} {'max/TU':>10}"
+        "  check (slowest file)\n"
+    )
+    for entry in result["checks"][:top]:
+        output.write(
+            f"  {entry['wall']:>10.3f} {entry['wall'] / total:>6.1%} "
+            f"{entry['mean_wall']:>10.4f} {entry['max_wall']:>10.4f}"
+            f"  {entry['check']} ({entry['max_file']})\n"
+        )
+
+
+def main():
+    """
+    Main function
+    """
+    options = parse_args()
+    result = aggregate(find_profile_files(options.paths))
+    if options.report:
+        with open(options.report, "w", encoding="utf-8") as report_file:
+            write_report(result, options.top, report_file)
+    else:
+        if not result["translation_units"]:
+            logging.error("No profile files found in: %s", options.paths)
+            sys.exit(1)
+        write_report(result, options.top, sys.stdout)
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as ranking_file:
+            json.dump(result, ranking_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
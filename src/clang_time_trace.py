@@ -0,0 +1,212 @@
+# Copyright 2023 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Merge clang -ftime-trace files into a single Chrome trace
+and summarize the slowest translation units and compilation phases.
+
+Every translation unit becomes a separate process in the merged trace,
+so they can be compared side by side in chrome://tracing or Perfetto.
+The phases are taken from the "Total <phase>" events of clang.
+
+Arguments are trace files, optionally prefixed by the analyzed source file:
+
+    clang_time_trace.py -o merged.json src/main.cc=main.cc.time-trace.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+TOTAL_PREFIX = "Total "
+# The whole clang invocation, used as the time of the translation unit
+TOTAL_EVENT = "Total ExecuteCompiler"
+
+
+def parse_args():
+    """
+    Parse command line arguments or show help.
+    """
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        "traces",
+        nargs="+",
+        metavar="[SOURCE=]TRACE",
+        help="clang time trace JSON files",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=None,
+        help="save the merged Chrome trace to this file",
+    )
+    parser.add_argument(
+        "-s",
+        "--summary",
+        default=None,
+        help="write the text summary to this file instead of stdout",
+    )
+    parser.add_argument(
+        "-n",
+        "--top",
+        default=10,
+        type=int,
+        help="number of translation units and phases to list",
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="print debug messages",
+    )
+    options = parser.parse_args()
+    logging.basicConfig(
+        format="[TIME TRACE] %(levelname)5s: %(message)s",
+        level=logging.DEBUG if options.verbose else logging.WARN,
+    )
+    return options
+
+
+def split_argument(argument):
+    """
+    Return (source, trace file) of a [SOURCE=]TRACE argument
+    """
+    source, separator, trace = argument.partition("=")
+    if not separator:
+        trace = argument
+        source = os.path.basename(argument)
+        if source.endswith(".json"):
+            source = source[:-len(".json")]
+    return source, trace
+
+
+def read_trace(trace_file):
+    """
+    Return the events of a trace file, or None if it is not valid
+    """
+    try:
+        with open(trace_file, encoding="utf-8") as handle:
+            trace = json.load(handle)
+    except (OSError, ValueError):
+        logging.warning("Invalid time trace file: %s", trace_file)
+        return None
+    if isinstance(trace, list):
+        return trace
+    return trace.get("traceEvents", [])
+
+
+def merge(arguments):
+    """
+    Merge the time traces, and sum the time of each translation unit
+    and each phase (in microseconds)
+    """
+    events = []
+    units = []
+    phases = {}
+    for pid, argument in enumerate(arguments, start=1):
+        source, trace_file = split_argument(argument)
+        logging.debug("Reading %s (%s)", trace_file, source)
+        trace = read_trace(trace_file)
+        if trace is None:
+            continue
+        events.append({
+            "ph": "M",
+            "name": "process_name",
+            "pid": pid,
+            "tid": 0,
+            "args": {"name": source},
+        })
+        duration = 0
+        for event in trace:
+            if event.get("ph") == "M" and event.get("name") == "process_name":
+                continue
+            event = dict(event, pid=pid)
+            events.append(event)
+            name = event.get("name", "")
+            if not name.startswith(TOTAL_PREFIX):
+                continue
+            if name == TOTAL_EVENT:
+                duration = event.get("dur", 0)
+                continue
+            phase = phases.setdefault(
+                name[len(TOTAL_PREFIX):], {"duration": 0, "count": 0}
+            )
+            phase["duration"] += event.get("dur", 0)
+            phase["count"] += event.get("args", {}).get("count", 1)
+        units.append({"file": source, "duration": duration})
+    return {
+        "traceEvents": events,
+        "units": sorted(units, key=lambda unit: unit["duration"], reverse=True),
+        "phases": dict(
+            sorted(
+                phases.items(),
+                key=lambda item: item[1]["duration"],
+                reverse=True,
+            )
+        ),
+    }
+
+
+def write_summary(result, top, output):
+    """
+    Write the slowest translation units and phases
+    """
+    total = sum(unit["duration"] for unit in result["units"])
+    output.write(f"Translation units: {len(result['units'])}\n")
+    output.write(f"Total time: {total / 1e6:.3f} s\n\n")
+    output.write(f"Slowest translation units (top {top}):\n")
+    for unit in result["units"][:top]:
+        output.write(f"  {unit['duration'] / 1e6:>10.3f} s  {unit['file']}\n")
+    output.write(f"\nSlowest phases (top {top}):\n")
+    output.write(f"  {'seconds':>10} {'count':>8}  phase\n")
+    for name, phase in list(result["phases"].items())[:top]:
+        output.write(
+            f"  {phase['duration'] / 1e6:>10.3f} {phase['count']:>8}  {name}\n"
+        )
+
+
+def main():
+    """
+    Main function
+    """
+    options = parse_args()
+    result = merge(options.traces)
+    if options.summary:
+        with open(options.summary, "w", encoding="utf-8") as summary_file:
+            write_summary(result, options.top, summary_file)
+    else:
+        if not result["units"]:
+            logging.error("No valid time trace files: %s", options.traces)
+            sys.exit(1)
+        write_summary(result, options.top, sys.stdout)
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as trace_file:
+            json.dump(
+                {
+                    "traceEvents": result["traceEvents"],
+                    "displayTimeUnit": "ms",
+                    "otherData": {
+                        "units": result["units"],
+                        "phases": result["phases"],
+                    },
+                },
+                trace_file,
+            )
+
+
+if __name__ == "__main__":
+    main()
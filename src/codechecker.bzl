@@ -16,10 +16,6 @@
 Rulesets for running codechecker in a single Bazel job.
 """
 
-load(
-    "@default_codechecker_tools//:defs.bzl",
-    "CODECHECKER_BIN_PATH",
-)
 load(
     "codechecker_config.bzl",
     "codechecker_config_internal",
@@ -27,34 +23,35 @@ load(
 )
 load(
     "common.bzl",
+    "CODECHECKER_RESOURCES",
     "python_path",
     "python_toolchain_type",
+    "resource_set_attributes",
     "version_specific_attributes",
 )
 load(
     "compile_commands.bzl",
+    "PACKAGE_FILTER_ATTRIBUTES",
     "compile_commands_aspect",
     "compile_commands_impl",
+    "get_platform_alias",
     "platforms_transition",
 )
 load(
     "per_file.bzl",
+    "HTML_ATTRIBUTES",
+    "html_report",
+    "per_file_suite_test",
     "per_file_test",
 )
-
-def get_platform_alias(platform):
-    """
-    Get platform alias for full platform names being used
-
-    Returns:
-    string: If the full platform name is consistent with
-    valid syntax, returns the short alias to represent it.
-    Returns the original platform passed otherwise
-    """
-    if platform.startswith("@platforms"):
-        (_, _, shortname) = platform.partition(":")
-        platform = shortname
-    return platform
+load(
+    "toolchains.bzl",
+    "clang_toolchain_info",
+    "clang_toolchain_type",
+    "codechecker_analyzer_env",
+    "codechecker_toolchain_info",
+    "codechecker_toolchain_type",
+)
 
 def _codechecker_impl(ctx):
     # Get compile_commands.json file and source files
@@ -66,8 +63,9 @@ def _codechecker_impl(ctx):
             source_files = output.default_runfiles.files.to_list()
     if not compile_commands:
         fail("Failed to generate compile_commands.json file!")
-    if not source_files:
-        fail("Failed to collect source files!")
+
+    # source_files may be empty, if every translation unit is filtered out
+    # (e.g. unrelated changed files), the analysis then reports nothing
     if compile_commands != ctx.outputs.compile_commands:
         fail("Seems compile_commands.json file is incorrect!")
 
@@ -95,8 +93,22 @@ def _codechecker_impl(ctx):
     )
 
     config_file, codechecker_env = get_config_file(ctx)
+    codechecker_toolchain = codechecker_toolchain_info(ctx)
+    analyzer_bin = codechecker_analyzer_env(ctx)
+    if analyzer_bin:
+        env_list = [codechecker_env] if codechecker_env else []
+        codechecker_env = "; ".join(env_list + ["CC_ANALYZER_BIN=" + analyzer_bin])
 
-    codechecker_files = ctx.actions.declare_directory(ctx.label.name + "/codechecker-files")
+    codechecker_files_path = ctx.label.name + "/codechecker-files"
+    if ctx.attr.archive:
+        # A single output file instead of a tree of thousands of files
+        codechecker_files = ctx.actions.declare_file(
+            codechecker_files_path + ".tar.gz",
+        )
+        codechecker_files_dir = codechecker_files.path[:-len(".tar.gz")]
+    else:
+        codechecker_files = ctx.actions.declare_directory(codechecker_files_path)
+        codechecker_files_dir = codechecker_files.path
     ctx.actions.expand_template(
         template = ctx.file._codechecker_script_template,
         output = ctx.outputs.codechecker_script,
@@ -105,14 +117,23 @@ def _codechecker_impl(ctx):
             "{Mode}": "Run",
             "{Verbosity}": "DEBUG",
             "{PythonPath}": python_path(ctx),  # "/usr/bin/env python3",
-            "{codechecker_bin}": CODECHECKER_BIN_PATH,
+            "{codechecker_bin}": codechecker_toolchain.codechecker_bin,
             "{compile_commands}": ctx.outputs.codechecker_commands.path,
             "{codechecker_skipfile}": ctx.outputs.codechecker_skipfile.path,
             "{codechecker_config}": config_file.path,
             "{codechecker_analyze}": " ".join(ctx.attr.analyze),
-            "{codechecker_files}": codechecker_files.path,
+            "{codechecker_jobs}": str(ctx.attr.jobs),
+            "{codechecker_timeout}": str(ctx.attr.analysis_timeout),
+            "{codechecker_timeout_fatal}": str(
+                ctx.attr.analysis_timeout_fatal,
+            ),
+            "{codechecker_files}": codechecker_files_dir,
+            "{codechecker_archive}": codechecker_files.path if ctx.attr.archive else "",
             "{codechecker_log}": ctx.outputs.codechecker_log.path,
+            "{codechecker_timings}": ctx.outputs.codechecker_timings.path,
+            "{codechecker_summary}": ctx.outputs.codechecker_summary.path,
             "{codechecker_env}": codechecker_env,
+            "{codechecker_paths}": ctx.file._codechecker_paths_script.dirname,
         },
     )
 
@@ -122,12 +143,19 @@ def _codechecker_impl(ctx):
                 ctx.outputs.codechecker_script,
                 ctx.outputs.codechecker_commands,
                 ctx.outputs.codechecker_skipfile,
+                ctx.file._codechecker_paths_script,
                 config_file,
             ] + source_files,
+            transitive = [
+                codechecker_toolchain.files,
+                clang_toolchain_info(ctx).files,
+            ],
         ),
         outputs = [
             codechecker_files,
             ctx.outputs.codechecker_log,
+            ctx.outputs.codechecker_timings,
+            ctx.outputs.codechecker_summary,
         ],
         executable = ctx.outputs.codechecker_script,
         arguments = [],
@@ -136,6 +164,7 @@ def _codechecker_impl(ctx):
         mnemonic = "CodeChecker",
         progress_message = "CodeChecker %s" % str(ctx.label),
         # use_default_shell_env = True,
+        **resource_set_attributes(CODECHECKER_RESOURCES[ctx.attr.jobs])
     )
 
     # List all files required at build and run (test) time
@@ -147,12 +176,22 @@ def _codechecker_impl(ctx):
         codechecker_files,
         ctx.outputs.codechecker_script,
         ctx.outputs.codechecker_log,
+        ctx.outputs.codechecker_timings,
+        ctx.outputs.codechecker_summary,
     ] + source_files
 
-    # List files required for test
-    run_files = [
-        codechecker_files,
-    ] + source_files
+    # The test reads only the summary, so with --remote_download_minimal
+    # the reports are downloaded only if requested (codechecker_files)
+    run_files = [ctx.outputs.codechecker_summary]
+
+    # Rendered only on demand (codechecker_html output group)
+    report = html_report(
+        ctx,
+        ctx.label.name + "/codechecker-html",
+        [codechecker_files],
+        depset(source_files),
+        config_file,
+    )
 
     # Return all files
     return [
@@ -162,6 +201,9 @@ def _codechecker_impl(ctx):
         ),
         OutputGroupInfo(
             codechecker_files = depset([codechecker_files]),
+            codechecker_timings = depset([ctx.outputs.codechecker_timings]),
+            codechecker_summary = depset([ctx.outputs.codechecker_summary]),
+            codechecker_html = depset([report]),
         ),
     ]
 
@@ -187,6 +229,27 @@ codechecker = rule(
             default = [],
             doc = "List of analyze command arguments, e.g.; --ctu.",
         ),
+        "jobs": attr.int(
+            default = 4,
+            values = CODECHECKER_RESOURCES.keys(),
+            doc = "Number of CodeChecker analyze jobs. " +
+                  "Bazel reserves the same number of cores for the action.",
+        ),
+        "analysis_timeout": attr.int(
+            default = 0,
+            doc = "Time budget of each translation unit in seconds, " +
+                  "0 means no limit. Timed out files are reported " +
+                  "but do not fail the build.",
+        ),
+        "analysis_timeout_fatal": attr.bool(
+            default = False,
+            doc = "Fail the analysis if any translation unit timed out",
+        ),
+        "archive": attr.bool(
+            default = False,
+            doc = "Pack the analysis outputs into a single " +
+                  "codechecker-files.tar.gz instead of a directory",
+        ),
         "_compile_commands_filter": attr.label(
             allow_files = True,
             executable = True,
@@ -197,15 +260,25 @@ codechecker = rule(
             default = ":codechecker_script.py",
             allow_single_file = True,
         ),
-    },
+        "_codechecker_paths_script": attr.label(
+            default = ":codechecker_paths.py",
+            allow_single_file = True,
+        ),
+    } | PACKAGE_FILTER_ATTRIBUTES | HTML_ATTRIBUTES,
     outputs = {
         "compile_commands": "%{name}/compile_commands.json",
         "codechecker_commands": "%{name}/codechecker_commands.json",
         "codechecker_skipfile": "%{name}/codechecker_skipfile.cfg",
         "codechecker_script": "%{name}/codechecker_script.py",
         "codechecker_log": "%{name}/codechecker.log",
+        "codechecker_timings": "%{name}/codechecker_timings.json",
+        "codechecker_summary": "%{name}/summary.json",
     },
-    toolchains = [python_toolchain_type()],
+    toolchains = [
+        python_toolchain_type(),
+        codechecker_toolchain_type(),
+        clang_toolchain_type(),
+    ],
 )
 
 def _codechecker_test_impl(ctx):
@@ -214,11 +287,13 @@ def _codechecker_test_impl(ctx):
     all_files = []
     default_runfiles = []
     codechecker_files = []
+    output_groups = None
     for output in info:
         if type(output) == "DefaultInfo":
             all_files = output.files.to_list()
             default_runfiles = output.default_runfiles.files.to_list()
         if type(output) == "OutputGroupInfo":
+            output_groups = output
             codechecker_files = output.codechecker_files.to_list()[0]
     if not all_files:
         fail("Files required for codechecker test are not available")
@@ -226,6 +301,9 @@ def _codechecker_test_impl(ctx):
         fail("Execution results required for codechecker test are not available")
 
     # Create test script from template
+    baseline = ctx.file.baseline.short_path if ctx.file.baseline else ""
+    paths_dir = ctx.file._codechecker_paths_script.short_path
+    paths_dir = paths_dir[:-len(ctx.file._codechecker_paths_script.basename)]
     ctx.actions.expand_template(
         template = ctx.file._codechecker_script_template,
         output = ctx.outputs.codechecker_test_script,
@@ -234,20 +312,27 @@ def _codechecker_test_impl(ctx):
             "{Mode}": "Test",
             "{Verbosity}": "INFO",
             "{PythonPath}": python_path(ctx),  # "/usr/bin/env python3",
-            "{codechecker_bin}": CODECHECKER_BIN_PATH,
+            "{codechecker_bin}": codechecker_toolchain_info(ctx).codechecker_bin,
             "{codechecker_files}": codechecker_files.short_path,
+            "{codechecker_summary}": ctx.outputs.codechecker_summary.short_path,
+            "{codechecker_summary_script}": ctx.file._codechecker_summary_script.short_path,
             "{Severities}": " ".join(ctx.attr.severities),
+            "{codechecker_baseline}": baseline,
+            "{codechecker_paths}": paths_dir,
         },
     )
 
     # Return test script and all required files
-    run_files = default_runfiles + [ctx.outputs.codechecker_test_script]
+    run_files = default_runfiles + [ctx.outputs.codechecker_test_script] + \
+                ctx.files.baseline + ctx.files._codechecker_summary_script + \
+                ctx.files._codechecker_paths_script
     return [
         DefaultInfo(
             files = depset(all_files),
             runfiles = ctx.runfiles(files = run_files),
             executable = ctx.outputs.codechecker_test_script,
         ),
+        output_groups,
     ]
 
 _codechecker_test = rule(
@@ -274,10 +359,24 @@ _codechecker_test = rule(
             default = ":codechecker_script.py",
             allow_single_file = True,
         ),
+        "_codechecker_summary_script": attr.label(
+            default = ":codechecker_summary.py",
+            allow_single_file = True,
+        ),
+        "_codechecker_paths_script": attr.label(
+            default = ":codechecker_paths.py",
+            allow_single_file = True,
+        ),
         "severities": attr.string_list(
             default = ["HIGH"],
             doc = "List of defect severities: HIGH, MEDIUM, LOW, STYLE etc",
         ),
+        "baseline": attr.label(
+            default = None,
+            allow_single_file = [".baseline"],
+            doc = "Report hashes of accepted findings in CodeChecker " +
+                  ".baseline format, only other reports fail the test",
+        ),
         "skip": attr.string_list(
             default = [],
             doc = "List of skip/ignore file rules. " +
@@ -292,16 +391,43 @@ _codechecker_test = rule(
             default = [],
             doc = "List of analyze command arguments, e.g. --ctu",
         ),
-    } | version_specific_attributes(),
+        "jobs": attr.int(
+            default = 4,
+            values = CODECHECKER_RESOURCES.keys(),
+            doc = "Number of CodeChecker analyze jobs. " +
+                  "Bazel reserves the same number of cores for the action.",
+        ),
+        "analysis_timeout": attr.int(
+            default = 0,
+            doc = "Time budget of each translation unit in seconds, " +
+                  "0 means no limit. Timed out files are reported " +
+                  "but do not fail the build.",
+        ),
+        "analysis_timeout_fatal": attr.bool(
+            default = False,
+            doc = "Fail the analysis if any translation unit timed out",
+        ),
+        "archive": attr.bool(
+            default = False,
+            doc = "Pack the analysis outputs into a single " +
+                  "codechecker-files.tar.gz instead of a directory",
+        ),
+    } | PACKAGE_FILTER_ATTRIBUTES | HTML_ATTRIBUTES | version_specific_attributes(),
     outputs = {
         "compile_commands": "%{name}/compile_commands.json",
         "codechecker_commands": "%{name}/codechecker_commands.json",
         "codechecker_skipfile": "%{name}/codechecker_skipfile.cfg",
         "codechecker_script": "%{name}/codechecker_script.py",
         "codechecker_log": "%{name}/codechecker.log",
+        "codechecker_timings": "%{name}/codechecker_timings.json",
+        "codechecker_summary": "%{name}/summary.json",
         "codechecker_test_script": "%{name}/codechecker_test_script.py",
     },
-    toolchains = [python_toolchain_type()],
+    toolchains = [
+        python_toolchain_type(),
+        codechecker_toolchain_type(),
+        clang_toolchain_type(),
+    ],
     test = True,
 )
 
@@ -313,8 +439,13 @@ def codechecker_test(
         skip = [],
         config = None,
         analyze = [],
+        jobs = 4,
+        analysis_timeout = 0,
+        analysis_timeout_fatal = False,
         tags = [],
         per_file = False,
+        baseline = None,
+        archive = False,
         **kwargs):
     """ Bazel test to run CodeChecker """
     codechecker_tags = [] + tags
@@ -326,6 +457,12 @@ def codechecker_test(
             targets = targets,
             options = analyze,
             config = config,
+            skip = skip,
+            baseline = baseline,
+            severities = severities,
+            archive = archive,
+            analysis_timeout = analysis_timeout,
+            analysis_timeout_fatal = analysis_timeout_fatal,
             tags = tags,
             **kwargs
         )
@@ -336,8 +473,13 @@ def codechecker_test(
             targets = targets,
             severities = severities,
             skip = skip,
+            baseline = baseline,
+            archive = archive,
             config = config,
             analyze = analyze,
+            jobs = jobs,
+            analysis_timeout = analysis_timeout,
+            analysis_timeout_fatal = analysis_timeout_fatal,
             tags = codechecker_tags,
             **kwargs
         )
@@ -350,9 +492,45 @@ def codechecker_suite(
         skip = [],
         config = None,
         analyze = [],
+        jobs = 4,
+        analysis_timeout = 0,
+        analysis_timeout_fatal = False,
         tags = [],
+        dedupe = False,
+        analyze_external = True,
+        include_packages = [],
+        exclude_packages = [],
+        baseline = None,
+        archive = False,
         **kwargs):
-    """ Bazel test suite to run CodeChecker for different platforms """
+    """ Bazel test suite to run CodeChecker for different platforms
+
+    With dedupe = True a single per-file test analyzes each distinct
+    translation unit once, and shares its results between the platforms
+    compiling it with the same command. This test is named name, there are
+    no name.<platform> tests, and jobs is not used: every translation unit
+    is analyzed by its own action.
+    """
+    if dedupe:
+        per_file_suite_test(
+            name = name,
+            platforms = platforms,
+            targets = targets,
+            options = analyze,
+            config = config,
+            skip = skip,
+            baseline = baseline,
+            severities = severities,
+            archive = archive,
+            analyze_external = analyze_external,
+            include_packages = include_packages,
+            exclude_packages = exclude_packages,
+            analysis_timeout = analysis_timeout,
+            analysis_timeout_fatal = analysis_timeout_fatal,
+            tags = tags,
+            **kwargs
+        )
+        return
     tests = []
     for platform in platforms:
         shortname = get_platform_alias(platform)
@@ -366,8 +544,16 @@ def codechecker_suite(
             targets = targets,
             severities = severities,
             skip = skip,
+            baseline = baseline,
+            archive = archive,
+            analyze_external = analyze_external,
+            include_packages = include_packages,
+            exclude_packages = exclude_packages,
             config = config,
             analyze = analyze,
+            jobs = jobs,
+            analysis_timeout = analysis_timeout,
+            analysis_timeout_fatal = analysis_timeout_fatal,
             tags = tags,
         )
     native.test_suite(
@@ -0,0 +1,257 @@
+# Copyright 2023 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Render the HTML report of CodeChecker results in separate actions.
+
+render: the plist files are collected from the inputs: plist files,
+directories of plist files and tar.gz archives (see the archive attribute
+of the rules). They are written by the analysis actions in other sandboxes,
+so the source file paths in them are made relative to the execution root,
+then CodeChecker parse --export html renders the report into the output
+directory. The per-file rules render each translation unit separately.
+
+    codechecker_html.py render --codechecker CodeChecker \\
+        --config config.json --output report data/ a_results.tar.gz
+
+index: list the reports of the per translation unit summaries
+(see per_file_script.py) in an index page, linking the report pages
+rendered into the <unit> directories next to it.
+
+    codechecker_html.py index --output index.html a a_summary.json
+"""
+
+import argparse
+import html
+import json
+import logging
+import os
+import plistlib
+import subprocess
+import sys
+import tarfile
+import tempfile
+
+from codechecker_paths import normalize
+
+
+def parse_args():
+    """
+    Parse command line arguments or show help.
+    """
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawTextHelpFormatter,
+        fromfile_prefix_chars="@",
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="debug logging"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    render_parser = subparsers.add_parser(
+        "render", help="render the report pages of CodeChecker results"
+    )
+    render_parser.add_argument("inputs", nargs="*", help="CodeChecker results")
+    render_parser.add_argument(
+        "--output", required=True, help="directory of the HTML report"
+    )
+    render_parser.add_argument(
+        "--codechecker", default="CodeChecker", help="CodeChecker executable"
+    )
+    render_parser.add_argument(
+        "--config", default=None, help="CodeChecker config"
+    )
+    index_parser = subparsers.add_parser(
+        "index", help="index page of the translation units"
+    )
+    index_parser.add_argument("--output", required=True, help="index file")
+    index_parser.add_argument(
+        "units",
+        nargs="*",
+        metavar="UNIT SUMMARY",
+        help="pairs of report directory and summary file",
+    )
+    return parser.parse_args()
+
+
+def local_path(path):
+    """
+    Return the path of a source file relative to the execution root
+    """
+    if os.path.exists(path):
+        return path
+    parts = normalize(path).strip("/").split("/")
+    # Paths already cleaned by the monolithic rule keep the workspace name
+    for start in range(len(parts)):
+        candidate = os.path.join(*parts[start:])
+        if os.path.exists(candidate):
+            return candidate
+    return path
+
+
+def read_plists(path):
+    """
+    Yield (name, plist file object) of a plist file, a directory
+    of plist files or a tar.gz archive
+    """
+    if os.path.isdir(path):
+        for root, _, files in os.walk(path):
+            for name in sorted(files):
+                if name.endswith(".plist"):
+                    with open(os.path.join(root, name), "rb") as handle:
+                        yield name, handle
+    elif path.endswith(".tar.gz"):
+        with tarfile.open(path, "r:gz") as archive:
+            for member in archive.getmembers():
+                if member.isfile() and member.name.endswith(".plist"):
+                    yield os.path.basename(member.name), archive.extractfile(
+                        member
+                    )
+    elif path.endswith(".plist"):
+        with open(path, "rb") as handle:
+            yield os.path.basename(path), handle
+
+
+def collect(inputs, folder):
+    """
+    Copy the plist files of the inputs into folder with local paths,
+    return the number of plist files
+    """
+    count = 0
+    for path in inputs:
+        for name, handle in read_plists(path):
+            content = plistlib.load(handle)
+            content["files"] = [
+                local_path(filename) for filename in content.get("files", [])
+            ]
+            with open(os.path.join(folder, name), "wb") as output:
+                plistlib.dump(content, output)
+            count += 1
+    return count
+
+
+def render(codechecker, config, folder, output):
+    """
+    Run CodeChecker parse --export html
+    """
+    command = [codechecker, "parse", folder, "--export", "html"]
+    command += ["--output", output]
+    if config:
+        command += ["--config", config]
+    logging.debug("Running: %s", " ".join(command))
+    process = subprocess.run(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        universal_newlines=True,
+        check=False,
+    )
+    logging.debug("%s", process.stdout)
+    # CodeChecker parse returns 2 if there are reports
+    if process.returncode not in (0, 2):
+        logging.error("CodeChecker parse failed:\n%s", process.stdout)
+        sys.exit(1)
+
+
+INDEX_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>CodeChecker reports</title>
+</head>
+<body>
+<h1>CodeChecker reports</h1>
+<p>{units} translation units, {count} reports: {severities}</p>
+<table>
+<tr><th>File</th><th>Line</th><th>Severity</th><th>Checker</th>
+<th>Message</th></tr>
+{rows}
+</table>
+</body>
+</html>
+"""
+
+INDEX_ROW = (
+    '<tr><td><a href="{link}">{file}</a></td><td>{line}</td>'
+    "<td>{severity}</td><td>{checker}</td><td>{message}</td></tr>"
+)
+
+
+def index(units, output):
+    """
+    Write the index page of the reports of the translation units,
+    a report of a header included by several units is listed once
+    """
+    reports = {}
+    for unit, summary_file in zip(units[::2], units[1::2]):
+        with open(summary_file, encoding="utf-8") as handle:
+            summary = json.load(handle)
+        for finding in summary.get("findings", []):
+            path = normalize(finding["file"])
+            key = (path, finding.get("line"), finding.get("report_hash"))
+            page = f"{unit}_{finding.get('analyzer_name')}.plist.html"
+            reports.setdefault(key, (finding, f"{unit}/{page}"))
+    severities = {}
+    rows = []
+    for key in sorted(reports, key=str):
+        finding, link = reports[key]
+        severity = finding.get("severity", "UNSPECIFIED")
+        severities[severity] = severities.get(severity, 0) + 1
+        rows.append(INDEX_ROW.format(
+            link=html.escape(
+                f"{link}#reportHash={finding.get('report_hash')}"
+            ),
+            file=html.escape(key[0]),
+            line=key[1],
+            severity=html.escape(severity),
+            checker=html.escape(finding.get("checker_name", "")),
+            message=html.escape(finding.get("message", "")),
+        ))
+    with open(output, "w", encoding="utf-8") as handle:
+        handle.write(INDEX_PAGE.format(
+            units=len(units) // 2,
+            count=len(rows),
+            severities=html.escape(", ".join(
+                f"{severity} {count}"
+                for severity, count in sorted(severities.items())
+            )),
+            rows="\n".join(rows),
+        ))
+
+
+def main():
+    """
+    Main function
+    """
+    options = parse_args()
+    logging.basicConfig(
+        format="[HTML] %(levelname)5s: %(message)s",
+        level=logging.DEBUG if options.verbose else logging.INFO,
+    )
+    if options.command == "index":
+        if len(options.units) % 2:
+            logging.error("UNIT and SUMMARY arguments must be pairs")
+            sys.exit(1)
+        index(options.units, options.output)
+        return
+    os.makedirs(options.output, exist_ok=True)
+    with tempfile.TemporaryDirectory() as folder:
+        count = collect(options.inputs, folder)
+        logging.debug("Collected %d plist files", count)
+        if count:
+            render(options.codechecker, options.config, folder, options.output)
+
+
+if __name__ == "__main__":
+    main()
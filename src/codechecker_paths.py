@@ -0,0 +1,31 @@
+# Copyright 2023 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+File paths of the analysis results, shared by the helper scripts.
+The actions run in sandboxes of the execution root, so the absolute
+paths they write are made relative to the execution root.
+"""
+
+import re
+
+# Absolute path of a file in the execution root or in a sandbox of it
+EXECROOT = re.compile(r"^/.*/execroot/[^/]+/")
+
+
+def normalize(path):
+    """
+    Return path relative to the execution root
+    """
+    return EXECROOT.sub("", path or "")
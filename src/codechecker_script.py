@@ -19,13 +19,28 @@ CodeChecker Bazel build & test wrapper script
 """
 
 from __future__ import print_function
+import functools
+import gzip
+import json
 import logging
 import os
 import plistlib
 import re
 import shlex
+import shutil
 import subprocess
 import sys
+import tarfile
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from html import unescape
+from xml.sax.saxutils import escape
+
+# Directory of the modules shared with the helper scripts
+sys.path.insert(0, "{codechecker_paths}")
+# pylint: disable=wrong-import-position
+from codechecker_paths import normalize
 
 
 EXECUTION_MODE = "{Mode}"
@@ -34,13 +49,52 @@ CODECHECKER_PATH = "{codechecker_bin}"
 CODECHECKER_SKIPFILE = "{codechecker_skipfile}"
 CODECHECKER_CONFIG = "{codechecker_config}"
 CODECHECKER_ANALYZE = "{codechecker_analyze}"
+CODECHECKER_JOBS = "{codechecker_jobs}"
+CODECHECKER_TIMEOUT = "{codechecker_timeout}"
+CODECHECKER_TIMEOUT_FATAL = "{codechecker_timeout_fatal}"
 CODECHECKER_FILES = "{codechecker_files}"
+# Single compressed archive of CODECHECKER_FILES, empty if not archived
+CODECHECKER_ARCHIVE = "{codechecker_archive}"
 CODECHECKER_LOG = "{codechecker_log}"
+CODECHECKER_TIMINGS = "{codechecker_timings}"
+# Report counts and hashes, the only input of the test
+CODECHECKER_SUMMARY = "{codechecker_summary}"
+# Gate of the tests (check subcommand), shared with the per-file rules
+CODECHECKER_SUMMARY_SCRIPT = "{codechecker_summary_script}"
 CODECHECKER_SEVERITIES = "{Severities}"
+# Report hashes of accepted findings, in CodeChecker .baseline format
+CODECHECKER_BASELINE = "{codechecker_baseline}"
 CODECHECKER_ENV = "{codechecker_env}"
 COMPILE_COMMANDS = "{compile_commands}"
 
 START_PATH = r"\/(?:(?!\.\s+)\S)+"
+# CodeChecker log messages of an analysis killed by --timeout
+TIMEOUT_WARNING = "Analyzer ran too long"
+FAILED_ANALYSIS = re.compile(r"Analyzing (.+) with (\S+) .*failed!")
+# Exit code of CodeChecker analyze if any analysis failed or timed out
+ANALYZE_FAILED = 3
+# Container, key and string elements of XML plist files, CodeChecker
+# escapes "<" in the strings, other writers may use CDATA sections
+PLIST_TOKEN = re.compile(
+    r"<(?P<close>/?)(?P<tag>dict|array)\s*(?P<empty>/?)>"
+    r"|<key>(?P<key>[^<]*)</key>"
+    r"|<string>(?:(?P<string>[^<]*)|<!\[CDATA\[(?P<cdata>.*?)\]\]>)</string>"
+    r"|<!\[CDATA\[.*?\]\]>",
+    re.DOTALL,
+)
+# Elements which may not be split between two rewritten chunks, from the
+# innermost one
+PLIST_OPEN_ELEMENTS = [
+    ("<![CDATA[", "]]>"),
+    ("<string>", "</string>"),
+    ("<key>", "</key>"),
+]
+# Characters read at once by the streaming path rewrites
+STREAM_CHUNK = 64 * 1024
+# File path fields of clang-tidy fix exports (YAML)
+YAML_PATH_FIELD = re.compile(
+    r"(?:MainSourceFile:\s*|\s*-? FilePath:\s*)'(?P<path>.*)'"
+)
 BAZEL_PATHS = {
     r"\/sandbox\/processwrapper-sandbox\/\S*\/execroot\/": "/execroot/",
     START_PATH + r"\/worker\/build\/[0-9a-fA-F]{16}\/root\/": "",
@@ -132,17 +186,24 @@ def input_data():
     logging.debug("CODECHECKER_SKIPFILE : %s", str(CODECHECKER_SKIPFILE))
     logging.debug("CODECHECKER_CONFIG   : %s", str(CODECHECKER_CONFIG))
     logging.debug("CODECHECKER_ANALYZE  : %s", str(CODECHECKER_ANALYZE))
+    logging.debug("CODECHECKER_JOBS     : %s", str(CODECHECKER_JOBS))
+    logging.debug("CODECHECKER_TIMEOUT  : %s", str(CODECHECKER_TIMEOUT))
+    logging.debug("CODECHECKER_TIMEOUT_FATAL : %s",
+                  str(CODECHECKER_TIMEOUT_FATAL))
     logging.debug("CODECHECKER_FILES    : %s", str(CODECHECKER_FILES))
     logging.debug("CODECHECKER_LOG      : %s", str(CODECHECKER_LOG))
+    logging.debug("CODECHECKER_TIMINGS  : %s", str(CODECHECKER_TIMINGS))
+    logging.debug("CODECHECKER_SUMMARY  : %s", str(CODECHECKER_SUMMARY))
     logging.debug("CODECHECKER_ENV      : %s", str(CODECHECKER_ENV))
+    logging.debug("CODECHECKER_BASELINE : %s", str(CODECHECKER_BASELINE))
+    logging.debug("CODECHECKER_ARCHIVE  : %s", str(CODECHECKER_ARCHIVE))
     logging.debug("COMPILE_COMMANDS     : %s", str(COMPILE_COMMANDS))
     logging.debug("")
 
 
-def execute(cmd, env=None, codes=None):
-    """ Execute CodeChecker commands """
-    if codes is None:
-        codes = [0]
+def run_command(cmd, env=None):
+    """ Run a command, return its exit code, stdout and stderr """
+    logging.debug("Executing: %s", cmd)
     with subprocess.Popen(
         cmd,
         env=env,
@@ -152,12 +213,21 @@ def execute(cmd, env=None, codes=None):
         stderr=subprocess.PIPE,
     ) as process:
         stdout, stderr = process.communicate()
-        stdout = stdout.decode("utf-8")
-        stderr = stderr.decode("utf-8")
-        if process.returncode not in codes:
-            fail(f"\ncommand: {cmd}\nstdout: {stdout}\nstderr: {stderr}\n")
-        logging.debug("Executing: %s", cmd)
-        # logging.debug("Output:\n\n%s\n", stdout)
+    return (
+        process.returncode,
+        stdout.decode("utf-8"),
+        stderr.decode("utf-8"),
+    )
+
+
+def execute(cmd, env=None, codes=None):
+    """ Execute CodeChecker commands """
+    if codes is None:
+        codes = [0]
+    returncode, stdout, stderr = run_command(cmd, env=env)
+    if returncode not in codes:
+        fail(f"\ncommand: {cmd}\nstdout: {stdout}\nstderr: {stderr}\n")
+    # logging.debug("Output:\n\n%s\n", stdout)
     return stdout
 
 
@@ -191,18 +261,75 @@ def analyze():
     output = execute(f"{CODECHECKER_PATH} analyzers --details", env=env)
     logging.debug("Analyzers:\n\n%s", output)
 
+    # Every translation unit may be filtered out, e.g. in changed-files mode
+    if not json.loads(read_file(COMPILE_COMMANDS)):
+        logging.info("No translation units to analyze")
+        create_folder(CODECHECKER_FILES + "/data")
+        return
+
     command = f"{CODECHECKER_PATH} analyze --skip={CODECHECKER_SKIPFILE} " \
               f"{COMPILE_COMMANDS} --output={CODECHECKER_FILES}/data " \
-              f"--config {CODECHECKER_CONFIG} {CODECHECKER_ANALYZE}"
+              f"--config {CODECHECKER_CONFIG} --jobs {CODECHECKER_JOBS} " \
+              f"{CODECHECKER_ANALYZE}"
+    if valid_parameter(CODECHECKER_TIMEOUT) and int(CODECHECKER_TIMEOUT):
+        command += f" --timeout {CODECHECKER_TIMEOUT}"
     # FIXME: Workaround "CodeChecker simply remove compiler-rt include path".
     # This can be removed once codechecker 6.16.0 is used.
     # command += " --keep-gcc-intrin"
     logging.info("Running CodeChecker analyze...")
-    output = execute(command, env=env)
+    # CodeChecker analyze exits with ANALYZE_FAILED if any analysis failed,
+    # timed out analyses are classified from the output
+    returncode, output, stderr = run_command(command, env=env)
     logging.info("Output:\n\n%s\n", output)
-    if output.find("- Failed to analyze") != -1:
-        logging.error("CodeChecker failed to analyze some files")
-        fail("Make sure that the target can be built first")
+    if returncode not in [0, ANALYZE_FAILED]:
+        fail(f"\ncommand: {command}\nstdout: {output}\nstderr: {stderr}\n")
+    output += stderr
+    if returncode or output.find("- Failed to analyze") != -1:
+        timeouts = timed_out_analyses(output)
+        if not timeouts:
+            logging.error("CodeChecker failed to analyze some files")
+            fail("Make sure that the target can be built first")
+        save_timeouts(timeouts)
+        if CODECHECKER_TIMEOUT_FATAL == "True":
+            fail(f"CodeChecker analysis timed out: {timeouts}")
+
+
+def timed_out_analyses(output):
+    """
+    Return the analyses killed by the CodeChecker --timeout option,
+    or empty list if any analysis failed for another reason
+    """
+    failures = FAILED_ANALYSIS.findall(output)
+    if not failures or output.count(TIMEOUT_WARNING) < len(failures):
+        return []
+    return [
+        {"file": source, "analyzer": analyzer}
+        for source, analyzer in sorted(set(failures))
+    ]
+
+
+def save_timeouts(timeouts):
+    """ Save the timed out analyses next to the results """
+    for timeout in timeouts:
+        logging.warning(
+            "Analysis of %s with %s timed out after %s seconds",
+            timeout["file"],
+            timeout["analyzer"],
+            CODECHECKER_TIMEOUT,
+        )
+    with open(
+        CODECHECKER_FILES + "/timeouts.json", "w", encoding="utf-8"
+    ) as handle:
+        json.dump(timeouts, handle, indent=2)
+
+
+def read_timeouts():
+    """ Return the file names of timed out analyses """
+    timeouts_file = CODECHECKER_FILES + "/timeouts.json"
+    if not os.path.isfile(timeouts_file):
+        return set()
+    with open(timeouts_file, encoding="utf-8") as handle:
+        return {timeout["file"] for timeout in json.load(handle)}
 
 
 def fix_bazel_paths():
@@ -224,6 +351,7 @@ def fix_bazel_paths():
     logging.info("Fixed Bazel paths in %d files", counter)
 
 
+@functools.lru_cache(maxsize=None)
 def realpath(filename):
     """ Return real full absolute path for given filename """
     if os.path.exists(filename):
@@ -233,8 +361,108 @@ def realpath(filename):
     return filename
 
 
+class PlistFilesRewriter:
+    """
+    Rewrites the paths of the top level "files" array of an XML plist
+    chunk by chunk, everything else is copied through unchanged.
+    The end of a chunk, which may split an element, is kept back until
+    the next chunk.
+    """
+
+    def __init__(self):
+        # Number of open dict and array elements
+        self.depth = 0
+        # The last key of the top level dict was "files"
+        self.files_key = False
+        self.in_files = False
+        self.updated = 0
+        # Text of the previous chunks not rewritten yet
+        self.pending = ""
+
+    def token(self, match):
+        """ Update the state by a token, return its rewritten text """
+        if match.group("key") is not None:
+            self.files_key = self.depth == 1 and match.group("key") == "files"
+            return match.group(0)
+        if (
+            match.group("string") is not None
+            or match.group("cdata") is not None
+        ):
+            self.files_key = False
+            if not self.in_files or self.depth != 2:
+                return match.group(0)
+            if match.group("cdata") is not None:
+                filename = match.group("cdata")
+            else:
+                filename = unescape(match.group("string"))
+            fullpath = realpath(filename)
+            if fullpath == filename:
+                return match.group(0)
+            self.updated += 1
+            return f"<string>{escape(fullpath)}</string>"
+        if match.group("tag") is None:
+            # CDATA section outside of a string
+            return match.group(0)
+        if match.group("empty"):
+            self.files_key = False
+        elif match.group("close"):
+            if self.in_files and self.depth == 2:
+                self.in_files = False
+            self.depth -= 1
+        else:
+            self.depth += 1
+            self.in_files = self.files_key and match.group("tag") == "array"
+            self.files_key = False
+        return match.group(0)
+
+    def rewrite(self, chunk):
+        """
+        Return the text of the chunk and the pending text ready to write,
+        with the paths of the files array resolved
+        """
+        text = self.pending + chunk
+        end = text.rfind(">") + 1
+        for start_tag, end_tag in PLIST_OPEN_ELEMENTS:
+            start = text.rfind(start_tag, 0, end)
+            if start != -1 and text.find(end_tag, start, end) == -1:
+                end = start
+        self.pending = text[end:]
+        return PLIST_TOKEN.sub(self.token, text[:end])
+
+    def flush(self):
+        """ Return the rest of the text, at the end of the file """
+        text, self.pending = self.pending, ""
+        return PLIST_TOKEN.sub(self.token, text)
+
+
 def resolve_plist_symlinks(filepath):
-    """ Resolve the symbolic links in plist files to real file paths """
+    """
+    Resolve the symbolic links in plist files to real file paths,
+    XML plist files are streamed through a temporary file
+    """
+    with open(filepath, "rb") as input_file:
+        binary = input_file.read(6) == b"bplist"
+    if binary:
+        resolve_binary_plist_symlinks(filepath)
+        return
+    logging.info("Processing plist file: %s", filepath)
+    rewriter = PlistFilesRewriter()
+    temporary = filepath + ".tmp"
+    with open(filepath, "r", encoding="utf-8", newline="") as input_file, open(
+        temporary, "w", encoding="utf-8", newline=""
+    ) as output_file:
+        for chunk in iter(lambda: input_file.read(STREAM_CHUNK), ""):
+            output_file.write(rewriter.rewrite(chunk))
+        output_file.write(rewriter.flush())
+    if rewriter.updated:
+        logging.debug("     %d updated paths", rewriter.updated)
+        os.replace(temporary, filepath)
+    else:
+        os.remove(temporary)
+
+
+def resolve_binary_plist_symlinks(filepath):
+    """ Resolve the symbolic links in binary plist files to real paths """
     # plistlib replaced readPlist/writePlist with load/dump in Python 3.9.
     # Since Pylint analyzes every line,
     # it flags the methods missing in the current environment.
@@ -258,34 +486,35 @@ def resolve_plist_symlinks(filepath):
 
 
 def resolve_yaml_symlinks(filepath):
-    """ Resolve the symbolic links in YAML files to real file paths """
+    """
+    Resolve the symbolic links in YAML files to real file paths,
+    the file is streamed through a temporary file
+    """
     logging.info("Processing YAML file: %s", filepath)
-    fields = [
-        r"MainSourceFile:\s*",
-        r"\s*-? FilePath:\s*",
-    ]
     updated = 0
-    line_to_write = []
-    with open(filepath, "r", encoding="utf-8") as input_file:
-        for line in input_file.readlines():
-            for field in fields:
-                pattern = f"({field})'(.*)'"
-                match = re.match(pattern, line)
-                if match:
-                    field = match.group(1)
-                    filename = match.group(2)
-                    fullpath = realpath(filename)
-                    if fullpath != filename:
-                        updated += 1
-                        replace = f"{field}'{fullpath}'\r\n"
-                        line = replace
-                    break
-            line_to_write.append(line)
+    temporary = filepath + ".tmp"
+    with open(filepath, "r", encoding="utf-8", newline="") as input_file, open(
+        temporary, "w", encoding="utf-8", newline=""
+    ) as output_file:
+        for line in input_file:
+            match = YAML_PATH_FIELD.match(line)
+            if match:
+                # Quotes are doubled in single-quoted YAML scalars
+                filename = match.group("path").replace("''", "'")
+                fullpath = realpath(filename)
+                if fullpath != filename:
+                    updated += 1
+                    line = (
+                        line[:match.start("path")]
+                        + fullpath.replace("'", "''")
+                        + line[match.end("path"):]
+                    )
+            output_file.write(line)
     if updated:
         logging.debug("     %d updated paths", updated)
-        with open(filepath, "w", encoding="utf-8") as output_file:
-            logging.debug("     saving...")
-            output_file.writelines(line_to_write)
+        os.replace(temporary, filepath)
+    else:
+        os.remove(temporary)
 
 
 def resolve_symlinks():
@@ -318,90 +547,311 @@ def update_file_paths():
     resolve_symlinks()
 
 
+def parse_jobs():
+    """ Number of parallel CodeChecker parse processes """
+    if valid_parameter(CODECHECKER_JOBS) and CODECHECKER_JOBS.isdigit():
+        return max(int(CODECHECKER_JOBS), 1)
+    return os.cpu_count() or 1
+
+
+def plist_shards(folder, count):
+    """
+    Partition the plist files of folder into at most count shards
+    of similar total size, the largest files are assigned first
+    """
+    plists = [
+        os.path.join(folder, name)
+        for name in sorted(os.listdir(folder))
+        if name.endswith(".plist")
+    ]
+    plists.sort(key=os.path.getsize, reverse=True)
+    shards = [[] for _ in range(min(count, len(plists)))]
+    sizes = [0] * len(shards)
+    for plist in plists:
+        index = sizes.index(min(sizes))
+        shards[index].append(plist)
+        sizes[index] += os.path.getsize(plist)
+    return [sorted(shard) for shard in shards]
+
+
+def parse_shard(codechecker_parse, shard, folder):
+    """
+    Export the reports of the plist files of a shard in JSON format.
+    The plist files are linked into folder, so the command line stays short
+    however many files the shard has.
+    """
+    os.makedirs(folder)
+    for plist in shard:
+        os.symlink(
+            os.path.abspath(plist),
+            os.path.join(folder, os.path.basename(plist)),
+        )
+    command = f"{codechecker_parse} {shlex.quote(folder)} --export=json"
+    return json.loads(execute(command, codes=[0, 2]) or "{}")
+
+
+def report_key(report):
+    """ Stable order of reports, also identifying duplicates of shards """
+    return (
+        report["file"]["path"],
+        report.get("line", 0),
+        report.get("column", 0),
+        report.get("checker_name", ""),
+        report.get("report_hash", ""),
+    )
+
+
+def merge_reports(shard_results):
+    """
+    Merge the reports of the shards, a header included by sources
+    of different shards is reported by each of them
+    """
+    reports = {}
+    for result in shard_results:
+        for report in result.get("reports", []):
+            reports.setdefault(report_key(report), report)
+    return [reports[key] for key in sorted(reports)]
+
+
 def parse():
-    """ Run CodeChecker parse commands """
+    """
+    Run CodeChecker parse commands: the JSON export of the plist files
+    is sharded over parallel processes, the text result of all files is
+    written by CodeChecker parse in parallel with them. The HTML report
+    is rendered on demand by a separate action (codechecker_html output
+    group).
+    """
     stage("CodeChecker parse:")
-    logging.info("CodeChecker parse -e json")
+    data_folder = CODECHECKER_FILES + "/data"
     codechecker_parse = f"{CODECHECKER_PATH} parse --config " \
-                        f"{CODECHECKER_CONFIG} {CODECHECKER_FILES}/data"
+                        f"{CODECHECKER_CONFIG}"
+    jobs = parse_jobs()
+    shards = plist_shards(data_folder, jobs)
+    logging.info("CodeChecker parse -e json: %d shards", len(shards))
+    with tempfile.TemporaryDirectory() as shards_folder, \
+            ThreadPoolExecutor(max_workers=jobs + 1) as executor:
+        logging.info("CodeChecker parse to text result")
+        text_result = executor.submit(
+            execute,
+            f"{codechecker_parse} {data_folder} > "
+            f"{CODECHECKER_FILES}/result.txt",
+            codes=[0, 2],
+        )
+        shard_results = list(
+            executor.map(
+                lambda index: parse_shard(
+                    codechecker_parse,
+                    shards[index],
+                    os.path.join(shards_folder, str(index)),
+                ),
+                range(len(shards)),
+            )
+        )
+        text_result.result()
+    reports = merge_reports(shard_results)
     # Save results to JSON file
-    command = f"{codechecker_parse} --export=json > " \
-              f"{CODECHECKER_FILES}/result.json"
-    execute(command, codes=[0, 2])
-    # logging.debug(
-    #     "JSON:\n\n%s\n", read_file(CODECHECKER_FILES + "/result.json")
-    # )
-    # Save results as HTML report
-    logging.info("CodeChecker parse -e html")
-    command = (
-        codechecker_parse
-        + " --export=html --output="
-        + CODECHECKER_FILES
-        + "/report"
-    )
-    execute(command, codes=[0, 2])
-    # Save results to text file
-    logging.info("CodeChecker parse to text result")
-    command = codechecker_parse + " > " + CODECHECKER_FILES + "/result.txt"
-    execute(command, codes=[0, 2])
+    with open(
+        CODECHECKER_FILES + "/result.json", "w", encoding="utf-8"
+    ) as result_file:
+        json.dump({"version": 1, "reports": reports}, result_file, indent=1)
     logging.info(
         "Result:\n\n%s\n", read_file(CODECHECKER_FILES + "/result.txt")
     )
 
 
+def timed(timings, name, function):
+    """ Run function and save its duration (in seconds) into timings """
+    start = time.monotonic()
+    function()
+    timings[name] = round(time.monotonic() - start, 3)
+    logging.debug("Stage %s took %.3f s", name, timings[name])
+
+
+def read_metadata():
+    """ Read CodeChecker analyze metadata.json, empty dict if missing """
+    metadata_file = CODECHECKER_FILES + "/data/metadata.json"
+    if not os.path.isfile(metadata_file):
+        return {}
+    with open(metadata_file, encoding="utf-8") as handle:
+        try:
+            metadata = json.load(handle)
+        except ValueError:
+            return {}
+    tools = metadata.get("tools", [])
+    return tools[0] if tools else {}
+
+
+def execroot_path(filename):
+    """ Return filename relative to the execroot, the key of a TU """
+    return normalize(os.path.normpath(filename))
+
+
+def translation_units():
+    """
+    Collect analyzed translation units with their size, status
+    and the size of the analyzer outputs
+    """
+    with open(COMPILE_COMMANDS, encoding="utf-8") as handle:
+        compile_commands = json.load(handle)
+    metadata = read_metadata()
+    status = {}
+    for analyzer in metadata.get("analyzers", {}).values():
+        statistics = analyzer.get("analyzer_statistics", {})
+        for source in statistics.get("failed_sources", []):
+            status[execroot_path(source)] = "failed"
+    for source in read_timeouts():
+        status[execroot_path(source)] = "timeout"
+    output_bytes = {}
+    sources = metadata.get("result_source_files", {})
+    for plist, source in sources.items():
+        plist = os.path.join(CODECHECKER_FILES, "data", os.path.basename(plist))
+        if os.path.isfile(plist):
+            key = execroot_path(source)
+            output_bytes[key] = output_bytes.get(key, 0) + \
+                os.path.getsize(plist)
+    units = []
+    for entry in compile_commands:
+        filename = entry["file"]
+        key = execroot_path(filename)
+        units.append({
+            "file": filename,
+            "size": os.path.getsize(filename)
+            if os.path.isfile(filename) else None,
+            # CodeChecker does not report per file analysis time
+            "duration": None,
+            # The analysis log may name the timed out file by its basename
+            "status": status.get(
+                key, status.get(os.path.basename(key), "ok")
+            ),
+            "output_bytes": output_bytes.get(key, 0),
+        })
+    return units
+
+
+def save_timings(timings):
+    """ Save stage durations and per translation unit data in JSON format """
+    if not valid_parameter(CODECHECKER_TIMINGS):
+        return
+    data = {
+        "version": 1,
+        "mode": "monolithic",
+        "stages": timings,
+        # CodeChecker analyze failures terminate the script earlier
+        "exit_code": 0,
+        "translation_units": translation_units(),
+    }
+    with open(CODECHECKER_TIMINGS, "w", encoding="utf-8") as handle:
+        json.dump(data, handle, indent=2)
+
+
+def archived():
+    """ Analysis outputs are packed into CODECHECKER_ARCHIVE """
+    return valid_parameter(CODECHECKER_ARCHIVE) and bool(CODECHECKER_ARCHIVE)
+
+
+def reset_tarinfo(tarinfo):
+    """ Drop the owner and time of archive members for reproducibility """
+    tarinfo.uid = tarinfo.gid = 0
+    tarinfo.uname = tarinfo.gname = ""
+    tarinfo.mtime = 0
+    return tarinfo
+
+
+def pack():
+    """ Pack CODECHECKER_FILES into a reproducible tar.gz archive """
+    stage("Pack CodeChecker output:")
+    logging.info("Packing %s into %s", CODECHECKER_FILES, CODECHECKER_ARCHIVE)
+    with open(CODECHECKER_ARCHIVE, "wb") as archive_file, gzip.GzipFile(
+        fileobj=archive_file, mode="wb", compresslevel=6, mtime=0
+    ) as compressed, tarfile.open(fileobj=compressed, mode="w") as archive:
+        for name in sorted(os.listdir(CODECHECKER_FILES)):
+            archive.add(
+                os.path.join(CODECHECKER_FILES, name),
+                arcname=name,
+                filter=reset_tarinfo,
+            )
+
+
+def save_summary():
+    """
+    Save the report counts by severity, the report hashes and the timed
+    out files, so the test does not need the analysis outputs
+    """
+    results = json.loads(read_file(CODECHECKER_FILES + "/result.json"))
+    reports = results.get("reports", [])
+    severities = {}
+    for report in reports:
+        severities[report["severity"]] = \
+            severities.get(report["severity"], 0) + 1
+    with open(COMPILE_COMMANDS, encoding="utf-8") as handle:
+        units = len(json.load(handle))
+    summary = {
+        "version": 1,
+        "units": units,
+        "reports": len(reports),
+        "severities": severities,
+        "timeouts": sorted(read_timeouts()),
+        "findings": [
+            {
+                "severity": report["severity"],
+                "report_hash": report.get("report_hash"),
+                "checker_name": report.get("checker_name"),
+                "file": report["file"]["path"],
+                "line": report.get("line"),
+            }
+            for report in reports
+        ],
+    }
+    with open(CODECHECKER_SUMMARY, "w", encoding="utf-8") as handle:
+        json.dump(summary, handle, indent=1)
+
+
 def run():
     """ Perform all steps for "bazel build" phase """
+    timings = {}
     prepare()
-    analyze()
-    parse()
-    update_file_paths()
+    timed(timings, "analyze", analyze)
+    timed(timings, "parse", parse)
+    timed(timings, "fix_bazel_paths", fix_bazel_paths)
+    timed(timings, "resolve_symlinks", resolve_symlinks)
+    timed(timings, "summary", save_summary)
+    if archived():
+        timed(timings, "archive", pack)
+    save_timings(timings)
+    if archived():
+        # Only the archive is declared as output
+        shutil.rmtree(CODECHECKER_FILES)
 
 
 def check_results():
-    """ Check/verify CodeChecker results """
+    """
+    Check/verify CodeChecker results with the gate of codechecker_summary.py
+    """
     stage("Checking result:")
-    # Get results file and read it
-    result_file = CODECHECKER_FILES + "/result.txt"
+    # The test reads only the summary, the reports can stay remote
     logging.info("Find CodeChecker results in bazel-out")
-    logging.info("      all artifacts: %s/", CODECHECKER_FILES)
-    logging.info("      HTML report:   %s/report/index.html", CODECHECKER_FILES)
-    logging.info("      result file:   %s", result_file)
-    results = read_file(result_file)
-    logging.info("Results: \n\n%s\n", results)
-    # Collect defect severities to detect
+    logging.info("      all artifacts: %s", CODECHECKER_FILES)
+    logging.info("      summary file:  %s", CODECHECKER_SUMMARY)
     if not valid_parameter(CODECHECKER_SEVERITIES):
         fail(
             "CodeChecker defect severities are invalid: "
             f"{str(CODECHECKER_SEVERITIES)}"
         )
-    severities = shlex.split(CODECHECKER_SEVERITIES)
-    # Add HIGH severity by default
-    if not severities:
-        severities.append("HIGH")
-    # We should always detect CRITICAL defects
-    if "CRITICAL" not in severities:
-        severities.append("CRITICAL")
-    logging.debug("Severities: %s", str(severities))
-    issues = dict.fromkeys(severities, 0)
-    logging.debug("Issues: %s", str(issues))
-    # Grep results for defects according to severities
-    for issue in issues:
-        found = re.findall(rf"^{issue} .* (\d+)", results, re.M)
-        defects = sum(int(number) for number in found)
-        logging.debug("   %s : %s = %d", issue, str(found), defects)
-        issues[issue] = defects
-    logging.info("Defects: %s", str(issues))
-    # Check collected defects
-    passed = True
-    conclusion = ""
-    for issue, num in issues.items():
-        if num > 0:
-            passed = False
-            conclusion += f"{issue:>15} : {num}\n"
-    if passed:
-        logging.info("No defects found by CodeChecker")
-    else:
-        fail(f"CodeChecker found defects:\n{conclusion}")
+    command = [
+        sys.executable,
+        CODECHECKER_SUMMARY_SCRIPT,
+        "check",
+        CODECHECKER_SUMMARY,
+    ]
+    if valid_parameter(CODECHECKER_BASELINE) and CODECHECKER_BASELINE:
+        command += ["--baseline", CODECHECKER_BASELINE]
+    # The severities must be the last, they take any number of values
+    command += ["--severities"] + shlex.split(CODECHECKER_SEVERITIES)
+    logging.debug("Running: %s", shlex.join(command))
+    sys.stdout.flush()
+    if subprocess.call(command):
+        fail("CodeChecker found defects")
+    logging.info("No defects found by CodeChecker")
 
 
 def test():
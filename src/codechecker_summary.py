@@ -0,0 +1,216 @@
+# Copyright 2023 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Merge the per translation unit results of the per-file rules,
+and gate the test on the merged summary.
+
+merge: collect the findings of the *_summary.json files written by each
+CodeChecker action into the aggregate result.json (the reports in CodeChecker
+JSON format, without bug paths), and the summary.json of the report counts
+and the report hashes.
+A header included by several translation units is reported by each of them,
+these reports are deduplicated by (report hash, file, line, checker).
+
+    codechecker_summary.py merge --result result.json \\
+        --summary summary.json a_summary.json b_summary.json
+
+check: fail if a summary has reports of the given severities,
+which are not in the baseline (CodeChecker .baseline format).
+CRITICAL reports always fail, no given severities mean HIGH.
+This is the gate of every test rule, the summaries of codechecker_test()
+are checked the same way.
+
+    codechecker_summary.py check --baseline accepted.baseline \\
+        summary.json --severities HIGH MEDIUM
+"""
+
+import argparse
+import json
+import logging
+import sys
+
+from codechecker_paths import normalize
+
+# CRITICAL reports always fail the test
+ALWAYS_GATED = "CRITICAL"
+# Gated severities if none are given
+DEFAULT_SEVERITIES = ["HIGH"]
+
+
+def parse_args():
+    """
+    Parse command line arguments or show help.
+    """
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawTextHelpFormatter,
+        description=__doc__,
+        fromfile_prefix_chars="@",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    merge_parser = commands.add_parser(
+        "merge", help="merge the summaries of translation units"
+    )
+    merge_parser.add_argument(
+        "--summary", required=True, help="merged summary file"
+    )
+    merge_parser.add_argument(
+        "--result", required=True, help="merged reports in JSON format"
+    )
+    merge_parser.add_argument(
+        "inputs", nargs="*", help="summaries of translation units"
+    )
+    check_parser = commands.add_parser(
+        "check", help="gate on the reports of a merged summary"
+    )
+    check_parser.add_argument(
+        "summaries", nargs="+", help="merged summary files"
+    )
+    check_parser.add_argument(
+        "--baseline", default=None, help="report hashes to accept"
+    )
+    check_parser.add_argument(
+        "--severities",
+        nargs="*",
+        default=DEFAULT_SEVERITIES,
+        help="severities failing the test (default: HIGH)",
+    )
+    return parser.parse_args()
+
+
+def merge(inputs, result_file, summary_file):
+    """
+    Merge the findings of the translation units, keep the first duplicate
+    """
+    findings = {}
+    duplicates = 0
+    for input_file in inputs:
+        with open(input_file, encoding="utf-8") as handle:
+            unit = json.load(handle)
+        for finding in unit.get("findings", []):
+            finding["file"] = normalize(finding.get("file"))
+            key = (
+                finding["file"],
+                finding.get("line"),
+                finding.get("checker_name"),
+                finding.get("report_hash"),
+            )
+            if key in findings:
+                duplicates += 1
+                continue
+            findings[key] = finding
+    logging.debug("%d reports, %d duplicates", len(findings), duplicates)
+    ordered = [findings[key] for key in sorted(findings, key=str)]
+    with open(result_file, "w", encoding="utf-8") as handle:
+        json.dump(
+            {"version": 1, "reports": [report(f) for f in ordered]},
+            handle,
+            indent=1,
+        )
+    with open(summary_file, "w", encoding="utf-8") as handle:
+        json.dump(summarize(ordered, len(inputs)), handle, indent=1)
+
+
+def report(finding):
+    """
+    Return the finding as a report of the CodeChecker JSON format,
+    without the bug path (it is in the plist files)
+    """
+    return {
+        "file": {"path": finding["file"]},
+        "line": finding.get("line"),
+        "column": finding.get("column"),
+        "message": finding.get("message"),
+        "checker_name": finding.get("checker_name"),
+        "analyzer_name": finding.get("analyzer_name"),
+        "severity": finding.get("severity"),
+        "report_hash": finding.get("report_hash"),
+    }
+
+
+def summarize(findings, units):
+    """
+    Return the report counts and the compact findings
+    """
+    severities = {}
+    checkers = {}
+    for finding in findings:
+        severity = finding.get("severity")
+        severities[severity] = severities.get(severity, 0) + 1
+        checker = finding.get("checker_name")
+        checkers[checker] = checkers.get(checker, 0) + 1
+    return {
+        "version": 1,
+        "units": units,
+        "reports": len(findings),
+        "severities": severities,
+        "checkers": dict(sorted(checkers.items())),
+        "findings": [
+            {
+                "report_hash": finding.get("report_hash"),
+                "severity": finding.get("severity"),
+                "checker_name": finding.get("checker_name"),
+                "file": finding["file"],
+                "line": finding.get("line"),
+            }
+            for finding in findings
+        ],
+    }
+
+
+def check(summaries, severities, baseline_file):
+    """
+    Return the number of new reports of the gated severities
+    """
+    gated = set(severities or DEFAULT_SEVERITIES) | {ALWAYS_GATED}
+    accepted = set()
+    if baseline_file:
+        with open(baseline_file, encoding="utf-8") as handle:
+            accepted = {line.strip() for line in handle if line.strip()}
+    failures = 0
+    for summary_file in summaries:
+        with open(summary_file, encoding="utf-8") as handle:
+            summary = json.load(handle)
+        print(f"{summary_file}: {summary['units']} translation units, "
+              f"{summary['reports']} reports {summary['severities']}")
+        if summary.get("timeouts"):
+            print(f"  Analysis timed out for: {summary['timeouts']}")
+        for finding in summary["findings"]:
+            if finding["severity"] not in gated:
+                continue
+            if finding["report_hash"] in accepted:
+                continue
+            failures += 1
+            print(f"  [{finding['severity']}] {finding['file']}:"
+                  f"{finding['line']} {finding['checker_name']}")
+    return failures
+
+
+def main():
+    """
+    Main function
+    """
+    options = parse_args()
+    if options.command == "merge":
+        merge(options.inputs, options.result, options.summary)
+        return
+    failures = check(options.summaries, options.severities, options.baseline)
+    if failures:
+        print(f"CodeChecker found {failures} defects")
+        sys.exit(1)
+    print("No defects found by CodeChecker")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# Copyright 2023 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Aggregate timings.json files of CodeChecker rules
+and list the slowest analysis stages and translation units.
+
+Build the timings first, then run the aggregator on the output tree:
+
+    bazel build --output_groups=codechecker_timings //...
+    bazel run //src:codechecker_timings -- $(bazel info bazel-bin)
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+
+def parse_args():
+    """
+    Parse command line arguments or show help.
+    """
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawTextHelpFormatter, description=__doc__
+    )
+    parser.add_argument(
+        "paths",
+        nargs="+",
+        help="timings JSON files or directories to search for them",
+    )
+    parser.add_argument(
+        "-n",
+        "--top",
+        type=int,
+        default=10,
+        help="number of slowest translation units to list",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=None,
+        help="save the aggregated timings to this JSON file",
+    )
+    parser.add_argument(
+        "--debug",
+        action="store_true",
+        help="print debug messages",
+    )
+    options = parser.parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if options.debug else logging.WARN,
+        format="[TIMINGS] %(levelname)5s: %(message)s",
+    )
+    return options
+
+
+def find_timings_files(paths):
+    """
+    Yield timings JSON files from the given files and directories
+    """
+    for path in paths:
+        if os.path.isfile(path):
+            yield path
+            continue
+        for root, _, files in os.walk(path, followlinks=True):
+            for filename in sorted(files):
+                if filename.endswith("timings.json"):
+                    yield os.path.join(root, filename)
+
+
+def aggregate(timings_files):
+    """
+    Sum stage durations and collect translation units of all timings files
+    """
+    stages = {}
+    units = []
+    dedupe = {"total_units": 0, "analyzed_units": 0, "saved_units": 0}
+    runs = 0
+    for timings_file in timings_files:
+        logging.debug("Reading %s", timings_file)
+        with open(timings_file, encoding="utf-8") as handle:
+            try:
+                timings = json.load(handle)
+            except ValueError:
+                logging.warning("Invalid timings file: %s", timings_file)
+                continue
+        runs += 1
+        for stage, duration in timings.get("stages", {}).items():
+            stages[stage] = stages.get(stage, 0.0) + duration
+        for unit in timings.get("translation_units", []):
+            unit = dict(unit)
+            unit["timings_file"] = timings_file
+            units.append(unit)
+        for key in dedupe:
+            dedupe[key] += timings.get("dedupe", {}).get(key, 0)
+    return {
+        "runs": runs,
+        "dedupe": dedupe,
+        "stages": dict(
+            sorted(stages.items(), key=lambda item: item[1], reverse=True)
+        ),
+        "translation_units": sorted(
+            units,
+            key=lambda unit: (unit.get("duration") or 0, unit.get("size") or 0),
+            reverse=True,
+        ),
+    }
+
+
+def print_report(result, top):
+    """
+    Print the slowest stages and translation units
+    """
+    print(f"Timings files: {result['runs']}")
+    dedupe = result["dedupe"]
+    if dedupe["total_units"]:
+        print(
+            f"Deduplicated translation units: {dedupe['analyzed_units']} "
+            f"analyzed of {dedupe['total_units']} "
+            f"(ratio {dedupe['analyzed_units'] / dedupe['total_units']:.2f}), "
+            f"{dedupe['saved_units']} analyses saved"
+        )
+    print()
+    print("Slowest stages (total seconds):")
+    for stage, duration in result["stages"].items():
+        print(f"  {stage:<30} {duration:>10.3f}")
+    print()
+    print(f"Slowest translation units (top {top}):")
+    print(f"  {'seconds':>10} {'bytes':>10} {'status':>8}  file")
+    for unit in result["translation_units"][:top]:
+        duration = unit.get("duration")
+        duration = f"{duration:.3f}" if duration is not None else "-"
+        size = unit.get("size")
+        size = str(size) if size is not None else "-"
+        print(
+            f"  {duration:>10} {size:>10} "
+            f"{unit.get('status', '-'):>8}  {unit['file']}"
+        )
+
+
+def main():
+    """
+    Main function
+    """
+    options = parse_args()
+    result = aggregate(find_timings_files(options.paths))
+    if not result["runs"]:
+        logging.error("No timings files found in: %s", options.paths)
+        sys.exit(1)
+    print_report(result, options.top)
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as output_file:
+            json.dump(result, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
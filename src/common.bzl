@@ -75,3 +75,116 @@ def warning(ctx, msg):
     """
     if hasattr(ctx.attr, "tags") and "debug" in ctx.attr.tags:
         print(msg)
+
+def resource_set_attributes(resource_set):
+    """
+    Returns a map of ctx.actions.run() arguments with the given resource_set
+
+    resource_set is only supported from Bazel 7,
+    in older versions the actions get the default reservation.
+    """
+    if BAZEL_VERSION.split(".")[0] in "0123456":
+        return {}
+    return {"resource_set": resource_set}
+
+# Resource estimates for the analysis actions used by the local scheduler.
+# The functions must be top level, they get the OS name and the number
+# of action inputs. The memory (MB) grows with the number of inputs
+# (mostly headers), which roughly follows the size of the translation unit.
+
+def _analyzer_memory(base, inputs_size):
+    return base + min(inputs_size, 4096) // 2
+
+def clang_tidy_resources(_os, inputs_size):
+    """ Resource estimate of a single clang-tidy run """
+    return {"cpu": 1, "memory": _analyzer_memory(512, inputs_size)}
+
+def clang_analyzer_resources(_os, inputs_size):
+    """ Resource estimate of a single clang --analyze run """
+    return {"cpu": 1, "memory": _analyzer_memory(1024, inputs_size)}
+
+def clang_ctu_resources(_os, inputs_size):
+    """ Resource estimate of a clang --analyze run with CTU """
+    return {"cpu": 1, "memory": _analyzer_memory(2048, inputs_size)}
+
+def per_file_resources(_os, inputs_size):
+    """ Resource estimate of CodeChecker analyzing a single file """
+
+    # CodeChecker runs clangsa and clang-tidy in parallel
+    return {"cpu": 2, "memory": _analyzer_memory(1536, inputs_size)}
+
+def _codechecker_resources(jobs, inputs_size):
+    return {"cpu": jobs, "memory": _analyzer_memory(1024 * jobs, inputs_size)}
+
+def _codechecker_resources_1(_os, inputs_size):
+    return _codechecker_resources(1, inputs_size)
+
+def _codechecker_resources_2(_os, inputs_size):
+    return _codechecker_resources(2, inputs_size)
+
+def _codechecker_resources_4(_os, inputs_size):
+    return _codechecker_resources(4, inputs_size)
+
+def _codechecker_resources_8(_os, inputs_size):
+    return _codechecker_resources(8, inputs_size)
+
+def _codechecker_resources_16(_os, inputs_size):
+    return _codechecker_resources(16, inputs_size)
+
+def _codechecker_resources_32(_os, inputs_size):
+    return _codechecker_resources(32, inputs_size)
+
+# Number of CodeChecker jobs -> resource estimate of the monolithic action
+CODECHECKER_RESOURCES = {
+    1: _codechecker_resources_1,
+    2: _codechecker_resources_2,
+    4: _codechecker_resources_4,
+    8: _codechecker_resources_8,
+    16: _codechecker_resources_16,
+    32: _codechecker_resources_32,
+}
+
+TIME_TRACE_ATTRIBUTES = {
+    "time_trace": attr.bool(
+        default = False,
+        doc = "Run clang with -ftime-trace (clang 16+) and merge the " +
+              "traces of all translation units (clang_time_trace " +
+              "output group)",
+    ),
+    "_clang_time_trace": attr.label(
+        default = ":clang_time_trace",
+        executable = True,
+        cfg = "exec",
+    ),
+}
+
+def merge_time_traces(ctx, traces):
+    """
+    Merges the time traces of the translation units into a Chrome trace,
+    and summarizes the slowest translation units and phases.
+
+    Args:
+        ctx: rule context with TIME_TRACE_ATTRIBUTES
+        traces: list of (source file, time trace file) tuples
+    Returns:
+        dict of output groups
+    """
+    merged = ctx.actions.declare_file(ctx.attr.name + ".time_trace.json")
+    summary = ctx.actions.declare_file(ctx.attr.name + ".time_trace.txt")
+    args = ctx.actions.args()
+    args.add("--output", merged)
+    args.add("--summary", summary)
+    args.add_all([
+        "{}={}".format(src.path, trace.path)
+        for src, trace in traces
+    ])
+    trace_files = [trace for _, trace in traces]
+    ctx.actions.run(
+        inputs = trace_files,
+        outputs = [merged, summary],
+        executable = ctx.executable._clang_time_trace,
+        arguments = [args],
+        mnemonic = "ClangTimeTrace",
+        progress_message = "Merge time traces of {}".format(ctx.label),
+    )
+    return {"clang_time_trace": depset([merged, summary] + trace_files)}
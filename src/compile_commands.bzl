@@ -51,6 +51,8 @@ SourceFilesInfo = provider(
         "transitive_source_files": "list of transitive source files of a target",
         "compilation_db": "list of compile commands with parameters: file, command, directory",
         "headers": "list of required header files",
+        "header_changed": "whether a header of the target or its dependencies " +
+                          "is in the changed files",
     },
 )
 
@@ -74,6 +76,24 @@ _cc_rules = [
     "cc_proto_library",
 ]
 
+PACKAGE_FILTER_ATTRIBUTES = {
+    "analyze_external": attr.bool(
+        default = True,
+        doc = "Analyze the sources of external repositories. " +
+              "If False, the aspect does not collect them at all, " +
+              "but it still visits the external targets.",
+    ),
+    "include_packages": attr.string_list(
+        default = [],
+        doc = "Analyze only these packages, e.g. //src/... or //lib, " +
+              "empty means all packages",
+    ),
+    "exclude_packages": attr.string_list(
+        default = [],
+        doc = "Do not analyze these packages, e.g. //third_party/...",
+    ),
+}
+
 SYSTEM_INCLUDE = "-isystem "
 QUOTE_INCLUDE = "-iquote "
 
@@ -208,11 +228,57 @@ def _cc_compiler_info(ctx, target, src, feature_configuration, cc_toolchain):
         force_language_mode_option = force_language_mode_option,
     )
 
-def get_compilation_database(target, ctx):
+def changed_files(ctx):
+    """ Return the changed files given by
+    --define=codechecker_changed_files=path,path...
+
+    Returns:
+      Dict of the changed file paths, or None if not given.
+    """
+    value = ctx.var.get("codechecker_changed_files")
+    if value == None:
+        return None
+    return {
+        path.strip(): True
+        for path in value.split(",")
+        if path.strip()
+    }
+
+def _headers_changed(target, ctx, changed):
+    """ Return True if a direct header of target or any header
+    of its dependencies is in the changed files
+    """
+    if CcInfo in target:
+        compilation_context = target[CcInfo].compilation_context
+        for header in (compilation_context.direct_public_headers +
+                       compilation_context.direct_private_headers +
+                       compilation_context.direct_textual_headers):
+            if header.path in changed:
+                return True
+    for attr in SOURCE_ATTR:
+        deps = getattr(ctx.rule.attr, attr, [])
+        if type(deps) != "list":
+            continue
+        for dep in deps:
+            if SourceFilesInfo in dep and dep[SourceFilesInfo].header_changed:
+                return True
+    return False
+
+def _package_name(label):
+    """ Return the package of label as //package or @repo//package """
+    if label.workspace_name:
+        return "@{}//{}".format(label.workspace_name, label.package)
+    return "//" + label.package
+
+def get_compilation_database(target, ctx, header_changed = False):
     """ Return a "compilation database" or "compile commands" ready to create a JSON file
 
+    In changed-files mode a command is affected if its source is changed
+    or header_changed (a header visible to the target is changed),
+    otherwise all commands are affected.
+
     Returns:
-      List of struct(file, command, directory).
+      List of struct(file, command, directory, package, affected).
     """
     if ctx.rule.kind not in _cc_rules:
         return []
@@ -228,6 +294,8 @@ def get_compilation_database(target, ctx):
     srcs = get_sources(ctx)
 
     directory = "."
+    package = _package_name(target.label)
+    changed = changed_files(ctx)
     compilation_db = []
     for src in srcs:
         if src.extension not in _c_and_cpp_extensions:
@@ -254,6 +322,9 @@ def get_compilation_database(target, ctx):
                 file = src.path,
                 command = command,
                 directory = directory,
+                package = package,
+                affected = (changed == None or header_changed or
+                            src.path in changed),
             ),
         )
 
@@ -303,9 +374,28 @@ def _accumulate_compilation_database(accumulated, deps):
     return depset(transitive = compilation_db)
 
 def _compile_commands_aspect_impl(target, ctx):
+    if (not ctx.attr.analyze_external and
+        target.label.workspace_root.startswith("external")):
+        # The aspect still propagates to the external targets, this early
+        # return keeps the cost of visiting them low.
+        # Keep only the headers, required by the dependent targets
+        headers = []
+        if CcInfo in target:
+            headers.append(target[CcInfo].compilation_context.headers)
+        return [
+            SourceFilesInfo(
+                transitive_source_files = depset(),
+                compilation_db = depset(),
+                headers = depset(headers),
+                header_changed = False,
+            ),
+        ]
+
+    changed = changed_files(ctx)
+    header_changed = changed != None and _headers_changed(target, ctx, changed)
     source_files = get_sources(ctx)
     source_files = depset(source_files)
-    compilation_db = get_compilation_database(target, ctx)
+    compilation_db = get_compilation_database(target, ctx, header_changed)
     compilation_db = depset(compilation_db)
 
     for attr in SOURCE_ATTR:
@@ -324,6 +414,7 @@ def _compile_commands_aspect_impl(target, ctx):
             transitive_source_files = source_files,
             compilation_db = compilation_db,
             headers = collect_headers(target, ctx),
+            header_changed = header_changed,
         ),
     ]
 
@@ -331,6 +422,7 @@ compile_commands_aspect = aspect(
     implementation = _compile_commands_aspect_impl,
     attr_aspects = SOURCE_ATTR,
     attrs = {
+        "analyze_external": attr.bool(default = True),
         "_cc_toolchain": attr.label(
             default = Label("@bazel_tools//tools/cpp:current_cc_toolchain"),
         ),
@@ -358,6 +450,155 @@ platforms_transition = transition(
     ],
 )
 
+def get_platform_alias(platform):
+    """
+    Get platform alias for full platform names being used
+
+    Returns:
+    string: If the full platform name is consistent with
+    valid syntax, returns the short alias to represent it.
+    Returns the original platform passed otherwise
+    """
+    if platform.startswith("@platforms"):
+        (_, _, shortname) = platform.partition(":")
+        platform = shortname
+    return platform
+
+def _platforms_split_transition_impl(settings, attr):
+    configurations = {}
+    for platform in attr.platforms:
+        alias = get_platform_alias(platform) or "default"
+        if platform:
+            platforms = platform
+        else:
+            platforms = settings["//command_line_option:platforms"]
+        configurations[alias] = {
+            "//command_line_option:platforms": platforms,
+        }
+    return configurations
+
+platforms_split_transition = transition(
+    implementation = _platforms_split_transition_impl,
+    inputs = [
+        "//command_line_option:platforms",
+    ],
+    outputs = [
+        "//command_line_option:platforms",
+    ],
+)
+
+def normalize_command(command):
+    """ Return the compile command without its configuration specific parts
+
+    The same source compiled for different platforms (or configurations)
+    differs only in the bazel-out/<configuration>/ directories,
+    when the toolchain and flags are the same. The files read from these
+    directories may differ, so commands reading generated files must not
+    be normalized.
+
+    Returns:
+      Compile command with bazel-out/<configuration>/ replaced.
+    """
+    parts = command.split("bazel-out/")
+    normalized = [parts[0]]
+    for part in parts[1:]:
+        (_, separator, rest) = part.partition("/")
+        if not separator:
+            normalized.append(part)
+            continue
+        normalized.append("<configuration>/" + rest)
+    return "bazel-out/".join(normalized)
+
+def _glob_match(pattern, path):
+    """ Return True if the whole path matches the pattern with * wildcards """
+    parts = pattern.split("*")
+    if len(parts) == 1:
+        return pattern == path
+    if not path.startswith(parts[0]) or not path.endswith(parts[-1]):
+        return False
+    position = len(parts[0])
+    end = len(path) - len(parts[-1])
+    if end < position:
+        return False
+    for part in parts[1:-1]:
+        index = path.find(part, position, end)
+        if index < 0:
+            return False
+        position = index + len(part)
+    return True
+
+def _normpath(path):
+    """ Return path normalized like os.path.normpath() of a relative path """
+    parts = []
+    for part in path.split("/"):
+        if part in ["", "."]:
+            continue
+        if part == ".." and parts and parts[-1] != "..":
+            parts.pop()
+            continue
+        parts.append(part)
+    return "/".join(parts) or "."
+
+def is_skipped(path, skip):
+    """ Return True if the skip file rules certainly skip the file
+
+    CodeChecker matches the rules in order against the absolute path of
+    the file, which is not known at analysis time. A rule matches the paths
+    starting with it: fnmatch(path, normpath(rule) + "*"). Rules starting
+    with * (e.g. -*/third_party/*) are matched against the execroot relative
+    path: if such a rule matches it, the rule matches the absolute path too.
+    The opposite is not certain, the * may match in the execroot part of the
+    absolute path, so the evaluation stops at the first + rule not matching
+    the relative path. It also stops at the first other rule (absolute path,
+    ? or [] wildcards). Then the file is left to CodeChecker.
+
+    Returns:
+      True if a skip (-) rule matches, before any rule which may keep it.
+    """
+    path = "/" + path
+    for rule in skip:
+        rule = rule.strip()
+        if len(rule) < 2 or rule[0] not in "+-":
+            continue
+        pattern = rule[1:].strip()
+        if not pattern.startswith("*") or "?" in pattern or "[" in pattern:
+            return False
+        if _glob_match(_normpath(pattern) + "*", path):
+            return rule[0] == "-"
+        if rule[0] == "+":
+            return False
+    return False
+
+def _package_matches(package, pattern):
+    """ Return True if package matches //package or //package/... """
+    if pattern.endswith("/..."):
+        prefix = pattern[:-len("/...")]
+        return package == prefix or package.startswith(prefix.rstrip("/") + "/")
+    return package == pattern
+
+def is_filtered(entry, ctx):
+    """ Return True if the compile command should not be analyzed
+
+    A command is filtered, if it is not affected by the changed files,
+    its package is not included or it is excluded by the rule attributes,
+    or the skip file rules skip its source file.
+    """
+    if not entry.affected:
+        return True
+    include = getattr(ctx.attr, "include_packages", [])
+    exclude = getattr(ctx.attr, "exclude_packages", [])
+    included = not include
+    for pattern in include:
+        if _package_matches(entry.package, pattern):
+            included = True
+            break
+    if not included:
+        return True
+    for pattern in exclude:
+        if _package_matches(entry.package, pattern):
+            return True
+    return is_skipped(entry.file, getattr(ctx.attr, "skip", []))
+
 def _check_source_files(source_files, compilation_db):
     available_sources = [src.path for src in source_files]
     checking_sources = [item.file for item in compilation_db]
@@ -365,9 +606,17 @@ def _check_source_files(source_files, compilation_db):
         if src not in available_sources:
             fail("File: %s\nNot available in collected source files" % src)
 
-def _compile_commands_json(compilation_db):
+def compile_commands_json(compilation_db):
+    """ Return the content of compile_commands.json """
     json_file = "[\n"
-    entries = [json.encode(entry) for entry in compilation_db]
+    entries = [
+        json.encode(struct(
+            file = entry.file,
+            command = entry.command,
+            directory = entry.directory,
+        ))
+        for entry in compilation_db
+    ]
     json_file += ",\n".join(entries)
     json_file += "]\n"
     return json_file
@@ -385,24 +634,45 @@ def compile_commands_impl(ctx):
     # Collect source files and compilation database
     source_files = []
     compilation_db = []
+    filtered_files = {}
     headers = []
+    total_commands = 0
     for target in ctx.attr.targets:
         src = target[SourceFilesInfo].transitive_source_files
         source_files += src.to_list()
-        cdb = target[SourceFilesInfo].compilation_db
-        compilation_db += cdb.to_list()
-        hdr = target[SourceFilesInfo].headers
-        headers += hdr.to_list()
+        cdb = target[SourceFilesInfo].compilation_db.to_list()
+        total_commands += len(cdb)
+        kept = []
+        for item in cdb:
+            if is_filtered(item, ctx):
+                filtered_files[item.file] = True
+            else:
+                kept.append(item)
+        compilation_db += kept
+
+        # Headers of fully filtered targets are not staged
+        if len(kept) or not len(cdb):
+            hdr = target[SourceFilesInfo].headers
+            headers += hdr.to_list()
 
     # Check that compilation database is not empty
-    if not len(compilation_db):
+    if not total_commands:
         fail("Compilation database is empty!")
 
     # Check that we collect all required source files
     _check_source_files(source_files, compilation_db)
 
+    # Filtered translation units are not staged
+    for item in compilation_db:
+        filtered_files.pop(item.file, None)
+    source_files = [
+        src
+        for src in source_files
+        if src.path not in filtered_files
+    ]
+
     # Generate compile_commands.json from compilation database info
-    compile_db_json = _compile_commands_json(compilation_db)
+    compile_db_json = compile_commands_json(compilation_db)
 
     # Save compile_commands.json file
     ctx.actions.write(
@@ -436,7 +706,7 @@ _compile_commands = rule(
             cfg = platforms_transition,
             doc = "List of compilable targets which should be checked.",
         ),
-    } | version_specific_attributes(),
+    } | PACKAGE_FILTER_ATTRIBUTES | version_specific_attributes(),
     outputs = {
         "compile_commands": "%{name}/compile_commands.json",
     },
@@ -447,6 +717,9 @@ def compile_commands(
         targets,
         platform = "",  #"@platforms//os:linux",
         tags = [],
+        analyze_external = True,
+        include_packages = [],
+        exclude_packages = [],
         **kwargs):
     """ Bazel rule to generate compile_commands.json file """
     compile_commands_tags = [] + tags
@@ -457,4 +730,7 @@ def compile_commands(
         platform = platform,
         targets = targets,
         tags = compile_commands_tags,
+        analyze_external = analyze_external,
+        include_packages = include_packages,
+        exclude_packages = exclude_packages,
     )
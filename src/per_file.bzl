@@ -20,67 +20,133 @@ for each translation unit.
 load("@bazel_tools//tools/build_defs/cc:action_names.bzl", "ACTION_NAMES")
 load("@bazel_tools//tools/cpp:toolchain_utils.bzl", "find_cpp_toolchain")
 load("codechecker_config.bzl", "get_config_file")
-load("common.bzl", "SOURCE_ATTR")
+load(
+    "common.bzl",
+    "SOURCE_ATTR",
+    "per_file_resources",
+    "resource_set_attributes",
+    "version_specific_attributes",
+)
 load(
     "compile_commands.bzl",
+    "PACKAGE_FILTER_ATTRIBUTES",
     "SourceFilesInfo",
     "compile_commands_aspect",
     "compile_commands_impl",
+    "compile_commands_json",
+    "is_filtered",
+    "normalize_command",
+    "platforms_split_transition",
     "platforms_transition",
 )
+load(
+    "toolchains.bzl",
+    "clang_toolchain_info",
+    "clang_toolchain_type",
+    "codechecker_analyzer_env",
+    "codechecker_toolchain_info",
+    "codechecker_toolchain_type",
+)
 
 def _run_code_checker(
         ctx,
         src,
-        arguments,
-        target,
-        label,
-        options,
-        config_file,
-        env_vars,
+        file_name,
         compile_commands_json,
-        compilation_context,
-        sources_and_headers):
+        config_file,
+        inputs):
+    """
+    Declares the CodeChecker action of a translation unit. Returns
+    struct(results, summary, timings, log): results are the plist files
+    or their archive, log is None if it is archived with them.
+    """
+
     # Define Plist and log file names
     data_dir = ctx.attr.name + "/data"
-    file_name_params = (data_dir, src.path.replace("/", "-"))
-    clang_tidy_plist_file_name = "{}/{}_clang-tidy.plist".format(*file_name_params)
-    clangsa_plist_file_name = "{}/{}_clangsa.plist".format(*file_name_params)
-    codechecker_log_file_name = "{}/{}_codechecker.log".format(*file_name_params)
+    file_name_params = (data_dir, file_name)
+    summary_file_name = "{}/{}_summary.json".format(*file_name_params)
+    timings_file_name = "{}/{}_timings.json".format(*file_name_params)
+    summary = ctx.actions.declare_file(summary_file_name)
+    timings = ctx.actions.declare_file(timings_file_name)
+    result_names = [
+        "{}_clang-tidy.plist".format(file_name),
+        "{}_clangsa.plist".format(file_name),
+        "{}_codechecker.log".format(file_name),
+    ]
 
     # Declare output files
-    clang_tidy_plist = ctx.actions.declare_file(clang_tidy_plist_file_name)
-    clangsa_plist = ctx.actions.declare_file(clangsa_plist_file_name)
-    codechecker_log = ctx.actions.declare_file(codechecker_log_file_name)
-
-    if "--ctu" in options:
-        inputs = [compile_commands_json, config_file] + sources_and_headers
+    archive_path = ""
+    if ctx.attr.archive:
+        # The plist and log files are packed into a single output
+        archive = ctx.actions.declare_file(
+            "{}/{}_results.tar.gz".format(*file_name_params),
+        )
+        archive_path = archive.path
+        results = [archive]
+        log = None
+        clang_tidy_plist_path, clangsa_plist_path, codechecker_log_path = [
+            archive.dirname + "/" + name
+            for name in result_names
+        ]
     else:
-        # NOTE: we collect only headers, so CTU may not work!
-        headers = depset(transitive = target[SourceFilesInfo].headers.to_list())
-        inputs = depset([compile_commands_json, config_file, src], transitive = [headers])
+        results = [
+            ctx.actions.declare_file(data_dir + "/" + name)
+            for name in result_names[:-1]
+        ]
+        log = ctx.actions.declare_file(data_dir + "/" + result_names[-1])
+        clang_tidy_plist_path, clangsa_plist_path, codechecker_log_path = [
+            result.path
+            for result in results + [log]
+        ]
 
-    outputs = [clang_tidy_plist, clangsa_plist, codechecker_log]
+    tool_files = [
+        codechecker_toolchain_info(ctx).files,
+        clang_toolchain_info(ctx).files,
+    ]
+    inputs = depset(
+        [compile_commands_json, config_file, ctx.outputs.codechecker_skipfile],
+        transitive = [inputs] + tool_files,
+    )
+    unit_outputs = struct(
+        results = results,
+        summary = summary,
+        timings = timings,
+        log = log,
+    )
 
-    analyzer_output_paths = "clangsa," + clangsa_plist.path + \
-                            ";clang-tidy," + clang_tidy_plist.path
+    analyzer_output_paths = "clangsa," + clangsa_plist_path + \
+                            ";clang-tidy," + clang_tidy_plist_path
 
     # Action to run CodeChecker for a file
     ctx.actions.run(
         inputs = inputs,
-        outputs = outputs,
+        outputs = _unit_outputs(unit_outputs),
         executable = ctx.outputs.per_file_script,
         arguments = [
             data_dir,
             src.path,
-            codechecker_log.path,
+            codechecker_log_path,
             analyzer_output_paths,
+            timings.path,
+            compile_commands_json.path,
+            summary.path,
+            archive_path,
         ],
         mnemonic = "CodeChecker",
         use_default_shell_env = True,
         progress_message = "CodeChecker analyze {}".format(src.short_path),
+        **resource_set_attributes(per_file_resources)
     )
-    return outputs
+    return unit_outputs
+
+def _unit_outputs(unit_outputs):
+    """
+    Returns all files of the outputs of _run_code_checker
+    """
+    files = unit_outputs.results + [unit_outputs.summary, unit_outputs.timings]
+    if unit_outputs.log:
+        files.append(unit_outputs.log)
+    return files
 
 def check_valid_file_type(src):
     """
@@ -117,22 +183,295 @@ def _collect_all_sources_and_headers(ctx):
                 all_files += headers
     return all_files
 
-def _create_wrapper_script(ctx, options, compile_commands_json, config_file):
+def _create_wrapper_script(ctx, options, config_file):
     options_str = ""
     for item in options:
         options_str += item + " "
+
+    # Rules not evaluated at analysis time are applied by CodeChecker
+    ctx.actions.write(
+        output = ctx.outputs.codechecker_skipfile,
+        content = "\n".join(ctx.attr.skip),
+    )
+    if ctx.attr.skip:
+        options_str += "--skip " + ctx.outputs.codechecker_skipfile.path
     ctx.actions.expand_template(
         template = ctx.file._per_file_script_template,
         output = ctx.outputs.per_file_script,
         is_executable = True,
         substitutions = {
             "{PythonPath}": ctx.attr._python_runtime[PyRuntimeInfo].interpreter_path,
-            "{compile_commands_json}": compile_commands_json.path,
+            "{codechecker_bin}": codechecker_toolchain_info(ctx).codechecker_bin,
+            "{analyzer_bin}": codechecker_analyzer_env(ctx),
             "{codechecker_args}": options_str,
             "{config_file}": config_file.path,
+            "{analysis_timeout}": str(ctx.attr.analysis_timeout),
+            "{analysis_timeout_fatal}": str(ctx.attr.analysis_timeout_fatal),
         },
     )
 
+def _merge_summaries(ctx, prefix, summaries):
+    """
+    Merges the summaries of the translation units at build time into
+    prefix/result.json (all reports) and prefix/summary.json
+    """
+    result = ctx.actions.declare_file(prefix + "/result.json")
+    summary = ctx.actions.declare_file(prefix + "/summary.json")
+    args = ctx.actions.args()
+    args.add("merge")
+    args.add("--result", result)
+    args.add("--summary", summary)
+    args.add_all(summaries)
+    args.use_param_file("@%s")
+    args.set_param_file_format("multiline")
+    ctx.actions.run(
+        inputs = summaries,
+        outputs = [result, summary],
+        executable = ctx.executable._codechecker_summary,
+        arguments = [args],
+        mnemonic = "CodeCheckerSummary",
+        progress_message = "Merging CodeChecker results into %{output}",
+    )
+    return result, summary
+
+def _shell_quote(argument):
+    """
+    Returns argument quoted for the shell
+    """
+    return "'" + argument.replace("'", "'\\''") + "'"
+
+def _check_script(ctx, summaries):
+    """
+    Returns the shell command of the test, which reads the merged
+    summaries only and fails on the reports of the gated severities
+    """
+    command = [
+        ctx.attr._python_runtime[PyRuntimeInfo].interpreter_path,
+        ctx.file._codechecker_summary_script.short_path,
+        "check",
+    ]
+    if ctx.file.baseline:
+        command += ["--baseline", ctx.file.baseline.short_path]
+    command += [summary.short_path for summary in summaries]
+    command += ["--severities"] + ctx.attr.severities
+    return " ".join([_shell_quote(argument) for argument in command])
+
+HTML_ATTRIBUTES = {
+    "_codechecker_html": attr.label(
+        default = ":codechecker_html",
+        executable = True,
+        cfg = "exec",
+    ),
+}
+
+def html_report(ctx, output_dir, results, sources, config_file):
+    """
+    Declares the action rendering the HTML report of results (plist files,
+    directories of them or archives) into output_dir, which is built only
+    if requested, e.g. by the codechecker_html output group
+    """
+    report = ctx.actions.declare_directory(output_dir)
+    codechecker_toolchain = codechecker_toolchain_info(ctx)
+    args = ctx.actions.args()
+    args.add("render")
+    args.add("--codechecker", codechecker_toolchain.codechecker_bin)
+    args.add("--config", config_file)
+    args.add("--output", report.path)
+    args.add_all(results, expand_directories = False)
+    args.use_param_file("@%s")
+    args.set_param_file_format("multiline")
+    ctx.actions.run(
+        inputs = depset(
+            results + [config_file],
+            transitive = [sources, codechecker_toolchain.files],
+        ),
+        outputs = [report],
+        executable = ctx.executable._codechecker_html,
+        arguments = [args],
+        mnemonic = "CodeCheckerHtml",
+        use_default_shell_env = True,
+        progress_message = "Rendering CodeChecker HTML report %{output}",
+    )
+    return report
+
+def _html_units(ctx, outputs, units, config_file):
+    """
+    Renders the report pages of each translation unit in its own action
+    into codechecker-html/<unit>, so only the changed units are rendered
+    again, and writes the codechecker-html/index.html of all units
+    from their summaries. Returns the pages and the index.
+    """
+    report_dir = ctx.attr.name + "/codechecker-html"
+    index = ctx.actions.declare_file(report_dir + "/index.html")
+    args = ctx.actions.args()
+    args.add("index")
+    args.add("--output", index)
+    files = []
+    summaries = []
+    for key, unit_outputs in outputs.items():
+        summary = unit_outputs.summary
+        unit_name = summary.basename[:-len("_summary.json")]
+        unit = units[key]
+        files.append(html_report(
+            ctx,
+            report_dir + "/" + unit_name,
+            unit_outputs.results,
+            depset([unit.src], transitive = [unit.headers]),
+            config_file,
+        ))
+        args.add(unit_name)
+        args.add(summary)
+        summaries.append(summary)
+    args.use_param_file("@%s")
+    args.set_param_file_format("multiline")
+    ctx.actions.run(
+        inputs = summaries,
+        outputs = [index],
+        executable = ctx.executable._codechecker_html,
+        arguments = [args],
+        mnemonic = "CodeCheckerHtmlIndex",
+        progress_message = "Writing CodeChecker HTML index %{output}",
+    )
+    return files + [index]
+
+def _unit_file_name(src, command, commands_of_source):
+    """
+    Returns a unique output file name of a translation unit, derived from
+    its source path, and the compile command hash if the source is analyzed
+    with several different commands. The name doesn't depend on the order
+    of the units, so the outputs of a unit stay stable.
+    """
+    name = src.path.replace("/", "-")
+    if commands_of_source[src.path] > 1:
+        name += "_%x" % (hash(command) & 0xffffffff)
+    return name
+
+def _collect_units(ctx, targets, units):
+    """
+    Adds the translation units of targets to units, which maps
+    (source, normalized command) to the first struct(src, entry, headers).
+    A unit reading generated files keeps its configuration in the command,
+    as the generated files may differ between the configurations.
+    Translation units filtered by the package and skip rules are left out.
+    Returns (keys, count): the distinct keys of targets
+    and the number of compile commands seen.
+    """
+    keys = {}
+    count = 0
+    for target in targets:
+        if not CcInfo in target or not SourceFilesInfo in target:
+            continue
+        info = target[SourceFilesInfo]
+        sources = {
+            src.path: src
+            for src in info.transitive_source_files.to_list()
+        }
+        headers = depset(transitive = info.headers.to_list())
+        generated_headers = [
+            header
+            for header in headers.to_list()
+            if not header.is_source
+        ]
+        for entry in info.compilation_db.to_list():
+            src = sources.get(entry.file)
+            if not src or not check_valid_file_type(src):
+                continue
+            if is_filtered(entry, ctx):
+                continue
+            count += 1
+            command = entry.command
+            if src.is_source and not generated_headers:
+                command = normalize_command(command)
+            key = (entry.file, command)
+            if key in keys:
+                continue
+            keys[key] = True
+            if key not in units:
+                units[key] = struct(
+                    src = src,
+                    entry = entry,
+                    headers = headers,
+                )
+    return keys.keys(), count
+
+def _has_compile_commands(split_targets):
+    """
+    Returns True if any of the targets has compile commands before filtering
+    """
+    for targets in split_targets.values():
+        for target in targets:
+            if SourceFilesInfo in target:
+                if target[SourceFilesInfo].compilation_db.to_list():
+                    return True
+    return False
+
+def _analyze_units(ctx, units, config_file, compile_commands = None):
+    """
+    Runs CodeChecker once for each translation unit.
+    Each unit gets its own compilation database, unless compile_commands
+    (containing all units) is given, e.g. for CTU analysis.
+    Returns (outputs, files): outputs maps the unit keys to their outputs
+    (see _run_code_checker), files are all files created.
+    """
+    outputs = {}
+    files = []
+    commands_of_source = {}
+    for unit in units.values():
+        path = unit.src.path
+        commands_of_source[path] = commands_of_source.get(path, 0) + 1
+    for key, unit in units.items():
+        file_name = _unit_file_name(unit.src, key[1], commands_of_source)
+        unit_compile_commands = compile_commands
+        if not unit_compile_commands:
+            unit_compile_commands = ctx.actions.declare_file(
+                "{}/units/{}/compile_commands.json".format(
+                    ctx.attr.name,
+                    file_name,
+                ),
+            )
+            ctx.actions.write(
+                output = unit_compile_commands,
+                content = compile_commands_json([unit.entry]),
+            )
+            files.append(unit_compile_commands)
+        outputs[key] = _run_code_checker(
+            ctx,
+            unit.src,
+            file_name,
+            unit_compile_commands,
+            config_file,
+            depset([unit.src], transitive = [unit.headers]),
+        )
+        files += _unit_outputs(outputs[key])
+    return outputs, files
+
+def _dedupe_timings(ctx, mode, total_units, analyzed_units, platforms = None):
+    """
+    Writes the deduplication statistics into codechecker_timings.json
+    """
+    timings = ctx.actions.declare_file(
+        ctx.attr.name + "/codechecker_timings.json",
+    )
+    dedupe = {
+        "total_units": total_units,
+        "analyzed_units": analyzed_units,
+        "saved_units": total_units - analyzed_units,
+        "ratio": analyzed_units / total_units if total_units else 1.0,
+    }
+    if platforms:
+        dedupe["platforms"] = platforms
+    ctx.actions.write(
+        output = timings,
+        content = json.encode_indent({
+            "version": 1,
+            "mode": mode,
+            "stages": {},
+            "translation_units": [],
+            "dedupe": dedupe,
+        }),
+    )
+    return timings
+
 def _per_file_impl(ctx):
     compile_commands = None
     for output in compile_commands_impl(ctx):
@@ -142,97 +481,270 @@ def _per_file_impl(ctx):
         fail("Failed to generate compile_commands.json file!")
     if compile_commands != ctx.outputs.compile_commands:
         fail("Seems compile_commands.json file is incorrect!")
-    sources_and_headers = _collect_all_sources_and_headers(ctx)
     options = ctx.attr.default_options + ctx.attr.options
-    all_files = [compile_commands]
-    config_file, env_vars = get_config_file(ctx)
-    _create_wrapper_script(ctx, options, compile_commands, config_file)
-    for target in ctx.attr.targets:
-        if not CcInfo in target:
-            continue
-        if SourceFilesInfo in target:
-            if hasattr(target[SourceFilesInfo], "transitive_source_files"):
-                srcs = target[SourceFilesInfo].transitive_source_files.to_list()
-                all_files += srcs
-                compilation_context = target[CcInfo].compilation_context
-                for src in srcs:
-                    if not check_valid_file_type(src):
-                        continue
-                    args = target[SourceFilesInfo].compilation_db.to_list()
-                    outputs = _run_code_checker(
-                        ctx,
-                        src,
-                        args,
-                        target,
-                        ctx.attr.name,
-                        options,
-                        config_file,
-                        env_vars,
-                        compile_commands,
-                        compilation_context,
-                        sources_and_headers,
-                    )
-                    all_files += outputs
+    config_file, _ = get_config_file(ctx)
+    _create_wrapper_script(ctx, options, config_file)
+
+    # The same source may be reached through several targets,
+    # analyze each distinct compilation once
+    units = {}
+    _, total_units = _collect_units(ctx, ctx.attr.targets, units)
+    if "--ctu" in options:
+        sources_and_headers = depset(_collect_all_sources_and_headers(ctx))
+        for key, unit in units.items():
+            units[key] = struct(
+                src = unit.src,
+                entry = unit.entry,
+                headers = sources_and_headers,
+            )
+        outputs, all_files = _analyze_units(
+            ctx,
+            units,
+            config_file,
+            compile_commands,
+        )
+    else:
+        # NOTE: we collect only headers, so CTU may not work!
+        outputs, all_files = _analyze_units(ctx, units, config_file)
+    timings_files = [unit_outputs.timings for unit_outputs in outputs.values()]
+    timings_files.append(
+        _dedupe_timings(ctx, "per_file", total_units, len(units)),
+    )
+    result, summary = _merge_summaries(
+        ctx,
+        ctx.attr.name,
+        [unit_outputs.summary for unit_outputs in outputs.values()],
+    )
+    all_files += [compile_commands] + [unit.src for unit in units.values()]
     ctx.actions.write(
         output = ctx.outputs.test_script,
         is_executable = True,
-        content = """
-            DATA_DIR=$(dirname {})
-            # ls -la $DATA_DIR/data
-            # find $DATA_DIR/data -name *.plist -exec sed -i -e "s|<string>.*execroot/codechecker_bazel/|<string>|g" {{}} \\;
-            # cat $DATA_DIR/data/test-src-lib.cc_clangsa.plist
-            echo "Running: CodeChecker parse $DATA_DIR/data"
-            CodeChecker parse $DATA_DIR/data
-        """.format(ctx.outputs.test_script.short_path),
+        content = _check_script(ctx, [summary]) + "\n",
     )
     files = depset(
-        direct = all_files,
+        direct = all_files + timings_files[-1:] + [result, summary],
     )
-    run_files = [ctx.outputs.test_script] + all_files
+
+    # The test reads only the summary, so with --remote_download_minimal
+    # the reports are downloaded only if requested (codechecker_files)
+    run_files = [ctx.outputs.test_script, summary] + ctx.files.baseline + \
+                ctx.files._codechecker_summary_script + \
+                ctx.files._codechecker_paths_script
+    html_files = _html_units(ctx, outputs, units, config_file)
     return [
         DefaultInfo(
             files = files,
             runfiles = ctx.runfiles(files = run_files),
             executable = ctx.outputs.test_script,
         ),
+        OutputGroupInfo(
+            codechecker_timings = depset(timings_files),
+            codechecker_summary = depset([summary]),
+            codechecker_files = files,
+            codechecker_html = depset(html_files),
+        ),
     ]
 
+_PER_FILE_ATTRS = {
+    "options": attr.string_list(
+        default = [],
+        doc = "List of CodeChecker options, e.g.: --ctu",
+    ),
+    "default_options": attr.string_list(
+        default = [
+            "--analyzers clangsa clang-tidy",
+            "--clean",
+        ],
+        doc = "List of default CodeChecker analyze options",
+    ),
+    "config": attr.label(
+        default = None,
+        doc = "CodeChecker configuration",
+    ),
+    "skip": attr.string_list(
+        default = [],
+        doc = "List of skip/ignore file rules. " +
+              "See https://codechecker.readthedocs.io/en/latest/analyzer/user_guide/#skip-file",
+    ),
+    "baseline": attr.label(
+        default = None,
+        allow_single_file = [".baseline"],
+        doc = "Report hashes of accepted findings in CodeChecker .baseline " +
+              "format, the test fails only on reports not in the baseline",
+    ),
+    "severities": attr.string_list(
+        default = ["HIGH"],
+        doc = "Severities of the reports failing the test, " +
+              "CRITICAL reports always fail it",
+    ),
+    "archive": attr.bool(
+        default = False,
+        doc = "Pack the plist and log files of each translation unit " +
+              "into a single <file>_results.tar.gz",
+    ),
+    "analysis_timeout": attr.int(
+        default = 0,
+        doc = "Time budget of each translation unit in seconds, " +
+              "0 means no limit. Timed out files are reported " +
+              "but do not fail the build.",
+    ),
+    "analysis_timeout_fatal": attr.bool(
+        default = False,
+        doc = "Fail the analysis if any translation unit timed out",
+    ),
+    "_per_file_script_template": attr.label(
+        default = ":per_file_script.py",
+        allow_single_file = True,
+    ),
+    "_python_runtime": attr.label(
+        default = "@default_python_tools//:py3_runtime",
+    ),
+    "_codechecker_summary": attr.label(
+        default = ":codechecker_summary",
+        executable = True,
+        cfg = "exec",
+    ),
+    "_codechecker_summary_script": attr.label(
+        default = ":codechecker_summary.py",
+        allow_single_file = True,
+    ),
+    "_codechecker_paths_script": attr.label(
+        default = ":codechecker_paths.py",
+        allow_single_file = True,
+    ),
+}
+
 per_file_test = rule(
     implementation = _per_file_impl,
-    attrs = {
-        "options": attr.string_list(
-            default = [],
-            doc = "List of CodeChecker options, e.g.: --ctu",
-        ),
-        "default_options": attr.string_list(
-            default = [
-                "--analyzers clangsa clang-tidy",
-                "--clean",
-            ],
-            doc = "List of default CodeChecker analyze options",
-        ),
+    attrs = _PER_FILE_ATTRS | PACKAGE_FILTER_ATTRIBUTES | HTML_ATTRIBUTES | {
         "targets": attr.label_list(
             aspects = [
                 compile_commands_aspect,
             ],
             doc = "List of compilable targets which should be checked.",
         ),
-        "config": attr.label(
-            default = None,
-            doc = "CodeChecker configuration",
+    },
+    outputs = {
+        "compile_commands": "%{name}/compile_commands.json",
+        "test_script": "%{name}/test_script.sh",
+        "per_file_script": "%{name}/per_file_script.py",
+        "codechecker_skipfile": "%{name}/codechecker_skipfile.cfg",
+    },
+    toolchains = [
+        codechecker_toolchain_type(),
+        clang_toolchain_type(),
+    ],
+    test = True,
+)
+
+def _per_file_suite_impl(ctx):
+    options = ctx.attr.default_options + ctx.attr.options
+
+    # CTU analysis needs the translation units of the platform together
+    if "--ctu" in options:
+        fail("--ctu is not supported by codechecker_suite(dedupe = True)")
+    units = {}
+    platforms = {}
+    total_units = 0
+    for alias, targets in ctx.split_attr.targets.items():
+        keys, _ = _collect_units(ctx, targets, units)
+        total_units += len(keys)
+
+        # Platform labels are not valid directory names
+        alias = (alias or "default").lstrip("@/")
+        platforms[alias.replace("/", "_").replace(":", "_")] = keys
+
+    # Every translation unit may be filtered out, e.g. by changed files
+    if not units and not _has_compile_commands(ctx.split_attr.targets):
+        fail("Compilation database is empty!")
+    config_file, _ = get_config_file(ctx)
+    _create_wrapper_script(ctx, options, config_file)
+
+    # Analyze each distinct translation unit once
+    outputs, all_files = _analyze_units(ctx, units, config_file)
+    timings_files = [unit_outputs.timings for unit_outputs in outputs.values()]
+
+    # Fan the results out to the platforms
+    platform_files = []
+    summaries = []
+    for alias, keys in platforms.items():
+        result, summary = _merge_summaries(
+            ctx,
+            "{}/{}".format(ctx.attr.name, alias),
+            [outputs[key].summary for key in keys],
+        )
+        summaries.append(summary)
+        platform_files += [result, summary]
+        for key in keys:
+            for result in outputs[key].results:
+                link = ctx.actions.declare_file("{}/{}/data/{}".format(
+                    ctx.attr.name,
+                    alias,
+                    result.basename,
+                ))
+                ctx.actions.symlink(output = link, target_file = result)
+                platform_files.append(link)
+    suite_timings = _dedupe_timings(
+        ctx,
+        "suite",
+        total_units,
+        len(units),
+        {alias: len(keys) for alias, keys in platforms.items()},
+    )
+    timings_files.append(suite_timings)
+
+    ctx.actions.write(
+        output = ctx.outputs.test_script,
+        is_executable = True,
+        content = _check_script(ctx, summaries) + "\n",
+    )
+    files = depset(all_files + platform_files + [suite_timings])
+    run_files = [ctx.outputs.test_script] + summaries + ctx.files.baseline + \
+                ctx.files._codechecker_summary_script + \
+                ctx.files._codechecker_paths_script
+
+    # A translation unit has the same report on every platform
+    html_files = _html_units(ctx, outputs, units, config_file)
+    return [
+        DefaultInfo(
+            files = files,
+            runfiles = ctx.runfiles(files = run_files),
+            executable = ctx.outputs.test_script,
+        ),
+        OutputGroupInfo(
+            codechecker_timings = depset(timings_files),
+            codechecker_summary = depset(summaries),
+            codechecker_files = files,
+            codechecker_html = depset(html_files),
         ),
-        "_per_file_script_template": attr.label(
-            default = ":per_file_script.py",
-            allow_single_file = True,
+    ]
+
+per_file_suite_test = rule(
+    implementation = _per_file_suite_impl,
+    attrs = _PER_FILE_ATTRS | PACKAGE_FILTER_ATTRIBUTES | HTML_ATTRIBUTES |
+            version_specific_attributes() | {
+        "platforms": attr.string_list(
+            default = [""],
+            doc = "Platforms to analyze the targets for, " +
+                  "empty string means the current platform",
         ),
-        "_python_runtime": attr.label(
-            default = "@default_python_tools//:py3_runtime",
+        "targets": attr.label_list(
+            aspects = [
+                compile_commands_aspect,
+            ],
+            cfg = platforms_split_transition,
+            doc = "List of compilable targets which should be checked.",
         ),
     },
     outputs = {
-        "compile_commands": "%{name}/compile_commands.json",
         "test_script": "%{name}/test_script.sh",
         "per_file_script": "%{name}/per_file_script.py",
+        "codechecker_skipfile": "%{name}/codechecker_skipfile.cfg",
     },
+    toolchains = [
+        codechecker_toolchain_type(),
+        clang_toolchain_type(),
+    ],
+    doc = "Analyzes each distinct translation unit of the platforms once",
     test = True,
 )
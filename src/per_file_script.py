@@ -18,12 +18,18 @@
 Codechecker wrapper script for per-file analysis
 """
 
+import gzip
+import json
 import os
+import plistlib
 import re
 import shutil
+import signal
 import subprocess
 import sys
-from typing import Optional
+import tarfile
+import time
+from typing import Callable, Optional
 
 # The output directory for CodeChecker
 DATA_DIR: Optional[str] = None
@@ -32,14 +38,39 @@ FILE_PATH: Optional[str] = None
 # List of pairs of analyzers and their plist files
 ANALYZER_PLIST_PATHS: Optional[list[list[str]]] = None
 LOG_FILE: Optional[str] = None
-COMPILE_COMMANDS_JSON: str = "{compile_commands_json}"
-COMPILE_COMMANDS_ABSOLUTE: str = f"{COMPILE_COMMANDS_JSON}.abs"
+# Stage durations and analysis data in JSON format
+TIMINGS_FILE: Optional[str] = None
+CODECHECKER_BIN: str = "{codechecker_bin}"
+# Analyzer binaries from the clang toolchain, see CC_ANALYZER_BIN
+ANALYZER_BIN: str = "{analyzer_bin}"
+# Compilation database containing the file
+COMPILE_COMMANDS_JSON: Optional[str] = None
+COMPILE_COMMANDS_ABSOLUTE: Optional[str] = None
+# Reports of the file in CodeChecker JSON format, merged at build time
+SUMMARY_FILE: Optional[str] = None
+# Single archive of the plist and log files, empty if they are not packed
+ARCHIVE_FILE: Optional[str] = None
 CODECHECKER_ARGS: str = "{codechecker_args}"
 CONFIG_FILE: str = "{config_file}"
+# Time budget of the file in seconds, 0 means no limit
+ANALYSIS_TIMEOUT: int = int("{analysis_timeout}")
+ANALYSIS_TIMEOUT_FATAL: bool = "{analysis_timeout_fatal}".lower() == "true"
+# Extra time for CodeChecker itself, before its process group is killed
+TIMEOUT_GRACE: int = 30
+# CodeChecker log message of an analysis killed by --timeout
+TIMEOUT_WARNING: str = "Analyzer ran too long"
+if len(sys.argv) != 9:
+    print("Wrong amount of arguments")
+    sys.exit(1)
 DATA_DIR = sys.argv[1]
 FILE_PATH = sys.argv[2]
 LOG_FILE = sys.argv[3]
 ANALYZER_PLIST_PATHS = [item.split(",") for item in sys.argv[4].split(";")]
+TIMINGS_FILE = sys.argv[5]
+COMPILE_COMMANDS_JSON = sys.argv[6]
+COMPILE_COMMANDS_ABSOLUTE = f"{COMPILE_COMMANDS_JSON}.abs"
+SUMMARY_FILE = sys.argv[7]
+ARCHIVE_FILE = sys.argv[8]
 
 
 def log(msg: str) -> None:
@@ -56,9 +87,9 @@ def _create_compile_commands_json_with_absolute_paths():
     of the files.
     """
     with open(
-        COMPILE_COMMANDS_JSON, "r", encoding="utf-8"
+        COMPILE_COMMANDS_JSON, "r", encoding="utf-8"  # type: ignore
     ) as original_file, open(
-        COMPILE_COMMANDS_ABSOLUTE, "w", encoding="utf-8"
+        COMPILE_COMMANDS_ABSOLUTE, "w", encoding="utf-8"  # type: ignore
     ) as new_file:
         content = original_file.read()
         # Replace "directory":"." with the absolute path
@@ -69,18 +100,20 @@ def _create_compile_commands_json_with_absolute_paths():
         new_file.write(new_content)
 
 
-def _run_codechecker() -> None:
+def _run_codechecker() -> tuple[Optional[int], str]:
     """
-    Runs CodeChecker analyze
+    Runs CodeChecker analyze, returns its exit code and the analysis status
     """
     codechecker_cmd: list[str] = (
-        ["CodeChecker", "analyze"]
+        [CODECHECKER_BIN, "analyze"]
         + CODECHECKER_ARGS.split()
         + ["--output=" + DATA_DIR]  # type: ignore
         + ["--file=*/" + FILE_PATH]  # type: ignore
         + ["--config", CONFIG_FILE]
-        + [COMPILE_COMMANDS_ABSOLUTE]
+        + [COMPILE_COMMANDS_ABSOLUTE]  # type: ignore
     )
+    if ANALYSIS_TIMEOUT:
+        codechecker_cmd += ["--timeout", str(ANALYSIS_TIMEOUT)]
     log(f"CodeChecker command: {' '.join(codechecker_cmd)}\n")
     log("===-----------------------------------------------------===\n")
     log("                   CodeChecker error log                   \n")
@@ -96,19 +129,37 @@ def _run_codechecker() -> None:
     )
     log(result.stdout)
 
-    try:
-        with open(LOG_FILE, "a", encoding="utf-8") as log_file:  # type: ignore
-            subprocess.run(
-                codechecker_cmd,
-                env=os.environ,
-                stdout=log_file,
-                stderr=log_file,
-                check=True,
-            )
-    except subprocess.CalledProcessError as e:
-        log(e.output.decode() if e.output else "")
-        if e.returncode == 1 or e.returncode >= 128:
-            _display_error(e.returncode)
+    env = dict(os.environ)
+    if ANALYZER_BIN:
+        env["CC_ANALYZER_BIN"] = ANALYZER_BIN
+    with open(LOG_FILE, "a", encoding="utf-8") as log_file:  # type: ignore
+        # CodeChecker gets its own process group,
+        # so the analyzers can be killed together with it
+        with subprocess.Popen(
+            codechecker_cmd,
+            env=env,
+            stdout=log_file,
+            stderr=log_file,
+            start_new_session=True,
+        ) as process:
+            try:
+                return_code = process.wait(
+                    timeout=ANALYSIS_TIMEOUT + TIMEOUT_GRACE
+                    if ANALYSIS_TIMEOUT
+                    else None
+                )
+            except subprocess.TimeoutExpired:
+                os.killpg(process.pid, signal.SIGKILL)
+                process.wait()
+                log(f"\n[WARNING]: CodeChecker killed after "
+                    f"{ANALYSIS_TIMEOUT + TIMEOUT_GRACE} seconds\n")
+                return None, "timeout"
+    if return_code == 1 or return_code >= 128:
+        _display_error(return_code)
+    with open(LOG_FILE, "r", encoding="utf-8") as log_file:  # type: ignore
+        if TIMEOUT_WARNING in log_file.read():
+            return return_code, "timeout"
+    return return_code, "ok"
 
 
 def _display_error(ret_code: int) -> None:
@@ -143,16 +194,159 @@ def _move_plist_files():
                     )
 
 
+def _timed(timings: dict[str, float], name: str, function: Callable):
+    """
+    Run function, save its duration (in seconds) and return its result
+    """
+    start = time.monotonic()
+    result = function()
+    timings[name] = round(time.monotonic() - start, 3)
+    return result
+
+
+def _write_missing_plist_files():
+    """
+    Write empty plist files for the analyzers killed by the timeout
+    """
+    for analyzer_info in ANALYZER_PLIST_PATHS:  # type: ignore
+        if not os.path.isfile(analyzer_info[1]):
+            with open(analyzer_info[1], "wb") as plist_file:
+                plistlib.dump({"diagnostics": [], "files": []}, plist_file)
+
+
+def _write_summary(status: str) -> None:
+    """
+    Write the report counts by severity and the findings of the plist files
+    into the summary file. Only the fields needed by the merged result and
+    the HTML index are kept, the bug paths stay in the plist files.
+    """
+    parse_cmd: list[str] = (
+        [CODECHECKER_BIN, "parse", "--export", "json"]
+        + ["--config", CONFIG_FILE]
+        + [plist for _, plist in ANALYZER_PLIST_PATHS]  # type: ignore
+    )
+    result = subprocess.run(
+        parse_cmd,
+        env=os.environ,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    # CodeChecker parse returns 2 if there are reports
+    if result.returncode not in (0, 2):
+        log(result.stdout + result.stderr)
+        _display_error(result.returncode)
+    reports = json.loads(result.stdout or "{}").get("reports", [])
+    severities: dict[str, int] = {}
+    for report in reports:
+        severity = report.get("severity")
+        severities[severity] = severities.get(severity, 0) + 1
+    data = {
+        "version": 1,
+        "file": FILE_PATH,
+        "status": status,
+        "reports": len(reports),
+        "severities": severities,
+        "findings": [
+            {
+                "report_hash": report.get("report_hash"),
+                "severity": report.get("severity"),
+                "checker_name": report.get("checker_name"),
+                "analyzer_name": report.get("analyzer_name"),
+                "file": report["file"]["path"],
+                "line": report.get("line"),
+                "column": report.get("column"),
+                "message": report.get("message"),
+            }
+            for report in reports
+        ],
+    }
+    with open(SUMMARY_FILE, "w", encoding="utf-8") as summary_file:  # type: ignore
+        json.dump(data, summary_file, indent=1)
+
+
+def _save_timings(
+    timings: dict[str, float], exit_code: Optional[int], status: str
+) -> None:
+    """
+    Save stage durations and data of the analyzed file in JSON format
+    """
+    output_bytes = 0
+    for analyzer_info in ANALYZER_PLIST_PATHS:  # type: ignore
+        if os.path.isfile(analyzer_info[1]):
+            output_bytes += os.path.getsize(analyzer_info[1])
+    data = {
+        "version": 1,
+        "mode": "per_file",
+        "stages": timings,
+        "exit_code": exit_code,
+        "translation_units": [
+            {
+                "file": FILE_PATH,
+                "size": os.path.getsize(FILE_PATH),  # type: ignore
+                "duration": timings["analyze"],
+                "status": status,
+                "output_bytes": output_bytes,
+            }
+        ],
+    }
+    with open(TIMINGS_FILE, "w", encoding="utf-8") as timings_file:  # type: ignore
+        json.dump(data, timings_file, indent=2)
+
+
+def _pack_results() -> None:
+    """
+    Pack the plist and log files into ARCHIVE_FILE, the archive
+    is reproducible: no owners, timestamps or compression time
+    """
+    results = [plist for _, plist in ANALYZER_PLIST_PATHS]  # type: ignore
+    results.append(LOG_FILE)  # type: ignore
+    with open(ARCHIVE_FILE, "wb") as output, gzip.GzipFile(  # type: ignore
+        fileobj=output, mode="wb", mtime=0
+    ) as stream, tarfile.open(fileobj=stream, mode="w") as tar:
+        for result in results:
+            info = tar.gettarinfo(result, arcname=os.path.basename(result))
+            info.mtime = 0
+            info.uid = info.gid = 0
+            info.uname = info.gname = ""
+            with open(result, "rb") as result_file:
+                tar.addfile(info, result_file)
+
+
+def _remove_packed_results() -> None:
+    """
+    Remove the packed files, only the archive is a declared output
+    """
+    for _, plist in ANALYZER_PLIST_PATHS:  # type: ignore
+        os.remove(plist)
+    os.remove(LOG_FILE)  # type: ignore
+
+
 def main():
     """
     Main function of CodeChecker wrapper
     """
-    if len(sys.argv) != 5:
-        print("Wrong amount of arguments")
+    timings: dict[str, float] = {}
+    _timed(
+        timings,
+        "compile_commands",
+        _create_compile_commands_json_with_absolute_paths,
+    )
+    exit_code, status = _timed(timings, "analyze", _run_codechecker)
+    _timed(timings, "move_plist_files", _move_plist_files)
+    if status == "timeout":
+        log(f"[WARNING]: Analysis of {FILE_PATH} timed out "
+            f"after {ANALYSIS_TIMEOUT} seconds\n")
+        _write_missing_plist_files()
+    _timed(timings, "summary", lambda: _write_summary(status))
+    if ARCHIVE_FILE:
+        _timed(timings, "archive", _pack_results)
+    _save_timings(timings, exit_code, status)
+    if ARCHIVE_FILE:
+        _remove_packed_results()
+    if status == "timeout" and ANALYSIS_TIMEOUT_FATAL:
+        print(f"[ERROR]: Analysis of {FILE_PATH} timed out!")
         sys.exit(1)
-    _create_compile_commands_json_with_absolute_paths()
-    _run_codechecker()
-    _move_plist_files()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,219 @@
+# Copyright 2023 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Toolchains for CodeChecker and the clang based analyzers.
+
+Both toolchain types are optional: if no toolchain is registered,
+the rules fall back to the tools found on the host (PATH).
+When a toolchain is registered, its files are declared as action inputs,
+so the analysis can run remotely and a tool upgrade invalidates the results.
+"""
+
+load("@default_codechecker_tools//:defs.bzl", "CODECHECKER_BIN_PATH")
+
+CODECHECKER_TOOLCHAIN_TYPE = Label("//src:codechecker_toolchain_type")
+CLANG_TOOLCHAIN_TYPE = Label("//src:clang_toolchain_type")
+
+def codechecker_toolchain_type():
+    """
+    Returns the optional CodeChecker toolchain type
+    """
+    return config_common.toolchain_type(
+        CODECHECKER_TOOLCHAIN_TYPE,
+        mandatory = False,
+    )
+
+def clang_toolchain_type():
+    """
+    Returns the optional clang analysis toolchain type
+    """
+    return config_common.toolchain_type(
+        CLANG_TOOLCHAIN_TYPE,
+        mandatory = False,
+    )
+
+def _tool_path(ctx, attr_name, path_attr_name):
+    """
+    Returns (path, files) of a tool given either as a label or as a path
+    """
+    target = getattr(ctx.attr, attr_name)
+    if target:
+        files_to_run = target[DefaultInfo].files_to_run
+        return (
+            files_to_run.executable.path,
+            depset(
+                [files_to_run.executable],
+                transitive = [target[DefaultInfo].default_runfiles.files],
+            ),
+        )
+    return (getattr(ctx.attr, path_attr_name), depset())
+
+def _codechecker_toolchain_impl(ctx):
+    codechecker_bin, codechecker_files = _tool_path(
+        ctx,
+        "codechecker",
+        "codechecker_path",
+    )
+    if not codechecker_bin:
+        fail("Either codechecker or codechecker_path must be set")
+    return [
+        platform_common.ToolchainInfo(
+            codechecker_bin = codechecker_bin,
+            files = depset(
+                ctx.files.data,
+                transitive = [codechecker_files],
+            ),
+        ),
+    ]
+
+codechecker_toolchain = rule(
+    implementation = _codechecker_toolchain_impl,
+    attrs = {
+        "codechecker": attr.label(
+            default = None,
+            executable = True,
+            cfg = "exec",
+            doc = "CodeChecker executable",
+        ),
+        "codechecker_path": attr.string(
+            default = "CodeChecker",
+            doc = "CodeChecker executable path, used when " +
+                  "codechecker is not set (not hermetic)",
+        ),
+        "data": attr.label_list(
+            default = [],
+            allow_files = True,
+            cfg = "exec",
+            doc = "Files required to run CodeChecker, e.g. its Python package",
+        ),
+    },
+    doc = "Defines a CodeChecker toolchain",
+)
+
+def _clang_analysis_toolchain_impl(ctx):
+    clang_bin, clang_files = _tool_path(ctx, "clang", "clang_path")
+    clang_tidy_bin, clang_tidy_files = _tool_path(
+        ctx,
+        "clang_tidy",
+        "clang_tidy_path",
+    )
+    extdef_mapping_bin, extdef_mapping_files = _tool_path(
+        ctx,
+        "clang_extdef_mapping",
+        "clang_extdef_mapping_path",
+    )
+    return [
+        platform_common.ToolchainInfo(
+            clang_bin = clang_bin,
+            clang_tidy_bin = clang_tidy_bin,
+            clang_extdef_mapping_bin = extdef_mapping_bin,
+            files = depset(
+                ctx.files.data,
+                transitive = [
+                    clang_files,
+                    clang_tidy_files,
+                    extdef_mapping_files,
+                ],
+            ),
+        ),
+    ]
+
+clang_analysis_toolchain = rule(
+    implementation = _clang_analysis_toolchain_impl,
+    attrs = {
+        "clang": attr.label(
+            default = None,
+            executable = True,
+            cfg = "exec",
+            doc = "Clang executable",
+        ),
+        "clang_path": attr.string(
+            default = "clang",
+            doc = "Clang executable path, used when clang is not set",
+        ),
+        "clang_tidy": attr.label(
+            default = None,
+            executable = True,
+            cfg = "exec",
+            doc = "Clang-tidy executable",
+        ),
+        "clang_tidy_path": attr.string(
+            default = "clang-tidy",
+            doc = "Clang-tidy executable path, used when clang_tidy is not set",
+        ),
+        "clang_extdef_mapping": attr.label(
+            default = None,
+            executable = True,
+            cfg = "exec",
+            doc = "clang-extdef-mapping executable (for CTU analysis)",
+        ),
+        "clang_extdef_mapping_path": attr.string(
+            default = "clang-extdef-mapping",
+            doc = "clang-extdef-mapping executable path, used when " +
+                  "clang_extdef_mapping is not set",
+        ),
+        "data": attr.label_list(
+            default = [],
+            allow_files = True,
+            cfg = "exec",
+            doc = "Files required to run the tools, e.g. clang resource dir",
+        ),
+    },
+    doc = "Defines a toolchain of clang based analyzers",
+)
+
+def codechecker_toolchain_info(ctx):
+    """
+    Returns the resolved CodeChecker toolchain,
+    or the CodeChecker found on the host if none is registered
+    """
+    toolchain = ctx.toolchains[CODECHECKER_TOOLCHAIN_TYPE]
+    if toolchain:
+        return toolchain
+    if not CODECHECKER_BIN_PATH:
+        fail("CodeChecker is not detected: add it to PATH " +
+             "or register a codechecker_toolchain")
+    return struct(
+        codechecker_bin = CODECHECKER_BIN_PATH,
+        files = depset(),
+    )
+
+def clang_toolchain_info(ctx):
+    """
+    Returns the resolved clang analysis toolchain,
+    or the tools from PATH if none is registered
+    """
+    toolchain = ctx.toolchains[CLANG_TOOLCHAIN_TYPE]
+    if toolchain:
+        return toolchain
+    return struct(
+        clang_bin = "clang",
+        clang_tidy_bin = "clang-tidy",
+        clang_extdef_mapping_bin = "clang-extdef-mapping",
+        files = depset(),
+    )
+
+def codechecker_analyzer_env(ctx):
+    """
+    Returns CC_ANALYZER_BIN value pointing CodeChecker to the clang
+    toolchain binaries, or empty string if no clang toolchain is registered
+    """
+    toolchain = ctx.toolchains[CLANG_TOOLCHAIN_TYPE]
+    if not toolchain:
+        return ""
+    return "clangsa:{};clang-tidy:{}".format(
+        toolchain.clang_bin,
+        toolchain.clang_tidy_bin,
+    )
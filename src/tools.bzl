@@ -101,11 +101,13 @@ def _codechecker_local_repository_impl(repository_ctx):
         executable = False,
     )
 
+    # CodeChecker is optional on the host when a codechecker_toolchain
+    # is registered, the rules fail only if neither is available
     codechecker_bin_path = repository_ctx.which("CodeChecker")
-    if not codechecker_bin_path:
-        fail("ERROR! CodeChecker is not detected")
-
-    defs = "CODECHECKER_BIN_PATH = '{}'\n".format(codechecker_bin_path)
+    if codechecker_bin_path:
+        defs = "CODECHECKER_BIN_PATH = '{}'\n".format(codechecker_bin_path)
+    else:
+        defs = "CODECHECKER_BIN_PATH = None\n"
     defs += "BAZEL_VERSION = '{}'\n".format(native.bazel_version)
     repository_ctx.file(
         repository_ctx.path("defs.bzl"),
@@ -116,6 +118,7 @@ def _codechecker_local_repository_impl(repository_ctx):
 default_codechecker_tools = repository_rule(
     attrs = {},
     local = True,
+    environ = ["PATH"],
     doc = "Generate repository for default CodeChecker tools",
     implementation = _codechecker_local_repository_impl,
 )
@@ -0,0 +1,275 @@
+# Copyright 2023 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark the analysis phase of the rules on wide and deep target graphs
+
+For each graph shape the graph is generated in two sizes (size and 2 * size).
+Every rule target is analyzed (bazel build --nobuild) by a fresh Bazel
+server, the phase times are taken from bazel analyze-profile and the retained
+memory from bazel info used-heap-size-after-gc.
+
+The total number of action inputs of each rule target is taken from
+bazel aquery.
+
+The benchmark fails if a result exceeds the limits of the thresholds file,
+or if doubling the graph grows the analysis time, the heap or (on the wide
+graph) the action inputs more than max_growth times (e.g. 4x growth shows
+quadratic behavior):
+
+    cd test
+    python3 -m benchmark.analysis_benchmark --size 500 -o analysis.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+
+from benchmark.run_benchmark import bazel_version, parse_common, run
+from benchmark.synthetic import generate_graph
+
+THRESHOLDS_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "analysis_thresholds.json"
+)
+# (width, depth) of the graph shapes, given the size
+SHAPES = {
+    "wide": lambda size: (size, 1),
+    "deep": lambda size: (1, size),
+}
+# Total interleaved loading-and-analysis phase time    1.234 s   45.67%
+PHASE = re.compile(r"Total (.+?) phase time\s+([\d.]+) (us|ms|s)\b")
+UNITS = {"us": 1e-6, "ms": 1e-3, "s": 1.0}
+ANALYSIS_PHASE = "interleaved loading-and-analysis"
+METRICS = ["analysis_seconds", "heap_mb", "action_inputs"]
+# The translation units of a chain include all headers below them,
+# so the action inputs grow linearly only on the wide graph
+INPUT_GROWTH_SHAPES = ["wide"]
+# CTU analysis of each translation unit reads the ASTs of all units
+QUADRATIC_INPUT_RULES = ["clang_ctu_test"]
+# Inputs: [a.cc, a.h, ...], in the bazel aquery text output
+ACTION_INPUTS = re.compile(r"^\s+Inputs: \[(.*)\]$", re.MULTILINE)
+
+
+def parse_args():
+    """
+    Parse command line arguments or show help.
+    """
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        "--shapes",
+        nargs="+",
+        choices=sorted(SHAPES),
+        default=sorted(SHAPES),
+        help="graph shapes to benchmark",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default="analysis_benchmark.json",
+        help="JSON report file (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--size",
+        type=int,
+        default=200,
+        help="number of targets in the width or depth of the smaller graph",
+    )
+    parser.add_argument(
+        "--thresholds",
+        default=THRESHOLDS_FILE,
+        help="thresholds JSON file (default: analysis_thresholds.json)",
+    )
+    return parse_common(parser, "ANALYSIS BENCHMARK")
+
+
+def phase_times(profile_summary):
+    """
+    Return the phase times in seconds from the bazel analyze-profile output
+    """
+    return {
+        phase: round(float(value) * UNITS[unit], 3)
+        for phase, value, unit in PHASE.findall(profile_summary)
+    }
+
+
+def used_heap_mb(project_dir):
+    """
+    Return the heap retained by the Bazel server after a full GC in MB
+    """
+    code, stdout = run(
+        ["bazel", "info", "used-heap-size-after-gc"], project_dir, stdout=True
+    )
+    match = re.search(r"(\d+)MB", stdout)
+    if code or not match:
+        raise RuntimeError(f"Cannot read the heap size: {stdout}")
+    return int(match.group(1))
+
+
+def action_inputs(project_dir, target):
+    """
+    Return the total number of inputs of the actions of target
+    """
+    code, stdout = run(
+        ["bazel", "aquery", "--output=text", f":{target}"],
+        project_dir,
+        stdout=True,
+    )
+    if code:
+        raise RuntimeError(f"Cannot query the actions of {target}")
+    return sum(
+        len(inputs.split(", "))
+        for inputs in ACTION_INPUTS.findall(stdout)
+        if inputs
+    )
+
+
+def analyze(project_dir, target):
+    """
+    Analyze target by a fresh Bazel server, return the phase times and heap
+    """
+    run(["bazel", "shutdown"], project_dir)
+    profile = os.path.join(project_dir, "analysis.profile.gz")
+    code, stderr = run(
+        [
+            "bazel",
+            "build",
+            "--nobuild",
+            f"--profile={profile}",
+            f":{target}",
+        ],
+        project_dir,
+    )
+    if code:
+        raise RuntimeError(f"Analysis of {target} failed:\n{stderr}")
+    heap = used_heap_mb(project_dir)
+    _, summary = run(
+        ["bazel", "analyze-profile", profile], project_dir, stdout=True
+    )
+    phases = phase_times(summary)
+    return {
+        "analysis_seconds": phases.get(ANALYSIS_PHASE, 0.0),
+        "heap_mb": heap,
+        "action_inputs": action_inputs(project_dir, target),
+        "phases": phases,
+    }
+
+
+def benchmark_shape(shape, size, rules, work_dir):
+    """
+    Yield the analysis results of the rules on a graph shape
+    """
+    width, depth = SHAPES[shape](size)
+    project_dir = os.path.join(work_dir, f"{shape}_{size}")
+    generate_graph(project_dir, width, depth)
+    logging.info("Graph: %s, %d x %d targets", shape, width, depth)
+    # Fetch the external repositories before measuring
+    run(["bazel", "build", "--nobuild"] + [f":{rule}" for rule in rules],
+        project_dir)
+    try:
+        for rule in rules:
+            result = analyze(project_dir, rule)
+            result.update({"shape": shape, "size": size, "rule": rule})
+            logging.info(
+                "  %-20s %8.3f s %6d MB %8d inputs",
+                rule,
+                result["analysis_seconds"],
+                result["heap_mb"],
+                result["action_inputs"],
+            )
+            yield result
+    finally:
+        run(["bazel", "shutdown"], project_dir)
+
+
+def check_thresholds(results, thresholds):
+    """
+    Return the violations of the thresholds
+    """
+    violations = []
+    by_key = {
+        (result["shape"], result["size"], result["rule"]): result
+        for result in results
+    }
+    for (shape, size, rule), result in by_key.items():
+        for metric in METRICS:
+            limit = thresholds["limits"][metric]
+            if result[metric] > limit:
+                violations.append(
+                    f"{shape} {size} {rule}: {metric} {result[metric]} "
+                    f"exceeds {limit}"
+                )
+        small = by_key.get((shape, size // 2, rule))
+        if not small:
+            continue
+        for metric in METRICS:
+            if metric == "action_inputs" and (
+                shape not in INPUT_GROWTH_SHAPES
+                or rule in QUADRATIC_INPUT_RULES
+            ):
+                continue
+            delta = result[metric] - small[metric]
+            if delta < thresholds["min_growth_delta"][metric]:
+                continue
+            growth = result[metric] / max(small[metric], 1e-3)
+            if growth > thresholds["max_growth"]:
+                violations.append(
+                    f"{shape} {rule}: {metric} grew {growth:.1f}x "
+                    f"({small[metric]} -> {result[metric]}) "
+                    "when the graph size doubled"
+                )
+    return violations
+
+
+def main():
+    """
+    Main function
+    """
+    options = parse_args()
+    with open(options.thresholds, encoding="utf-8") as handle:
+        thresholds = json.load(handle)
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for shape in options.shapes:
+            for size in [options.size, options.size * 2]:
+                results.extend(
+                    benchmark_shape(shape, size, options.rules, work_dir)
+                )
+    violations = check_thresholds(results, thresholds)
+    for violation in violations:
+        logging.error("Threshold violated: %s", violation)
+    with open(options.output, "w", encoding="utf-8") as handle:
+        json.dump(
+            {
+                "version": 1,
+                "bazel": bazel_version(),
+                "thresholds": thresholds,
+                "results": results,
+                "violations": violations,
+            },
+            handle,
+            indent=2,
+        )
+    logging.info("Report saved to %s", options.output)
+    if violations:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+# Copyright 2023 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark the rules on a synthetic project and on the FOSS projects
+
+For every project and rule the following scenarios are measured:
+    cold:        bazel clean, then build
+    warm:        no-op rebuild
+    source_edit: rebuild after editing one source file
+    header_edit: rebuild after editing one widely included header
+
+The wall time, the number of created and executed actions, the action cache
+hits, the number and size of the output files, the execution phase time
+and the process summary of Bazel (e.g. disk cache hits) are saved
+into a JSON report, which can be compared to an earlier report:
+
+    cd test
+    python3 -m benchmark.run_benchmark -o new.json --baseline old.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmark.synthetic import generate
+
+FOSS_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "foss"
+)
+RULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")
+SYNTHETIC_RULES = [
+    "codechecker_test",
+    "per_file_test",
+    # Outputs packed into archives, compare to the rules above
+    "codechecker_archive_test",
+    "per_file_archive_test",
+    "clang_tidy_test",
+    "clang_analyze_test",
+    "clang_ctu_test",
+]
+# FOSS projects only define the CodeChecker targets (see test/README.md)
+FOSS_RULES = [
+    "codechecker_test",
+    "per_file_test",
+]
+# Files edited by the source_edit and header_edit scenarios
+FOSS_EDITS = {
+    "zlib": {"source": "adler32.c", "header": "zutil.h"},
+    "zlib-module": {"source": "adler32.c", "header": "zutil.h"},
+    "yaml-cpp": {
+        "source": "src/node.cpp",
+        "header": "include/yaml-cpp/node/node.h",
+    },
+}
+SCENARIOS = ["cold", "warm", "source_edit", "header_edit"]
+# INFO: 12 processes: 4 disk cache hit, 6 internal, 2 linux-sandbox.
+PROCESSES = re.compile(r"INFO: (\d+) process(?:es)?(?:: (.*))?\.$", re.M)
+
+
+def parse_args():
+    """
+    Parse command line arguments or show help.
+    """
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default="benchmark.json",
+        help="JSON report file (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--projects",
+        nargs="+",
+        default=["synthetic"] + sorted(FOSS_EDITS),
+        help="projects to benchmark (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--units",
+        type=int,
+        default=50,
+        help="translation units of the synthetic project",
+    )
+    parser.add_argument(
+        "--fanout",
+        type=int,
+        default=5,
+        help="headers included by a synthetic translation unit",
+    )
+    parser.add_argument(
+        "--depth",
+        type=int,
+        default=3,
+        help="depth of the synthetic cc_library chain",
+    )
+    parser.add_argument(
+        "--bazel_args",
+        default="",
+        help="extra bazel build arguments, e.g. --disk_cache=/tmp/cache",
+    )
+    parser.add_argument(
+        "--baseline",
+        default=None,
+        help="earlier report to compare the wall times against",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="allowed relative slowdown compared to the baseline",
+    )
+    parser.add_argument(
+        "--min_delta",
+        type=float,
+        default=1.0,
+        help="ignore slowdowns smaller than this (seconds)",
+    )
+    return parse_common(parser, "BENCHMARK")
+
+
+def parse_common(parser, log_prefix):
+    """
+    Add the options common to the benchmarks,
+    parse the arguments and set up logging
+    """
+    parser.add_argument(
+        "--rules",
+        nargs="+",
+        default=SYNTHETIC_RULES,
+        help="rule targets to benchmark (default: all)",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        help="print the bazel commands",
+    )
+    options = parser.parse_args()
+    logging.basicConfig(
+        format=f"[{log_prefix}] %(levelname)5s: %(message)s",
+        level=logging.DEBUG if options.verbose else logging.INFO,
+    )
+    return options
+
+
+def run(command, cwd, stdout=False):
+    """
+    Run command, return (exit code, stderr) or (exit code, stdout)
+    """
+    logging.debug("Running: %s", " ".join(command))
+    process = subprocess.run(
+        command,
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=False,
+    )
+    if stdout:
+        return process.returncode, process.stdout
+    return process.returncode, process.stderr
+
+
+def build_metrics(event_file):
+    """
+    Return the action metrics from the build event protocol file
+    """
+    metrics = {}
+    with open(event_file, encoding="utf-8") as handle:
+        for line in handle:
+            event = json.loads(line)
+            if "buildMetrics" in event:
+                metrics = event["buildMetrics"]
+    actions = metrics.get("actionSummary", {})
+    cache = actions.get("actionCacheStatistics", {})
+    outputs = metrics.get("artifactMetrics", {}).get("outputArtifactsSeen", {})
+    timing = metrics.get("timingMetrics", {})
+    return {
+        "actions_created": int(actions.get("actionsCreated", 0)),
+        "actions_executed": int(actions.get("actionsExecuted", 0)),
+        "action_cache_hits": int(cache.get("hits", 0)),
+        "action_cache_misses": int(cache.get("misses", 0)),
+        # The cost of hashing, uploading and downloading the outputs
+        "output_files": int(outputs.get("count", 0)),
+        "output_bytes": int(outputs.get("sizeInBytes", 0)),
+        "execution_phase_ms": int(timing.get("executionPhaseTimeInMs", 0)),
+    }
+
+
+def process_summary(stderr):
+    """
+    Return the process counts by kind, e.g. {"disk cache hit": 4}
+    """
+    summary = {}
+    matches = PROCESSES.findall(stderr)
+    if not matches:
+        return summary
+    total, kinds = matches[-1]
+    summary["total"] = int(total)
+    for kind in kinds.split(", ") if kinds else []:
+        count, _, name = kind.partition(" ")
+        summary[name] = int(count)
+    return summary
+
+
+def measure(project_dir, target, bazel_args):
+    """
+    Build target and return the wall time and action metrics
+    """
+    with tempfile.NamedTemporaryFile(suffix=".json") as event_file:
+        command = [
+            "bazel",
+            "build",
+            f":{target}",
+            f"--build_event_json_file={event_file.name}",
+        ] + bazel_args.split()
+        start = time.monotonic()
+        code, stderr = run(command, project_dir)
+        wall_time = time.monotonic() - start
+        if code:
+            logging.error("Build of %s failed:\n%s", target, stderr)
+        result = {
+            "wall_time": round(wall_time, 3),
+            "exit_code": code,
+            "processes": process_summary(stderr),
+        }
+        result.update(build_metrics(event_file.name))
+    return result
+
+
+def edit(path):
+    """
+    Change the content of a file without changing its meaning
+    """
+    with open(path, "a", encoding="utf-8") as handle:
+        handle.write(f"\n// benchmark edit {time.time()}\n")
+
+
+def benchmark_rule(project_dir, target, edits, bazel_args):
+    """
+    Yield the results of the scenarios of a rule target
+    """
+    for scenario in SCENARIOS:
+        if scenario == "cold":
+            run(["bazel", "clean"], project_dir)
+        elif scenario == "source_edit":
+            edit(os.path.join(project_dir, edits["source"]))
+        elif scenario == "header_edit":
+            edit(os.path.join(project_dir, edits["header"]))
+        result = measure(project_dir, target, bazel_args)
+        result["scenario"] = scenario
+        logging.info(
+            "  %-20s %-12s %8.3f s, %d actions executed",
+            target,
+            scenario,
+            result["wall_time"],
+            result["actions_executed"],
+        )
+        yield result
+
+
+def init_foss_project(name, project_dir):
+    """
+    Initialize a FOSS project the same way as the FOSS tests
+    """
+    code, stderr = run(
+        ["sh", "init.sh", project_dir], os.path.join(FOSS_DIR, name)
+    )
+    if code:
+        raise RuntimeError(f"Failed to initialize {name}:\n{stderr}")
+    for build_file in ["MODULE.bazel", "WORKSPACE"]:
+        path = os.path.join(project_dir, build_file)
+        if not os.path.isfile(path):
+            continue
+        with open(path, encoding="utf-8") as handle:
+            content = handle.read()
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write(
+                content.replace("{rule_path}", os.path.abspath(RULES_DIR))
+            )
+
+
+def benchmark_project(name, options, work_dir):
+    """
+    Yield the results of all rules of a project
+    """
+    project_dir = os.path.join(work_dir, name)
+    if name == "synthetic":
+        edits = generate(
+            project_dir, options.units, options.fanout, options.depth
+        )
+        rules = options.rules
+    else:
+        init_foss_project(name, project_dir)
+        edits = FOSS_EDITS[name]
+        rules = [rule for rule in options.rules if rule in FOSS_RULES]
+    logging.info("Project: %s", name)
+    try:
+        for rule in rules:
+            for result in benchmark_rule(
+                project_dir, rule, edits, options.bazel_args
+            ):
+                result["project"] = name
+                result["rule"] = rule
+                yield result
+    finally:
+        run(["bazel", "shutdown"], project_dir)
+
+
+def compare(results, baseline_file, tolerance, min_delta):
+    """
+    Return the results which are slower than in the baseline report
+    """
+    with open(baseline_file, encoding="utf-8") as handle:
+        baseline = {
+            (result["project"], result["rule"], result["scenario"]): result
+            for result in json.load(handle)["results"]
+        }
+    regressions = []
+    for result in results:
+        key = (result["project"], result["rule"], result["scenario"])
+        if key not in baseline:
+            continue
+        old = baseline[key]["wall_time"]
+        new = result["wall_time"]
+        if new - old > min_delta and new > old * (1 + tolerance):
+            regressions.append(result)
+            logging.warning(
+                "Regression: %s %s %s: %.3f s -> %.3f s",
+                *key,
+                old,
+                new,
+            )
+    return regressions
+
+
+def bazel_version():
+    """
+    Return the version of Bazel
+    """
+    process = subprocess.run(
+        ["bazel", "--version"],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+        check=False,
+    )
+    return process.stdout.strip()
+
+
+def main():
+    """
+    Main function
+    """
+    options = parse_args()
+    unknown = set(options.projects) - set(FOSS_EDITS) - {"synthetic"}
+    if unknown:
+        logging.error("Unknown projects: %s", ", ".join(sorted(unknown)))
+        sys.exit(1)
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for name in options.projects:
+            results.extend(benchmark_project(name, options, work_dir))
+    report = {
+        "version": 1,
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "bazel": bazel_version(),
+        "host": platform.node(),
+        "cpus": os.cpu_count(),
+        "synthetic": {
+            "units": options.units,
+            "fanout": options.fanout,
+            "depth": options.depth,
+        },
+        "bazel_args": options.bazel_args,
+        "results": results,
+    }
+    with open(options.output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    logging.info("Report saved to %s", options.output)
+    failed = [result for result in results if result["exit_code"]]
+    if options.baseline and compare(
+        results, options.baseline, options.tolerance, options.min_delta
+    ):
+        sys.exit(1)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+# Copyright 2023 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Generate a synthetic C++ project to benchmark the rules
+
+The project is a chain of cc_library targets, one for each level of depth.
+Every translation unit includes a number of headers (fan-out) from its own
+and the deeper levels, so editing the header of the deepest level
+invalidates many translation units.
+
+    python3 -m benchmark.synthetic --units 100 --fanout 10 --depth 5 /tmp/proj
+
+generate_graph() creates a dependency graph of small cc_library targets
+instead, to measure how the analysis phase scales with the graph size.
+"""
+
+import argparse
+import os
+import shutil
+
+TEMPLATES_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "foss", "templates"
+)
+RULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")
+# Files edited by the one-file-edit and one-header-edit scenarios
+EDITED_SOURCE = "level_0/unit_0.cc"
+EDITED_HEADER = "level_{depth}/header_0.h"
+
+RULES_BUILD = """load(
+    "@rules_codechecker//src:codechecker.bzl",
+    "codechecker_test",
+)
+load(
+    "@rules_codechecker//src:clang.bzl",
+    "clang_analyze_test",
+    "clang_tidy_test",
+)
+load(
+    "@rules_codechecker//src:clang_ctu.bzl",
+    "clang_ctu_test",
+)
+
+codechecker_test(
+    name = "codechecker_test",
+    targets = {targets},
+)
+
+codechecker_test(
+    name = "per_file_test",
+    per_file = True,
+    targets = {targets},
+)
+
+codechecker_test(
+    name = "codechecker_archive_test",
+    archive = True,
+    targets = {targets},
+)
+
+codechecker_test(
+    name = "per_file_archive_test",
+    archive = True,
+    per_file = True,
+    targets = {targets},
+)
+
+clang_tidy_test(
+    name = "clang_tidy_test",
+    targets = {targets},
+)
+
+clang_analyze_test(
+    name = "clang_analyze_test",
+    targets = {targets},
+)
+
+clang_ctu_test(
+    name = "clang_ctu_test",
+    targets = {targets},
+)
+"""
+
+LIBRARY_BUILD = """
+cc_library(
+    name = "level_{level}",
+    srcs = {srcs},
+    hdrs = {hdrs},
+    deps = {deps},
+    visibility = ["//visibility:public"],
+)
+"""
+
+GRAPH_NODE_BUILD = """
+cc_library(
+    name = "{name}",
+    srcs = ["{name}.cc"],
+    hdrs = ["{name}.h"],
+    deps = {deps},
+)
+"""
+
+GRAPH_NODE_SOURCE = """#include "{name}.h"
+
+int {name}() {{
+    return {value};
+}}
+"""
+
+HEADER = """#pragma once
+
+namespace level_{level} {{
+int header_{index}(int value);
+
+inline int inline_{index}(int value) {{
+    return value + {index};
+}}
+}}  // namespace level_{level}
+"""
+
+SOURCE = """{includes}
+
+namespace level_{level} {{
+int header_{index}(int value) {{
+    int result = value;
+{calls}
+    return result;
+}}
+}}  // namespace level_{level}
+"""
+
+
+def parse_args():
+    """
+    Parse command line arguments or show help.
+    """
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("output", help="directory of the generated project")
+    parser.add_argument(
+        "--units",
+        type=int,
+        default=50,
+        help="number of translation units",
+    )
+    parser.add_argument(
+        "--fanout",
+        type=int,
+        default=5,
+        help="number of headers included by each translation unit",
+    )
+    parser.add_argument(
+        "--depth",
+        type=int,
+        default=3,
+        help="depth of the cc_library dependency chain",
+    )
+    return parser.parse_args()
+
+
+def distribute(units, depth):
+    """
+    Return the number of translation units on each level
+    """
+    levels = [units // depth] * depth
+    for level in range(units % depth):
+        levels[level] += 1
+    return levels
+
+
+def write_file(path, content):
+    """
+    Write content into path, create parent directories
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write(content)
+
+
+def included_headers(level, index, fanout, levels):
+    """
+    Return (level, header index) pairs of the headers included by a unit,
+    starting with the header of the deepest level
+    """
+    depth = len(levels)
+    headers = [(depth - 1, 0)] if level != depth - 1 or index else []
+    candidates = [
+        (header_level, header_index)
+        for header_level in range(level, depth)
+        for header_index in range(levels[header_level])
+        if (header_level, header_index) not in headers
+        and (header_level, header_index) != (level, index)
+    ]
+    step = max(len(candidates) // max(fanout, 1), 1)
+    headers += candidates[index % step::step]
+    return headers[:fanout]
+
+
+def write_level(output, level, fanout, levels):
+    """
+    Write the sources and headers of a level, return their paths
+    """
+    srcs = []
+    hdrs = []
+    for index in range(levels[level]):
+        headers = included_headers(level, index, fanout, levels)
+        includes = "\n".join(
+            f'#include "level_{header_level}/header_{header_index}.h"'
+            for header_level, header_index in [(level, index)] + headers
+        )
+        calls = "\n".join(
+            f"    result += level_{header_level}::"
+            f"inline_{header_index}(result);"
+            for header_level, header_index in headers
+        )
+        srcs.append(f"level_{level}/unit_{index}.cc")
+        hdrs.append(f"level_{level}/header_{index}.h")
+        write_file(
+            os.path.join(output, srcs[-1]),
+            SOURCE.format(
+                includes=includes,
+                level=level,
+                index=index,
+                calls=calls,
+            ),
+        )
+        write_file(
+            os.path.join(output, hdrs[-1]),
+            HEADER.format(level=level, index=index),
+        )
+    return srcs, hdrs
+
+
+def generate(output, units=50, fanout=5, depth=3):
+    """
+    Generate the synthetic project into output
+    """
+    if units < depth:
+        raise ValueError("Every level needs at least one translation unit")
+    if os.path.exists(output):
+        shutil.rmtree(output)
+    levels = distribute(units, depth)
+    build = RULES_BUILD.format(targets='[":level_0"]')
+    for level in range(depth):
+        srcs, hdrs = write_level(output, level, fanout, levels)
+        deps = [f":level_{level + 1}"] if level + 1 < depth else []
+        build += LIBRARY_BUILD.format(
+            level=level,
+            srcs=srcs,
+            hdrs=hdrs,
+            deps=deps,
+        ).replace("'", '"')
+    write_file(os.path.join(output, "BUILD"), build)
+    write_workspace(output)
+    return {
+        "source": EDITED_SOURCE,
+        "header": EDITED_HEADER.format(depth=depth - 1),
+    }
+
+
+def generate_graph(output, width, depth):
+    """
+    Generate a graph of depth levels of width cc_library targets into output.
+    Every target depends on all targets of the next level,
+    the root target depends on the first level.
+    """
+    if os.path.exists(output):
+        shutil.rmtree(output)
+    build = RULES_BUILD.format(targets='[":root"]')
+    for level in range(-1, depth):
+        names = [f"node_{level}_{index}" for index in range(width)]
+        if level < 0:
+            names = ["root"]
+        deps = [
+            f":node_{level + 1}_{index}" for index in range(width)
+        ] if level + 1 < depth else []
+        for name in names:
+            write_file(os.path.join(output, f"{name}.h"), f"int {name}();\n")
+            write_file(
+                os.path.join(output, f"{name}.cc"),
+                GRAPH_NODE_SOURCE.format(name=name, value=level + 1),
+            )
+            build += GRAPH_NODE_BUILD.format(
+                name=name,
+                deps=deps,
+            ).replace("'", '"')
+    write_file(os.path.join(output, "BUILD"), build)
+    write_workspace(output)
+
+
+def write_workspace(output):
+    """
+    Write the Bazel files which make output a project using the rules
+    """
+    with open(
+        os.path.join(TEMPLATES_DIR, "MODULE.template"), encoding="utf-8"
+    ) as template:
+        write_file(
+            os.path.join(output, "MODULE.bazel"),
+            template.read().replace("{rule_path}", os.path.abspath(RULES_DIR)),
+        )
+    # Enable MODULE.bazel (in Bazel 6)
+    write_file(os.path.join(output, ".bazelrc"), "common --enable_bzlmod\n")
+    write_file(os.path.join(output, "WORKSPACE"), "")
+    bazelversion = os.path.join(RULES_DIR, ".bazelversion")
+    if os.path.isfile(bazelversion):
+        shutil.copy(bazelversion, output)
+
+
+def main():
+    """
+    Main function
+    """
+    options = parse_args()
+    generate(options.output, options.units, options.fanout, options.depth)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# Copyright 2023 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tests packing the analysis outputs into archives
+"""
+import os
+import tarfile
+import unittest
+from common.base import TestBase
+
+
+class TestArchive(TestBase):
+    """Tests of the archive attribute"""
+
+    # Set working directory
+    __test_path__ = os.path.dirname(os.path.abspath(__file__))
+    BAZEL_BIN_DIR = os.path.join(
+        "../../..", "bazel-bin", "test", "unit", "archive"
+    )
+    BAZEL_TESTLOGS_DIR = os.path.join(
+        "../../..", "bazel-testlogs", "test", "unit", "archive"
+    )
+
+    def archive_members(self, path: str) -> list:
+        """Return the sorted member names of a tar.gz archive"""
+        with tarfile.open(path, "r:gz") as archive:
+            return sorted(archive.getnames())
+
+    def test_monolithic(self):
+        """Test: Monolithic outputs are a single archive read by the test"""
+        code, _, stderr = self.run_command(
+            "bazel test //test/unit/archive:codechecker_archive"
+        )
+        self.assertEqual(code, 0, stderr)
+        output_dir = os.path.join(self.BAZEL_BIN_DIR, "codechecker_archive")
+        self.assertFalse(
+            os.path.exists(os.path.join(output_dir, "codechecker-files"))
+        )
+        members = self.archive_members(
+            os.path.join(output_dir, "codechecker-files.tar.gz")
+        )
+        self.assertIn("result.json", members)
+        self.assertIn("result.txt", members)
+        self.assertTrue(
+            [member for member in members if member.endswith(".plist")]
+        )
+
+    def test_per_file(self):
+        """Test: Plist and log files of a translation unit are packed"""
+        code, _, stderr = self.run_command(
+            "bazel test //test/unit/archive:per_file_archive"
+        )
+        self.assertEqual(code, 0, stderr)
+        data_dir = os.path.join(self.BAZEL_BIN_DIR, "per_file_archive", "data")
+        prefix = "test-unit-archive-main.cc"
+        self.assertEqual(
+            sorted(os.listdir(data_dir)),
+            [
+                f"{prefix}_results.tar.gz",
+                f"{prefix}_summary.json",
+                f"{prefix}_timings.json",
+            ],
+        )
+        self.assertEqual(
+            self.archive_members(
+                os.path.join(data_dir, f"{prefix}_results.tar.gz")
+            ),
+            [
+                f"{prefix}_clang-tidy.plist",
+                f"{prefix}_clangsa.plist",
+                f"{prefix}_codechecker.log",
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main(buffer=True)
@@ -0,0 +1,79 @@
+# Copyright 2023 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests gating only on reports not in the baseline
+"""
+import json
+import os
+import unittest
+from common.base import TestBase
+
+
+class TestBaseline(TestBase):
+    """Tests of the baseline attribute"""
+
+    # Set working directory
+    __test_path__ = os.path.dirname(os.path.abspath(__file__))
+    BAZEL_BIN_DIR = os.path.join(
+        "../../..", "bazel-bin", "test", "unit", "baseline"
+    )
+    BAZEL_TESTLOGS_DIR = os.path.join(
+        "../../..", "bazel-testlogs", "test", "unit", "baseline"
+    )
+    BASELINE = "accepted.baseline"
+
+    def tearDown(self):
+        """Restore the empty baseline"""
+        with open(self.BASELINE, "w", encoding="utf-8"):
+            pass
+        super().tearDown()
+
+    def test_monolithic(self):
+        """Test: Monolithic test fails only on reports not in baseline"""
+        target = "//test/unit/baseline:codechecker_baseline"
+        code, _, _ = self.run_command(f"bazel test {target}")
+        self.assertNotEqual(code, 0)
+        result_file = os.path.join(
+            self.BAZEL_BIN_DIR,
+            "codechecker_baseline",
+            "codechecker-files",
+            "result.json",
+        )
+        with open(result_file, encoding="utf-8") as handle:
+            reports = json.load(handle)["reports"]
+        self.assertTrue(reports)
+        with open(self.BASELINE, "w", encoding="utf-8") as baseline:
+            baseline.write(
+                "\n".join(sorted({r["report_hash"] for r in reports}))
+            )
+        code, _, stderr = self.run_command(f"bazel test {target}")
+        self.assertEqual(code, 0, stderr)
+
+    def test_per_file(self):
+        """Test: Per-file test fails only on reports not in baseline"""
+        target = "//test/unit/baseline:per_file_baseline"
+        code, _, _ = self.run_command(f"bazel test {target}")
+        self.assertNotEqual(code, 0)
+        code, _, stderr = self.run_command(
+            "CodeChecker parse --export baseline --output "
+            f"{self.BASELINE} {self.BAZEL_BIN_DIR}/per_file_baseline/data"
+        )
+        self.assertIn(code, [0, 2], stderr)
+        code, _, stderr = self.run_command(f"bazel test {target}")
+        self.assertEqual(code, 0, stderr)
+
+
+if __name__ == "__main__":
+    unittest.main(buffer=True)
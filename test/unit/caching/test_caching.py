@@ -106,6 +106,33 @@ class TestCaching(TestBase):
             stderr.count(f"SUBCOMMAND: # {target} [action 'CodeChecker"), 1
         )
 
+    def test_bazel_test_per_file_html_caching(self):
+        """
+        Test whether only the HTML page of the changed
+        translation unit is rendered again
+        """
+        target = "//test/unit/caching/tmp:per_file_caching"
+        html = "--output_groups=codechecker_html"
+        ret, _, stderr = self.run_command(f"bazel build {target} {html}")
+        self.assertEqual(ret, 0, stderr)
+        try:
+            with open("tmp/secondary.cc", "a", encoding="utf-8") as f:
+                f.write("//test")
+        except FileNotFoundError:
+            self.fail("File not found!")
+        ret, _, stderr = self.run_command(
+            f"bazel build {target} {html} --subcommands"
+        )
+        self.assertEqual(ret, 0, stderr)
+        rendered = [
+            line
+            for line in stderr.splitlines()
+            if f"SUBCOMMAND: # {target} [action 'Rendering CodeChecker HTML"
+            in line
+        ]
+        self.assertEqual(len(rendered), 1, rendered)
+        self.assertIn("test-unit-caching-tmp-secondary.cc", rendered[0])
+
     def test_bazel_test_per_file_ctu_caching(self):
         """
         Test whether bazel correctly reanalyses
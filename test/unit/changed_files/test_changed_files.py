@@ -0,0 +1,111 @@
+# Copyright 2023 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests the changed-files analysis mode
+"""
+import json
+import os
+import unittest
+from common.base import TestBase
+
+
+class TestChangedFiles(TestBase):
+    """Tests of --define=codechecker_changed_files"""
+
+    # Set working directory
+    __test_path__ = os.path.dirname(os.path.abspath(__file__))
+    BAZEL_BIN_DIR = os.path.join(
+        "../../..", "bazel-bin", "test", "unit", "changed_files"
+    )
+    BAZEL_TESTLOGS_DIR = os.path.join(
+        "../../..", "bazel-testlogs", "test", "unit", "changed_files"
+    )
+
+    def analyzed_files(self, changed: str) -> list[str]:
+        """Run the monolithic test, return its compiled files"""
+        code, _, stderr = self.run_command(
+            "bazel test //test/unit/changed_files:codechecker_changed_files "
+            f"--define=codechecker_changed_files={changed}"
+        )
+        self.assertEqual(code, 0, stderr)
+        with open(
+            os.path.join(
+                self.BAZEL_BIN_DIR,
+                "codechecker_changed_files",
+                "compile_commands.json",
+            ),
+            encoding="utf-8",
+        ) as handle:
+            return sorted(
+                os.path.basename(entry["file"]) for entry in json.load(handle)
+            )
+
+    def test_changed_source(self):
+        """Test: Only the changed source is analyzed"""
+        self.assertEqual(
+            self.analyzed_files("test/unit/changed_files/other.cc"),
+            ["other.cc"],
+        )
+
+    def test_changed_header(self):
+        """Test: Sources including the changed header are analyzed"""
+        self.assertEqual(
+            self.analyzed_files("test/unit/changed_files/base.h"),
+            ["base.cc", "user.cc"],
+        )
+
+    def test_unrelated_change(self):
+        """Test: Nothing is analyzed, the test passes without C/C++ changes"""
+        self.assertEqual(self.analyzed_files("README.md"), [])
+
+    def test_per_file_unrelated_change(self):
+        """Test: Per-file rule passes with an empty summary"""
+        code, _, stderr = self.run_command(
+            "bazel test //test/unit/changed_files:per_file_changed_files "
+            "--define=codechecker_changed_files=README.md"
+        )
+        self.assertEqual(code, 0, stderr)
+        with open(
+            os.path.join(
+                self.BAZEL_BIN_DIR, "per_file_changed_files", "summary.json"
+            ),
+            encoding="utf-8",
+        ) as handle:
+            summary = json.load(handle)
+        self.assertEqual(summary["units"], 0)
+        self.assertEqual(summary["reports"], 0)
+
+    def test_per_file(self):
+        """Test: Per-file rule analyzes only the changed source"""
+        code, _, stderr = self.run_command(
+            "bazel test //test/unit/changed_files:per_file_changed_files "
+            "--define=codechecker_changed_files="
+            "test/unit/changed_files/user.cc"
+        )
+        self.assertEqual(code, 0, stderr)
+        data_dir = os.path.join(
+            self.BAZEL_BIN_DIR, "per_file_changed_files", "data"
+        )
+        self.assertEqual(
+            sorted(
+                name for name in os.listdir(data_dir)
+                if name.endswith("_clangsa.plist")
+            ),
+            ["test-unit-changed_files-user.cc_clangsa.plist"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main(buffer=True)
@@ -15,6 +15,7 @@
 """
 Test external repositories with codechecker
 """
+import json
 import logging
 import os
 import shutil
@@ -125,6 +126,52 @@ class TestImplDepExternalDep(TestBase):
         )
         self.assertEqual(ret, 0, stderr)
 
+    def test_compile_commands_no_external(self):
+        """
+        Test: bazel build :compile_commands_no_external
+        --experimental_cc_implementation_deps --enable_bzlmod
+        """
+        ret, _, stderr = self.run_command(
+            "bazel build :compile_commands_no_external "
+            "--experimental_cc_implementation_deps --enable_bzlmod"
+        )
+        self.assertEqual(ret, 0, stderr)
+        comp_json_file = os.path.join(
+            self.BAZEL_BIN_DIR,  # pyright: ignore
+            "compile_commands_no_external",
+            "compile_commands.json",
+        )
+        # Sources of the main repository are still analyzed
+        self.assertTrue(
+            self.contains_regex_in_file(comp_json_file, "intermediate.cpp")
+        )
+        self.assertFalse(
+            self.contains_regex_in_file(comp_json_file, '"file":"external/')
+        )
+
+    def test_codechecker_no_external(self):
+        """
+        Test: bazel build :codechecker_no_external
+        --experimental_cc_implementation_deps --enable_bzlmod
+        """
+        ret, _, stderr = self.run_command(
+            "bazel build :codechecker_no_external "
+            "--experimental_cc_implementation_deps --enable_bzlmod"
+        )
+        self.assertEqual(ret, 0, stderr)
+        with open(
+            os.path.join(
+                self.BAZEL_BIN_DIR,  # pyright: ignore
+                "codechecker_no_external",
+                "compile_commands.json",
+            ),
+            encoding="utf-8",
+        ) as handle:
+            files = [entry["file"] for entry in json.load(handle)]
+        self.assertTrue(files)
+        for file in files:
+            self.assertFalse(file.startswith("external/"), file)
+
     def test_per_file_external_lib(self):
         """Test: bazel build :per_file_external_deps "
         "--experimental_cc_implementation_deps"""
@@ -0,0 +1,81 @@
+# Copyright 2023 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tests rendering the HTML report on demand
+"""
+import os
+import unittest
+from common.base import TestBase
+
+
+class TestHtml(TestBase):
+    """Tests of the codechecker_html output group"""
+
+    # Set working directory
+    __test_path__ = os.path.dirname(os.path.abspath(__file__))
+    BAZEL_BIN_DIR = os.path.join(
+        "../../..", "bazel-bin", "test", "unit", "html_report"
+    )
+    BAZEL_TESTLOGS_DIR = os.path.join(
+        "../../..", "bazel-testlogs", "test", "unit", "html_report"
+    )
+
+    def check_report(self, target: str) -> None:
+        """The HTML report of target is rendered on request"""
+        report_dir = os.path.join(
+            self.BAZEL_BIN_DIR, target, "codechecker-html"
+        )
+        code, _, stderr = self.run_command(
+            f"bazel build //test/unit/html_report:{target} "
+            "--output_groups=codechecker_html"
+        )
+        self.assertEqual(code, 0, stderr)
+        self.assertTrue(
+            os.path.isfile(os.path.join(report_dir, "index.html"))
+        )
+        pages = [
+            name
+            for _, _, files in os.walk(report_dir)
+            for name in files
+            if name.endswith(".plist.html")
+        ]
+        self.assertTrue(pages)
+
+    def test_monolithic(self):
+        """Test: Monolithic HTML report"""
+        self.check_report("codechecker_html")
+
+    def test_monolithic_archive(self):
+        """Test: Monolithic HTML report of the archived outputs"""
+        self.check_report("codechecker_html_archive")
+
+    def test_per_file(self):
+        """Test: Per-file HTML pages are rendered for each unit"""
+        self.check_report("per_file_html")
+        report_dir = os.path.join(
+            self.BAZEL_BIN_DIR, "per_file_html", "codechecker-html"
+        )
+        unit = "test-unit-html_report-divide.cc"
+        page = f"{unit}_clangsa.plist.html"
+        self.assertTrue(os.path.isfile(os.path.join(report_dir, unit, page)))
+        with open(
+            os.path.join(report_dir, "index.html"), encoding="utf-8"
+        ) as handle:
+            index = handle.read()
+        self.assertIn(f"{unit}/{page}#reportHash=", index)
+        self.assertIn("core.DivideZero", index)
+
+
+if __name__ == "__main__":
+    unittest.main(buffer=True)
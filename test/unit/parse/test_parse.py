@@ -16,6 +16,7 @@
 Test wether CodeChecker parse and CodeChecker store
 runs correctly on the produced report files
 """
+import json
 import os
 import unittest
 from typing import final
@@ -58,6 +59,25 @@ class TestTemplate(TestBase):
             f"{self.BAZEL_BIN_DIR}/codechecker/codechecker-files/data"
         )
 
+    def test_text_result(self):
+        """Test: result.txt is the text output of CodeChecker parse"""
+        ret, _, stderr = self.run_command(
+            "bazel build //test/unit/parse:codechecker"
+        )
+        self.assertEqual(ret, 0, stderr)
+        files_dir = f"{self.BAZEL_BIN_DIR}/codechecker/codechecker-files"
+        with open(f"{files_dir}/result.json", encoding="utf-8") as handle:
+            reports = json.load(handle)["reports"]
+        self.assertTrue(reports)
+        with open(f"{files_dir}/result.txt", encoding="utf-8") as handle:
+            text = handle.read()
+        self.assertRegex(
+            text, r"\[HIGH\] \S*simple\.c:\d+:\d+: .+ \[core\.DivideZero\]"
+        )
+        self.assertRegex(
+            text, rf"Total number of reports\s*\|?\s*{len(reports)}\b"
+        )
+
     def test_store(self):
         """Test: Storing to CodeChecker server"""
         # FIXME: CodeChecker store wants to create a temporary folder inside
@@ -0,0 +1,70 @@
+# Copyright 2023 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests the deduplication of translation units in per_file_test
+"""
+import json
+import os
+import unittest
+from common.base import TestBase
+
+
+class TestPerFileDedupe(TestBase):
+    """Tests of analyzing each distinct compilation once"""
+
+    # Set working directory
+    __test_path__ = os.path.dirname(os.path.abspath(__file__))
+    BAZEL_BIN_DIR = os.path.join(
+        "../../..", "bazel-bin", "test", "unit", "per_file_dedupe"
+    )
+    BAZEL_TESTLOGS_DIR = os.path.join(
+        "../../..", "bazel-testlogs", "test", "unit", "per_file_dedupe"
+    )
+
+    def test_dedupe_ratio(self):
+        """Test: Shared source is analyzed once"""
+        code, _, stderr = self.run_command(
+            "bazel build //test/unit/per_file_dedupe:per_file_dedupe "
+            "--output_groups=codechecker_timings"
+        )
+        self.assertEqual(code, 0, stderr)
+        with open(
+            os.path.join(
+                self.BAZEL_BIN_DIR,
+                "per_file_dedupe",
+                "codechecker_timings.json",
+            ),
+            encoding="utf-8",
+        ) as handle:
+            timings = json.load(handle)
+        self.assertEqual(timings["mode"], "per_file")
+        self.assertEqual(timings["dedupe"]["total_units"], 4)
+        self.assertEqual(timings["dedupe"]["analyzed_units"], 2)
+        self.assertEqual(timings["dedupe"]["ratio"], 0.5)
+        data_dir = os.path.join(self.BAZEL_BIN_DIR, "per_file_dedupe", "data")
+        self.assertEqual(
+            sorted(
+                name for name in os.listdir(data_dir)
+                if name.endswith("_clangsa.plist")
+            ),
+            [
+                "test-unit-per_file_dedupe-shared.cc_clangsa.plist",
+                "test-unit-per_file_dedupe-user.cc_clangsa.plist",
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main(buffer=True)
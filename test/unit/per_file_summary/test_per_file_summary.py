@@ -0,0 +1,98 @@
+# Copyright 2023 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tests the build-time merged results and the severity gate of per_file_test
+"""
+import json
+import os
+import unittest
+from common.base import TestBase
+
+
+class TestPerFileSummary(TestBase):
+    """Tests of summary.json and the severities attribute"""
+
+    # Set working directory
+    __test_path__ = os.path.dirname(os.path.abspath(__file__))
+    BAZEL_BIN_DIR = os.path.join(
+        "../../..", "bazel-bin", "test", "unit", "per_file_summary"
+    )
+    BAZEL_TESTLOGS_DIR = os.path.join(
+        "../../..", "bazel-testlogs", "test", "unit", "per_file_summary"
+    )
+
+    def test_merged_summary(self):
+        """Test: Reports of a shared header are merged at build time"""
+        code, _, stderr = self.run_command(
+            "bazel build //test/unit/per_file_summary:per_file_summary"
+        )
+        self.assertEqual(code, 0, stderr)
+        output_dir = os.path.join(self.BAZEL_BIN_DIR, "per_file_summary")
+        with open(
+            os.path.join(output_dir, "summary.json"),
+            encoding="utf-8",
+        ) as handle:
+            summary = json.load(handle)
+        self.assertEqual(summary["units"], 2)
+        self.assertEqual(summary["checkers"]["core.DivideZero"], 1)
+        self.assertEqual(summary["severities"]["HIGH"], 1)
+        finding = summary["findings"][0]
+        self.assertEqual(
+            finding["file"], "test/unit/per_file_summary/divide.h"
+        )
+        with open(
+            os.path.join(output_dir, "result.json"),
+            encoding="utf-8",
+        ) as handle:
+            result = json.load(handle)
+        self.assertEqual(len(result["reports"]), summary["reports"])
+
+    def test_severity_gate(self):
+        """Test: Only reports of the given severities fail the test"""
+        code, _, _ = self.run_command(
+            "bazel test //test/unit/per_file_summary:per_file_summary"
+        )
+        self.assertNotEqual(code, 0)
+        code, _, stderr = self.run_command(
+            "bazel test "
+            "//test/unit/per_file_summary:per_file_summary_critical"
+        )
+        self.assertEqual(code, 0, stderr)
+
+    def test_summary_output_group(self):
+        """Test: Summary output group builds only the summary"""
+        code, _, stderr = self.run_command(
+            "bazel build //test/unit/per_file_summary:codechecker_summary "
+            "--output_groups=codechecker_summary"
+        )
+        self.assertEqual(code, 0, stderr)
+        output_dir = os.path.join(self.BAZEL_BIN_DIR, "codechecker_summary")
+        with open(
+            os.path.join(output_dir, "summary.json"),
+            encoding="utf-8",
+        ) as handle:
+            summary = json.load(handle)
+        self.assertEqual(summary["severities"], {"HIGH": 1})
+        self.assertEqual(
+            summary["findings"][0]["checker_name"], "core.DivideZero"
+        )
+        self.assertEqual(summary["timeouts"], [])
+        code, _, _ = self.run_command(
+            "bazel test //test/unit/per_file_summary:codechecker_summary"
+        )
+        self.assertNotEqual(code, 0)
+
+
+if __name__ == "__main__":
+    unittest.main(buffer=True)
@@ -0,0 +1,162 @@
+# Copyright 2023 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Test the streaming symlink resolution of report files,
+these tests run the script functions directly, without bazel
+"""
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../../src")
+# The template imports the shared modules next to it
+sys.path.append(SRC)
+SPEC = importlib.util.spec_from_file_location(
+    "codechecker_script", os.path.join(SRC, "codechecker_script.py")
+)
+codechecker_script = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(codechecker_script)
+
+
+class TestResolveSymlinks(unittest.TestCase):
+    """Test resolving symlinks in plist and YAML files"""
+
+    def setUp(self):
+        root = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, root)
+        self.real = os.path.join(root, "real & main.cc")
+        with open(self.real, "w", encoding="utf-8") as source:
+            source.write("int main() {}\n")
+        self.link = os.path.join(root, "link & it's main.cc")
+        os.symlink(self.real, self.link)
+        self.report = os.path.join(root, "report.plist")
+        codechecker_script.realpath.cache_clear()
+
+    def write(self, content):
+        """Write the report file"""
+        with open(self.report, "w", encoding="utf-8", newline="") as report:
+            report.write(content)
+
+    def read(self):
+        """Read the report file back"""
+        with open(self.report, "r", encoding="utf-8", newline="") as report:
+            return report.read()
+
+    def plist(self, files, nested):
+        """Return an XML plist with the given files arrays"""
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            "<plist version=\"1.0\">\n<dict>\n"
+            "\t<key>diagnostics</key>\n\t<array>\n\t\t<dict>\n"
+            "\t\t\t<key>files</key>\n\t\t\t<array>\n"
+            f"\t\t\t\t<string>{nested}</string>\n"
+            "\t\t\t</array>\n\t\t</dict>\n\t</array>\n"
+            "\t<key>files</key>\n\t<array>\n"
+            + "".join(f"\t\t<string>{name}</string>\n" for name in files)
+            + "\t</array>\n</dict>\n</plist>\n"
+        )
+
+    def test_files_array(self):
+        """Test: only the top level files array is rewritten"""
+        link = self.link.replace("&", "&amp;")
+        real = self.real.replace("&", "&amp;")
+        self.write(self.plist([link, "missing.cc"], link))
+        codechecker_script.resolve_plist_symlinks(self.report)
+        self.assertEqual(self.read(), self.plist([real, "missing.cc"], link))
+
+    def test_cdata(self):
+        """Test: CDATA file names are resolved and escaped"""
+        self.write(
+            self.plist([f"<![CDATA[{self.link}]]>"], "<![CDATA[<dict>]]>")
+        )
+        codechecker_script.resolve_plist_symlinks(self.report)
+        self.assertEqual(
+            self.read(),
+            self.plist(
+                [self.real.replace("&", "&amp;")], "<![CDATA[<dict>]]>"
+            ),
+        )
+
+    def test_numeric_entity(self):
+        """Test: numeric character references are decoded"""
+        self.write(self.plist([self.link.replace("&", "&#38;")], ""))
+        codechecker_script.resolve_plist_symlinks(self.report)
+        self.assertEqual(
+            self.read(), self.plist([self.real.replace("&", "&amp;")], "")
+        )
+
+    def test_chunk_boundary(self):
+        """Test: chunks may end anywhere, even inside a tag"""
+        link = self.link.replace("&", "&amp;")
+        content = self.plist([link, f"<![CDATA[{self.link}]]>"], link)
+        expected = self.plist([self.real.replace("&", "&amp;")] * 2, link)
+        for size in range(1, 40):
+            rewriter = codechecker_script.PlistFilesRewriter()
+            output = "".join(
+                rewriter.rewrite(content[start : start + size])
+                for start in range(0, len(content), size)
+            )
+            self.assertEqual(output + rewriter.flush(), expected, size)
+            self.assertEqual(rewriter.updated, 2)
+
+    def yaml(self, filename, diagnostics, newline):
+        """Return a clang-tidy fix export with the given file path"""
+        path = filename.replace("'", "''")
+        diagnostic = (
+            "  - DiagnosticName:  modernize-use-nullptr\n"
+            "    DiagnosticMessage:\n"
+            "      Message:         use nullptr\n"
+            f"      FilePath:        '{path}'\n"
+            "      Replacements:\n"
+            f"        - FilePath:        '{path}'\n"
+            "          Text:            nullptr\n"
+        )
+        content = (
+            "---\n"
+            f"MainSourceFile:  '{path}'\n"
+            "Diagnostics:\n" + diagnostic * diagnostics + "...\n"
+        )
+        return content.replace("\n", newline)
+
+    def test_yaml(self):
+        """Test: every path field of a fix export is rewritten"""
+        self.write(self.yaml(self.link, 1, "\n"))
+        codechecker_script.resolve_yaml_symlinks(self.report)
+        self.assertEqual(self.read(), self.yaml(self.real, 1, "\n"))
+
+    def test_yaml_crlf(self):
+        """Test: CRLF line endings are kept"""
+        self.write(self.yaml(self.link, 1, "\r\n"))
+        codechecker_script.resolve_yaml_symlinks(self.report)
+        self.assertEqual(self.read(), self.yaml(self.real, 1, "\r\n"))
+
+    def test_yaml_large(self):
+        """Test: a fix export larger than the streaming chunk"""
+        diagnostics = codechecker_script.STREAM_CHUNK // 100
+        self.write(self.yaml(self.link, diagnostics, "\n"))
+        self.assertGreater(
+            os.path.getsize(self.report), codechecker_script.STREAM_CHUNK
+        )
+        codechecker_script.resolve_yaml_symlinks(self.report)
+        self.assertEqual(
+            self.read(), self.yaml(self.real, diagnostics, "\n")
+        )
+
+
+if __name__ == "__main__":
+    unittest.main(buffer=True)
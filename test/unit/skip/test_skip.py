@@ -0,0 +1,122 @@
+# Copyright 2023 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests the skip file and package rules evaluated at analysis time
+"""
+import json
+import os
+import unittest
+from common.base import TestBase
+
+
+class TestSkip(TestBase):
+    """Tests of skipped translation units"""
+
+    # Set working directory
+    __test_path__ = os.path.dirname(os.path.abspath(__file__))
+    BAZEL_BIN_DIR = os.path.join(
+        "../../..", "bazel-bin", "test", "unit", "skip"
+    )
+    BAZEL_TESTLOGS_DIR = os.path.join(
+        "../../..", "bazel-testlogs", "test", "unit", "skip"
+    )
+
+    def test_compile_commands(self):
+        """Test: Skipped file is left out of the compilation database"""
+        code, _, stderr = self.run_command(
+            "bazel test //test/unit/skip:codechecker_skip"
+        )
+        self.assertEqual(code, 0, stderr)
+        with open(
+            os.path.join(
+                self.BAZEL_BIN_DIR, "codechecker_skip", "compile_commands.json"
+            ),
+            encoding="utf-8",
+        ) as handle:
+            files = [entry["file"] for entry in json.load(handle)]
+        self.assertEqual(files, ["test/unit/skip/kept.cc"])
+
+    def test_skip_prefix(self):
+        """Test: Skip rules match the paths starting with them"""
+        code, _, stderr = self.run_command(
+            "bazel test //test/unit/skip:codechecker_skip_prefix"
+        )
+        self.assertEqual(code, 0, stderr)
+        with open(
+            os.path.join(
+                self.BAZEL_BIN_DIR,
+                "codechecker_skip_prefix",
+                "compile_commands.json",
+            ),
+            encoding="utf-8",
+        ) as handle:
+            files = [entry["file"] for entry in json.load(handle)]
+        self.assertEqual(files, ["test/unit/skip/kept.cc"])
+
+    def test_skip_include(self):
+        """Test: Files not matching a + rule are left to CodeChecker"""
+        code, _, stderr = self.run_command(
+            "bazel test //test/unit/skip:codechecker_skip_include"
+        )
+        self.assertEqual(code, 0, stderr)
+        with open(
+            os.path.join(
+                self.BAZEL_BIN_DIR,
+                "codechecker_skip_include",
+                "compile_commands.json",
+            ),
+            encoding="utf-8",
+        ) as handle:
+            files = [entry["file"] for entry in json.load(handle)]
+        self.assertEqual(
+            sorted(files),
+            ["test/unit/skip/kept.cc", "test/unit/skip/skipped.cc"],
+        )
+
+    def test_exclude_packages(self):
+        """Test: Excluded package is left out of the compilation database"""
+        code, _, stderr = self.run_command(
+            "bazel test //test/unit/skip:codechecker_exclude_packages"
+        )
+        self.assertEqual(code, 0, stderr)
+        with open(
+            os.path.join(
+                self.BAZEL_BIN_DIR,
+                "codechecker_exclude_packages",
+                "compile_commands.json",
+            ),
+            encoding="utf-8",
+        ) as handle:
+            files = [entry["file"] for entry in json.load(handle)]
+        self.assertEqual(files, ["test/unit/skip/kept.cc"])
+
+    def test_per_file(self):
+        """Test: No per-file action for the skipped file"""
+        code, _, stderr = self.run_command(
+            "bazel test //test/unit/skip:per_file_skip"
+        )
+        self.assertEqual(code, 0, stderr)
+        data_dir = os.path.join(self.BAZEL_BIN_DIR, "per_file_skip", "data")
+        self.assertEqual(
+            sorted(
+                name for name in os.listdir(data_dir)
+                if name.endswith("_clangsa.plist")
+            ),
+            ["test-unit-skip-kept.cc_clangsa.plist"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main(buffer=True)
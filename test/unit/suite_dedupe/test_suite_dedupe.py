@@ -0,0 +1,87 @@
+# Copyright 2023 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests the cross-platform deduplication of codechecker_suite
+"""
+import json
+import os
+import unittest
+from common.base import TestBase
+
+
+class TestSuiteDedupe(TestBase):
+    """Tests of codechecker_suite(dedupe = True)"""
+
+    # Set working directory
+    __test_path__ = os.path.dirname(os.path.abspath(__file__))
+    BAZEL_BIN_DIR = os.path.join(
+        "../../..", "bazel-bin", "test", "unit", "suite_dedupe"
+    )
+    BAZEL_TESTLOGS_DIR = os.path.join(
+        "../../..", "bazel-testlogs", "test", "unit", "suite_dedupe"
+    )
+
+    def test_analyzed_once(self):
+        """Test: Identical translation unit is analyzed once"""
+        code, _, stderr = self.run_command(
+            "bazel build //test/unit/suite_dedupe:suite_dedupe "
+            "--output_groups=codechecker_timings"
+        )
+        self.assertEqual(code, 0, stderr)
+        timings_file = os.path.join(
+            self.BAZEL_BIN_DIR, "suite_dedupe", "codechecker_timings.json"
+        )
+        with open(timings_file, encoding="utf-8") as handle:
+            dedupe = json.load(handle)["dedupe"]
+        self.assertEqual(dedupe["total_units"], 2)
+        self.assertEqual(dedupe["analyzed_units"], 1)
+        self.assertEqual(dedupe["saved_units"], 1)
+
+    def test_generated_header(self):
+        """Test: Translation unit reading generated files is not shared"""
+        code, _, stderr = self.run_command(
+            "bazel build //test/unit/suite_dedupe:suite_dedupe_generated "
+            "--output_groups=codechecker_timings"
+        )
+        self.assertEqual(code, 0, stderr)
+        timings_file = os.path.join(
+            self.BAZEL_BIN_DIR,
+            "suite_dedupe_generated",
+            "codechecker_timings.json",
+        )
+        with open(timings_file, encoding="utf-8") as handle:
+            dedupe = json.load(handle)["dedupe"]
+        self.assertEqual(dedupe["total_units"], 2)
+        self.assertEqual(dedupe["analyzed_units"], 2)
+
+    def test_results_per_platform(self):
+        """Test: Results are available for each platform"""
+        code, _, stderr = self.run_command(
+            "bazel test //test/unit/suite_dedupe:suite_dedupe"
+        )
+        self.assertEqual(code, 0, stderr)
+        for platform in ["default", "test_unit_suite_dedupe_host_copy"]:
+            data_dir = os.path.join(
+                self.BAZEL_BIN_DIR, "suite_dedupe", platform, "data"
+            )
+            plists = [
+                name for name in os.listdir(data_dir)
+                if name.endswith("_clangsa.plist")
+            ]
+            self.assertEqual(len(plists), 1)
+
+
+if __name__ == "__main__":
+    unittest.main(buffer=True)
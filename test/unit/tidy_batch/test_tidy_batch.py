@@ -0,0 +1,61 @@
+# Copyright 2023 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tests batched clang-tidy runs
+"""
+import os
+import unittest
+from common.base import TestBase
+
+
+class TestTidyBatch(TestBase):
+    """Batched clang-tidy tests"""
+
+    # Set working directory
+    __test_path__ = os.path.dirname(os.path.abspath(__file__))
+    BAZEL_BIN_DIR = os.path.join(
+        "../../..", "bazel-bin", "test", "unit", "tidy_batch"
+    )
+    BAZEL_TESTLOGS_DIR = os.path.join(
+        "../../..", "bazel-testlogs", "test", "unit", "tidy_batch"
+    )
+
+    def test_batch_fixes(self):
+        """Test: One clang-tidy run, fixes split into per file outputs"""
+        code, _, stderr = self.run_command(
+            "bazel build //test/unit/tidy_batch:clang_tidy_batch"
+        )
+        self.assertEqual(code, 0, stderr)
+        # Both files are analyzed by the same clang-tidy run
+        self.assertTrue(
+            os.path.isfile(
+                f"{self.BAZEL_BIN_DIR}/"
+                "clang_tidy_batch.batch_0.clang-tidy.yaml"
+            )
+        )
+        for source, other in [("first", "second"), ("second", "first")]:
+            fixes = (
+                f"{self.BAZEL_BIN_DIR}/clang_tidy_batch.test/unit/"
+                f"tidy_batch/{source}.cc.clang-tidy.yaml"
+            )
+            self.assertTrue(
+                self.contains_regex_in_file(fixes, f"{source}.cc'")
+            )
+            self.assertFalse(
+                self.contains_regex_in_file(fixes, f"{other}.cc'")
+            )
+
+
+if __name__ == "__main__":
+    unittest.main(buffer=True)
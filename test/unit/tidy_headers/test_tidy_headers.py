@@ -0,0 +1,83 @@
+# Copyright 2023 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tests checking headers only with the translation units of their owner
+"""
+import os
+import unittest
+from common.base import TestBase
+
+
+class TestTidyHeaders(TestBase):
+    """clang-tidy header ownership tests"""
+
+    # Set working directory
+    __test_path__ = os.path.dirname(os.path.abspath(__file__))
+    BAZEL_BIN_DIR = os.path.join(
+        "../../..", "bazel-bin", "test", "unit", "tidy_headers"
+    )
+    BAZEL_TESTLOGS_DIR = os.path.join(
+        "../../..", "bazel-testlogs", "test", "unit", "tidy_headers"
+    )
+
+    def fixes_file(self, source: str) -> str:
+        """Return the fixes file of a source file"""
+        return (
+            f"{self.BAZEL_BIN_DIR}/clang_tidy_headers.test/unit/"
+            f"tidy_headers/{source}.cc.clang-tidy.yaml"
+        )
+
+    def test_header_ownership(self):
+        """Test: Header is checked by its owner, merged fixes are unique"""
+        code, _, stderr = self.run_command(
+            "bazel build //test/unit/tidy_headers:clang_tidy_headers"
+        )
+        self.assertEqual(code, 0, stderr)
+        for source in ["owner_first", "owner_second"]:
+            self.assertTrue(
+                self.contains_regex_in_file(
+                    self.fixes_file(source), r"shared\.h'"
+                )
+            )
+        self.assertFalse(
+            self.contains_regex_in_file(self.fixes_file("user"), r"shared\.h'")
+        )
+        merged = self.grep_file(
+            f"{self.BAZEL_BIN_DIR}/clang_tidy_headers.clang-tidy.yaml",
+            r"^      FilePath:.*shared\.h'",
+        )
+        self.assertEqual(len(merged), 1)
+
+    def test_header_only_library(self):
+        """Test: Header of a header-only library is checked by its user"""
+        code, _, stderr = self.run_command(
+            "bazel build //test/unit/tidy_headers:clang_tidy_headers"
+        )
+        self.assertEqual(code, 0, stderr)
+        self.assertTrue(
+            self.contains_regex_in_file(
+                self.fixes_file("user"), r"header_only\.h'"
+            )
+        )
+        for source in ["owner_first", "owner_second"]:
+            self.assertFalse(
+                self.contains_regex_in_file(
+                    self.fixes_file(source), r"header_only\.h'"
+                )
+            )
+
+
+
+if __name__ == "__main__":
+    unittest.main(buffer=True)
@@ -0,0 +1,67 @@
+# Copyright 2023 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tests the clang-tidy check profile ranking
+"""
+import json
+import os
+import unittest
+from common.base import TestBase
+
+
+class TestTidyProfile(TestBase):
+    """clang-tidy check profiling tests"""
+
+    # Set working directory
+    __test_path__ = os.path.dirname(os.path.abspath(__file__))
+    BAZEL_BIN_DIR = os.path.join(
+        "../../..", "bazel-bin", "test", "unit", "tidy_profile"
+    )
+    BAZEL_TESTLOGS_DIR = os.path.join(
+        "../../..", "bazel-testlogs", "test", "unit", "tidy_profile"
+    )
+
+    def test_check_profile(self):
+        """Test: Checks are ranked by their cost"""
+        code, _, stderr = self.run_command(
+            "bazel build //test/unit/tidy_profile:clang_tidy_profile "
+            "--output_groups=clang_tidy_profile"
+        )
+        self.assertEqual(code, 0, stderr)
+        with open(
+            f"{self.BAZEL_BIN_DIR}/clang_tidy_profile.check_profile.json",
+            encoding="utf-8",
+        ) as ranking_file:
+            ranking = json.load(ranking_file)
+        self.assertEqual(ranking["translation_units"], 1)
+        self.assertTrue(ranking["checks"])
+        for check in ranking["checks"]:
+            self.assertTrue(check["check"].startswith("bugprone-"))
+        walls = [check["wall"] for check in ranking["checks"]]
+        self.assertEqual(walls, sorted(walls, reverse=True))
+
+    def test_profile_on_demand(self):
+        """Test: The profiles are not among the default outputs"""
+        code, stdout, stderr = self.run_command(
+            "bazel cquery //test/unit/tidy_profile:clang_tidy_profile "
+            "--output=starlark "
+            "--starlark:expr='[f.path for f in target.files.to_list()]'"
+        )
+        self.assertEqual(code, 0, stderr)
+        self.assertNotIn(".check_profile.", stdout)
+        self.assertNotIn(".clang-tidy-profile", stdout)
+
+
+if __name__ == "__main__":
+    unittest.main(buffer=True)
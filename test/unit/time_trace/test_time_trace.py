@@ -0,0 +1,69 @@
+# Copyright 2023 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tests the merged clang -ftime-trace files
+"""
+import json
+import os
+import unittest
+from common.base import TestBase
+
+
+class TestTimeTrace(TestBase):
+    """Clang time trace tests"""
+
+    # Set working directory
+    __test_path__ = os.path.dirname(os.path.abspath(__file__))
+    BAZEL_BIN_DIR = os.path.join(
+        "../../..", "bazel-bin", "test", "unit", "time_trace"
+    )
+    BAZEL_TESTLOGS_DIR = os.path.join(
+        "../../..", "bazel-testlogs", "test", "unit", "time_trace"
+    )
+
+    def check_time_trace(self, target: str) -> None:
+        """Build the time traces of target and check the merged trace"""
+        code, _, stderr = self.run_command(
+            f"bazel build //test/unit/time_trace:{target} "
+            "--output_groups=clang_time_trace"
+        )
+        self.assertEqual(code, 0, stderr)
+        with open(
+            f"{self.BAZEL_BIN_DIR}/{target}.time_trace.json",
+            encoding="utf-8",
+        ) as trace_file:
+            trace = json.load(trace_file)
+        process_names = [
+            event["args"]["name"]
+            for event in trace["traceEvents"]
+            if event.get("name") == "process_name"
+        ]
+        self.assertEqual(process_names, ["test/unit/time_trace/main.cc"])
+        self.assertEqual(len(trace["otherData"]["units"]), 1)
+        self.assertIn("Frontend", trace["otherData"]["phases"])
+        self.assertTrue(
+            os.path.isfile(f"{self.BAZEL_BIN_DIR}/{target}.time_trace.txt")
+        )
+
+    def test_clang_analyze_time_trace(self):
+        """Test: clang_analyze_test merges the time traces"""
+        self.check_time_trace("clang_analyze_time_trace")
+
+    def test_clang_ctu_time_trace(self):
+        """Test: clang_ctu_test merges the time traces"""
+        self.check_time_trace("clang_ctu_time_trace")
+
+
+if __name__ == "__main__":
+    unittest.main(buffer=True)
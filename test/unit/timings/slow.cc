@@ -0,0 +1,42 @@
+/*
+ * Copyright 2023 Ericsson AB
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+// Every branch doubles the paths of the static analyzer, so the analysis
+// of each function runs until the node budget, far beyond a second
+#define BRANCH                                                                 \
+    if (values[index++]) {                                                     \
+        sum += index;                                                          \
+    } else {                                                                   \
+        sum -= index;                                                          \
+    }
+#define BRANCH4 BRANCH BRANCH BRANCH BRANCH
+#define BRANCH32 BRANCH4 BRANCH4 BRANCH4 BRANCH4 BRANCH4 BRANCH4 BRANCH4 BRANCH4
+#define FUNCTION(name)                                                         \
+    int name(const int *values) {                                              \
+        int index = 0;                                                         \
+        int sum = 0;                                                           \
+        BRANCH32                                                               \
+        return sum;                                                            \
+    }
+#define FUNCTION4(name)                                                        \
+    FUNCTION(name##0) FUNCTION(name##1) FUNCTION(name##2) FUNCTION(name##3)
+#define FUNCTION16(name)                                                       \
+    FUNCTION4(name##0) FUNCTION4(name##1) FUNCTION4(name##2) FUNCTION4(name##3)
+
+FUNCTION16(slow0)
+FUNCTION16(slow1)
+FUNCTION16(slow2)
+FUNCTION16(slow3)
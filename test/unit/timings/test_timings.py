@@ -0,0 +1,164 @@
+# Copyright 2023 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests the timings.json files of the codechecker_timings output group
+"""
+import json
+import os
+import unittest
+from common.base import TestBase
+
+
+class TestTimings(TestBase):
+    """Timing instrumentation tests"""
+
+    # Set working directory
+    __test_path__ = os.path.dirname(os.path.abspath(__file__))
+    BAZEL_BIN_DIR = os.path.join(
+        "../../..", "bazel-bin", "test", "unit", "timings"
+    )
+    BAZEL_TESTLOGS_DIR = os.path.join(
+        "../../..", "bazel-testlogs", "test", "unit", "timings"
+    )
+
+    def build_timings(self, target: str) -> None:
+        """Build the codechecker_timings output group of target"""
+        code, _, stderr = self.run_command(
+            f"bazel build //test/unit/timings:{target} "
+            "--output_groups=codechecker_timings"
+        )
+        self.assertEqual(code, 0, stderr)
+
+    def read_timings(self, path: str) -> dict:
+        """Read a timings.json file"""
+        with open(path, encoding="utf-8") as timings_file:
+            return json.load(timings_file)
+
+    def test_monolithic_timings(self):
+        """Test: Monolithic rule saves stage durations"""
+        self.build_timings("codechecker_timings")
+        timings = self.read_timings(
+            f"{self.BAZEL_BIN_DIR}/codechecker_timings/"
+            "codechecker_timings.json"
+        )
+        self.assertEqual(timings["mode"], "monolithic")
+        for stage in [
+            "analyze",
+            "parse",
+            "fix_bazel_paths",
+            "resolve_symlinks",
+        ]:
+            self.assertIn(stage, timings["stages"])
+        self.assertEqual(len(timings["translation_units"]), 1)
+        self.assertTrue(
+            timings["translation_units"][0]["file"].endswith("main.cc")
+        )
+
+    def test_per_file_timings(self):
+        """Test: Per-file rule saves timings for each translation unit"""
+        self.build_timings("per_file_timings")
+        timings = self.read_timings(
+            f"{self.BAZEL_BIN_DIR}/per_file_timings/data/"
+            "test-unit-timings-main.cc_timings.json"
+        )
+        self.assertEqual(timings["mode"], "per_file")
+        self.assertEqual(timings["exit_code"], 0)
+        unit = timings["translation_units"][0]
+        self.assertEqual(unit["duration"], timings["stages"]["analyze"])
+        self.assertGreater(unit["size"], 0)
+
+    def test_per_file_timeout(self):
+        """Test: Translation unit analyzed within the timeout is ok"""
+        self.build_timings("per_file_timeout")
+        timings = self.read_timings(
+            f"{self.BAZEL_BIN_DIR}/per_file_timeout/data/"
+            "test-unit-timings-main.cc_timings.json"
+        )
+        self.assertEqual(timings["translation_units"][0]["status"], "ok")
+
+    def test_monolithic_timeout(self):
+        """Test: Timed out analysis is a warning of the monolithic rule"""
+        self.build_timings("codechecker_timeout")
+        with open(
+            f"{self.BAZEL_BIN_DIR}/codechecker_timeout/codechecker-files/"
+            "timeouts.json",
+            encoding="utf-8",
+        ) as timeouts_file:
+            timeouts = json.load(timeouts_file)
+        self.assertTrue(timeouts)
+        for timeout in timeouts:
+            self.assertTrue(timeout["file"].endswith("slow.cc"), timeout)
+        timings = self.read_timings(
+            f"{self.BAZEL_BIN_DIR}/codechecker_timeout/"
+            "codechecker_timings.json"
+        )
+        self.assertEqual(timings["translation_units"][0]["status"], "timeout")
+
+    def test_monolithic_timeout_fatal(self):
+        """Test: Timed out analysis fails with analysis_timeout_fatal"""
+        code, _, stderr = self.run_command(
+            "bazel build //test/unit/timings:codechecker_timeout_fatal"
+        )
+        self.assertNotEqual(code, 0, stderr)
+        # The error message itself goes to the log of the failed action
+        self.assertIn("codechecker script execution FAILED", stderr)
+
+    def test_per_file_timeout_expired(self):
+        """Test: Timed out translation unit is a warning of per-file rule"""
+        self.build_timings("per_file_timeout_expired")
+        timings = self.read_timings(
+            f"{self.BAZEL_BIN_DIR}/per_file_timeout_expired/data/"
+            "test-unit-timings-slow.cc_timings.json"
+        )
+        self.assertEqual(
+            timings["translation_units"][0]["status"], "timeout"
+        )
+
+    def test_same_basename_timings(self):
+        """Test: Translation units with the same basename are distinct"""
+        self.build_timings("codechecker_same_basename")
+        timings = self.read_timings(
+            f"{self.BAZEL_BIN_DIR}/codechecker_same_basename/"
+            "codechecker_timings.json"
+        )
+        units = {
+            os.path.relpath(unit["file"], "test/unit/timings"): unit
+            for unit in timings["translation_units"]
+        }
+        self.assertEqual(len(units), 2)
+        with_report = units["a/util.cc"]
+        without_report = units["b/util.cc"]
+        self.assertGreater(without_report["output_bytes"], 0)
+        self.assertGreater(
+            with_report["output_bytes"], without_report["output_bytes"]
+        )
+
+    def test_aggregate_timings(self):
+        """Test: Aggregator lists the stages of all timings files"""
+        self.build_timings("codechecker_timings")
+        self.build_timings("per_file_timings")
+        # Other targets of the package leave timings files in the directory
+        code, stdout, stderr = self.run_command(
+            "python3 ../../../src/codechecker_timings.py "
+            f"{self.BAZEL_BIN_DIR}/codechecker_timings "
+            f"{self.BAZEL_BIN_DIR}/per_file_timings/data"
+        )
+        self.assertEqual(code, 0, stderr)
+        self.assertIn("Timings files: 2\n", stdout)
+        self.assertIn("main.cc", stdout)
+
+
+if __name__ == "__main__":
+    unittest.main(buffer=True)
@@ -0,0 +1,113 @@
+# Copyright 2023 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests whether files of registered toolchains are declared as action inputs
+"""
+import os
+import shutil
+import unittest
+from common.base import TestBase
+
+
+class TestToolchain(TestBase):
+    """Toolchain tests"""
+
+    # Set working directory
+    __test_path__ = os.path.dirname(os.path.abspath(__file__))
+    BAZEL_BIN_DIR = os.path.join(
+        "../../..", "bazel-bin", "test", "unit", "toolchain"
+    )
+    BAZEL_TESTLOGS_DIR = os.path.join(
+        "../../..", "bazel-testlogs", "test", "unit", "toolchain"
+    )
+    EXTRA_TOOLCHAINS = (
+        "--extra_toolchains=//test/unit/toolchain:codechecker_toolchain,"
+        "//test/unit/toolchain:clang_toolchain"
+    )
+
+    def aquery_inputs(self, mnemonic: str, target: str) -> str:
+        """Returns the aquery output of the given actions of a target"""
+        code, stdout, stderr = self.run_command(
+            f"bazel aquery 'mnemonic({mnemonic}, {target})' "
+            f"{self.EXTRA_TOOLCHAINS}"
+        )
+        self.assertEqual(code, 0, stderr)
+        return stdout
+
+    def test_codechecker_toolchain_files(self):
+        """Test: Toolchain files are inputs of the monolithic action"""
+        stdout = self.aquery_inputs(
+            "CodeChecker",
+            "//test/unit/toolchain:codechecker_toolchain_test",
+        )
+        self.assertIn("codechecker_marker.txt", stdout)
+        self.assertIn("clang_marker.txt", stdout)
+
+    def test_per_file_toolchain_files(self):
+        """Test: Toolchain files are inputs of the per-file actions"""
+        stdout = self.aquery_inputs(
+            "CodeChecker",
+            "//test/unit/toolchain:per_file_toolchain_test",
+        )
+        self.assertIn("codechecker_marker.txt", stdout)
+        self.assertIn("clang_marker.txt", stdout)
+
+    def test_clang_tidy_toolchain_files(self):
+        """Test: Toolchain files are inputs of the clang-tidy actions"""
+        stdout = self.aquery_inputs(
+            "ClangTidy",
+            "//test/unit/toolchain:clang_tidy_toolchain_test",
+        )
+        self.assertIn("clang_marker.txt", stdout)
+
+    def test_no_toolchain(self):
+        """Test: Rules work without registered toolchains"""
+        code, _, stderr = self.run_command(
+            "bazel build //test/unit/toolchain:codechecker_toolchain_test"
+        )
+        self.assertEqual(code, 0, stderr)
+
+    def test_codechecker_not_on_path(self):
+        """Test: Registered toolchain works without CodeChecker on PATH"""
+        codechecker = shutil.which("CodeChecker")
+        if not codechecker:
+            self.skipTest("CodeChecker is not on PATH")
+        codechecker_dir = os.path.dirname(codechecker)
+        path = os.environ["PATH"]
+        os.environ["PATH"] = os.pathsep.join(
+            directory
+            for directory in path.split(os.pathsep)
+            if os.path.realpath(directory)
+            != os.path.realpath(codechecker_dir)
+        )
+        try:
+            if shutil.which("CodeChecker") or not shutil.which("bazel"):
+                self.skipTest("CodeChecker can't be hidden from PATH")
+            stdout = self.aquery_inputs(
+                "CodeChecker",
+                "//test/unit/toolchain:per_file_toolchain_test",
+            )
+            self.assertIn("codechecker_marker.txt", stdout)
+            code, _, stderr = self.run_command(
+                "bazel build //test/unit/toolchain:codechecker_toolchain_test"
+            )
+            self.assertNotEqual(code, 0)
+            self.assertIn("CodeChecker is not detected", stderr)
+        finally:
+            os.environ["PATH"] = path
+
+
+if __name__ == "__main__":
+    unittest.main(buffer=True)